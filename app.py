@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-import random
+import uuid
 from database.operations import DatabaseOperations
+from database.async_operations import AsyncDatabaseOperations, async_db_enabled, run_async
+from database.schema import sql_debug_enabled, query_log, client_session
+from database.engagement import engagement_report
 from utils.helpers import format_engagement_number, calculate_time_ago
 
 # Configure page
@@ -14,36 +17,119 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'view_count' not in st.session_state:
-    st.session_state.view_count = random.randint(1500, 3000)
 if 'liked_posts' not in st.session_state:
     st.session_state.liked_posts = set()
 if 'gallery_filter' not in st.session_state:
     st.session_state.gallery_filter = "All"
-if 'user_id' not in st.session_state:
-    st.session_state.user_id = 1
 if 'db_error' not in st.session_state:
     st.session_state.db_error = None
+if 'session_key' not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex
 
 # Database operations instance
 db = DatabaseOperations()
 
-def load_data():
-    """Load data from database with error handling"""
+SEARCH_PAGE_SIZE = 20
+FEED_PAGE_SIZE = 10
+GALLERY_PAGE_SIZE = 12
+COMMENTS_PAGE_SIZE = 10
+
+def open_comment_panels():
+    """Posts whose comment panel is open and showing its first page"""
+    post_ids = []
+    for key, shown in st.session_state.items():
+        if key.startswith("show_comments_") and shown:
+            post_id = int(key[len("show_comments_"):])
+            if page_cursor(f"comments_{post_id}") is None:
+                post_ids.append(post_id)
+    return post_ids
+
+def load_data(posts=False, gallery=False, totals=False, analytics=False):
+    """Load the profile plus only the parts the current section renders, in one round trip
+    
+    With ASYNC_DB_ENABLED every query runs concurrently on the async engine;
+    the feed's open comment panels and the analytics summary are fetched
+    along with it when asked for.
+    """
     try:
-        profile_data = db.get_profile_data()
-        if not profile_data:
+        if async_db_enabled():
+            page_data = run_async(AsyncDatabaseOperations.load_profile_page(
+                posts_limit=FEED_PAGE_SIZE if posts else 0,
+                gallery_limit=GALLERY_PAGE_SIZE if gallery else 0,
+                include_totals=totals,
+                comment_post_ids=open_comment_panels() if posts else (),
+                comments_limit=COMMENTS_PAGE_SIZE,
+                analytics_days=7 if analytics else None
+            ))
+        else:
+            page_data = db.get_profile_page(
+                posts_limit=FEED_PAGE_SIZE if posts else 0,
+                gallery_limit=GALLERY_PAGE_SIZE if gallery else 0,
+                include_totals=totals
+            )
+        if not page_data:
             st.error("No profile data found in database. Please ensure the database is seeded.")
             st.stop()
-        gallery_data = db.get_gallery_items(user_id=st.session_state.user_id)
-        posts_data = db.get_posts(user_id=st.session_state.user_id)
-        return profile_data, gallery_data, posts_data
     except Exception as e:
         st.error(f"Database error: {str(e)}")
         st.info("Please ensure DATABASE_URL is set and the database is initialized.")
         st.stop()
+    
+    # The rest of the page reads and writes as the loaded profile's user
+    st.session_state.user_id = page_data['user_id']
+    # Count this browser session among the profile's unique visitors
+    db.record_unique_views(st.session_state.session_key, [('profile', page_data['user_id'])])
+    return page_data
+
+def page_cursor(pager_key):
+    """Cursor of the page currently shown by a pager"""
+    cursors = st.session_state.setdefault(f"{pager_key}_cursors", [None])
+    return cursors[-1]
+
+def reset_pager(pager_key):
+    """Go back to the first page of a pager"""
+    st.session_state[f"{pager_key}_cursors"] = [None]
+
+def render_pager(pager_key, next_cursor):
+    """Render previous/next controls for a keyset-paginated list"""
+    cursors = st.session_state.setdefault(f"{pager_key}_cursors", [None])
+    if len(cursors) == 1 and next_cursor is None:
+        return
+    
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("⬅️ Previous", key=f"{pager_key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with page_col:
+        st.markdown(f"<div style='text-align: center;'>Page {len(cursors)}</div>", unsafe_allow_html=True)
+    with next_col:
+        if st.button("Next ➡️", key=f"{pager_key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def render_gallery_grid(items, button_label, key_prefix):
+    """Render gallery items three to a row"""
+    db.record_unique_views(
+        st.session_state.session_key,
+        [('gallery', item['id']) for item in items] + [('content', st.session_state.user_id)]
+    )
+    cols_per_row = 3
+    for i in range(0, len(items), cols_per_row):
+        cols = st.columns(cols_per_row)
+        for j, item in enumerate(items[i:i+cols_per_row]):
+            with cols[j]:
+                # Media placeholder (using emojis)
+                media_icon = "🎥" if item['type'] == 'video' else "🖼️"
+                st.markdown(f"<div style='text-align: center; font-size: 60px;'>{media_icon}</div>", unsafe_allow_html=True)
+                st.markdown(f"**{item['title']}**")
+                st.markdown(f"*{item['category']}*")
+                st.markdown(f"❤️ {item['likes']} | 👁️ {item['views']}")
+                
+                if st.button(button_label, key=f"{key_prefix}_{item['id']}"):
+                    st.info(f"**{item['title']}**\n\n{item['description']}")
 
-def render_profile_header(profile_data, posts_data):
+def render_profile_header(profile_data, post_totals):
     """Render the profile header section"""
     st.markdown("---")
     
@@ -68,9 +154,10 @@ def render_profile_header(profile_data, posts_data):
         with stats_col2:
             st.metric("Following", format_engagement_number(profile_data['following']))
         with stats_col3:
-            st.metric("Posts", len(posts_data))
+            st.metric("Posts", post_totals['posts'])
         with stats_col4:
-            st.metric("Views", format_engagement_number(st.session_state.view_count))
+            unique_visitors = db.get_unique_viewers('profile', [st.session_state.user_id], days=30)
+            st.metric("Visitors (30d)", format_engagement_number(unique_visitors[st.session_state.user_id]))
         
         # Social links
         st.markdown("#### Connect with me:")
@@ -79,50 +166,71 @@ def render_profile_header(profile_data, posts_data):
             with social_cols[i]:
                 st.markdown(f"[{platform.title()}]({link})")
 
-def render_gallery(gallery_data):
+def render_gallery(first_page):
     """Render the interactive gallery section"""
     st.markdown("---")
     st.header("📸 Gallery")
     
     # Filter options
-    categories = ["All"] + list(set(item['category'] for item in gallery_data))
+    categories = ["All"] + list(db.get_gallery_categories(user_id=st.session_state.user_id))
     selected_category = st.selectbox("Filter by category:", categories, key="gallery_filter_select")
     
     if selected_category != st.session_state.gallery_filter:
         st.session_state.gallery_filter = selected_category
+        reset_pager("gallery")
         st.rerun()
     
-    # Filter gallery items
-    if st.session_state.gallery_filter == "All":
-        filtered_items = gallery_data
+    # Load one page of the filtered gallery; the unfiltered first page is preloaded
+    category = None if st.session_state.gallery_filter == "All" else st.session_state.gallery_filter
+    if category is None and page_cursor("gallery") is None:
+        page = first_page
     else:
-        filtered_items = [item for item in gallery_data if item['category'] == st.session_state.gallery_filter]
+        page = db.get_gallery_page(
+            user_id=st.session_state.user_id,
+            category=category,
+            cursor=page_cursor("gallery"),
+            limit=GALLERY_PAGE_SIZE
+        )
     
     # Display gallery in grid
-    cols_per_row = 3
-    for i in range(0, len(filtered_items), cols_per_row):
-        cols = st.columns(cols_per_row)
-        for j, item in enumerate(filtered_items[i:i+cols_per_row]):
-            with cols[j]:
-                # Media placeholder (using emojis)
-                media_icon = "🎥" if item['type'] == 'video' else "🖼️"
-                st.markdown(f"<div style='text-align: center; font-size: 60px;'>{media_icon}</div>", unsafe_allow_html=True)
-                st.markdown(f"**{item['title']}**")
-                st.markdown(f"*{item['category']}*")
-                st.markdown(f"❤️ {item['likes']} | 👁️ {item['views']}")
-                
-                if st.button(f"View Details", key=f"gallery_{item['id']}"):
-                    st.info(f"**{item['title']}**\n\n{item['description']}")
+    render_gallery_grid(page['items'], "View Details", "gallery")
+    render_pager("gallery", page['next_cursor'])
 
-def render_content_feed(profile_data, posts_data):
+def render_content_feed(profile_data, first_page, preloaded_comments=None):
     """Render the content feed section"""
     st.markdown("---")
     st.header("📱 Latest Posts")
     
-    # Sort posts by timestamp (newest first)
-    sorted_posts = sorted(posts_data, key=lambda x: x['timestamp'], reverse=True)
+    # Posts come back newest first, one page at a time; the first page is preloaded
+    if page_cursor("feed") is None:
+        page = first_page
+    else:
+        page = db.get_posts_page(
+            user_id=st.session_state.user_id,
+            cursor=page_cursor("feed"),
+            limit=FEED_PAGE_SIZE
+        )
+    
+    # Fetch the first page of every open comment panel not preloaded, in one round trip
+    preloaded_comments = preloaded_comments or {}
+    open_post_ids = [post['id'] for post in page['items'] if st.session_state.get(f"show_comments_{post['id']}", False)]
+    first_comment_pages = dict(preloaded_comments)
+    first_comment_pages.update(db.get_first_comment_pages(
+        [
+            post_id for post_id in open_post_ids
+            if page_cursor(f"comments_{post_id}") is None and post_id not in preloaded_comments
+        ],
+        limit=COMMENTS_PAGE_SIZE
+    ))
+    
+    # Every post shown counts this session once among its unique viewers
+    db.record_unique_views(
+        st.session_state.session_key,
+        [('post', post['id']) for post in page['items']] + [('content', st.session_state.user_id)]
+    )
+    unique_viewers = db.get_unique_viewers('post', [post['id'] for post in page['items']], days=30)
     
-    for post in sorted_posts:
+    for post in page['items']:
         with st.container():
             st.markdown("---")
             
@@ -168,7 +276,7 @@ def render_content_feed(profile_data, posts_data):
                 st.markdown(f"🔄 {post['shares']}")
             
             with eng_col4:
-                st.markdown(f"👁️ {post['views']}")
+                st.markdown(f"👁️ {post['views']} ({unique_viewers[post['id']]} unique)")
             
             # Comments section
             if st.session_state.get(f"show_comments_{post['id']}", False):
@@ -176,7 +284,12 @@ def render_content_feed(profile_data, posts_data):
                 st.markdown("### 💬 Comments")
                 
                 # Get existing comments
-                comments = db.get_comments_for_post(post['id'])
+                comments_cursor = page_cursor(f"comments_{post['id']}")
+                if comments_cursor is None:
+                    comment_page = first_comment_pages[post['id']]
+                else:
+                    comment_page = db.get_comments_page(post['id'], comments_cursor, limit=COMMENTS_PAGE_SIZE)
+                comments = comment_page['items']
                 
                 if comments:
                     for comment in comments:
@@ -187,6 +300,7 @@ def render_content_feed(profile_data, posts_data):
                         with comment_col2:
                             st.markdown(f"❤️ {comment['likes']}")
                         st.markdown("")
+                    render_pager(f"comments_{post['id']}", comment_page['next_cursor'])
                 else:
                     st.info("No comments yet. Be the first to comment!")
                 
@@ -197,12 +311,15 @@ def render_content_feed(profile_data, posts_data):
                         if comment_text:
                             try:
                                 db.add_comment(post['id'], st.session_state.user_id, comment_text)
+                                reset_pager(f"comments_{post['id']}")
                                 st.success("Comment added!")
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Error adding comment: {e}")
                         else:
                             st.error("Comment cannot be empty")
+    
+    render_pager("feed", page['next_cursor'])
 
 def render_contact_info(profile_data):
     """Render contact information section"""
@@ -231,60 +348,81 @@ def render_contact_info(profile_data):
                 else:
                     st.error("Please fill in all fields.")
 
-def render_engagement_metrics(profile_data, posts_data):
+def render_engagement_metrics(profile_data, post_totals, analytics_summary=None):
     """Render engagement metrics dashboard"""
     st.markdown("---")
     st.header("📊 Engagement Analytics Dashboard")
     
-    # Track profile view
-    db.track_analytics(st.session_state.user_id, 'profile_view')
+    # Track profile view (buffered; repeat reruns from this session are collapsed)
+    db.track_analytics_buffered(
+        st.session_state.user_id,
+        'profile_view',
+        session_key=st.session_state.session_key
+    )
     
-    # Create metrics from posts data
-    total_likes = sum(post['likes'] for post in posts_data)
-    total_comments = sum(post['comments'] for post in posts_data)
-    total_shares = sum(post['shares'] for post in posts_data)
-    total_views = sum(post['views'] for post in posts_data)
+    # Week-over-week deltas and sparklines come from the engagement snapshot history
+    history = db.get_engagement_history(st.session_state.user_id, days=7)
     
     st.subheader("📈 Overall Performance")
-    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+    metric_columns = st.columns(4)
+    metrics = [("Total Likes", 'likes'), ("Total Comments", 'comments'), ("Total Shares", 'shares'), ("Total Views", 'views')]
+    
+    for column, (label, key) in zip(metric_columns, metrics):
+        with column:
+            delta = None
+            if history['baseline'] is not None:
+                delta = f"{post_totals[key] - history['baseline'][key]:+,} this week"
+            st.metric(
+                label,
+                format_engagement_number(post_totals[key]),
+                delta=delta,
+                chart_data=[day[key] for day in history['daily']] or None,
+                chart_type='area'
+            )
+    
+    report = engagement_report(st.session_state.user_id, days=30)
+    st.markdown(f"**Overall Engagement Rate:** {report['totals']['avg_engagement_rate']:.2f}%")
     
-    with metric_col1:
-        st.metric(
-            "Total Likes", 
-            format_engagement_number(total_likes),
-            delta=f"+{random.randint(50, 200)} this week"
-        )
-    
-    with metric_col2:
-        st.metric(
-            "Total Comments", 
-            format_engagement_number(total_comments),
-            delta=f"+{random.randint(20, 80)} this week"
-        )
+    st.markdown("---")
     
-    with metric_col3:
-        st.metric(
-            "Total Shares", 
-            format_engagement_number(total_shares),
-            delta=f"+{random.randint(10, 40)} this week"
-        )
+    # Breakdowns and distribution, computed on the cached post and gallery frames
+    st.subheader("🧮 Content Performance")
+    perf_col1, perf_col2 = st.columns(2)
+    with perf_col1:
+        st.markdown("### By Post Type")
+        st.dataframe(report['by_post_type'].round(2), use_container_width=True)
+        st.markdown("### By Media Type")
+        st.dataframe(report['by_media_type'].round(2), use_container_width=True)
+    with perf_col2:
+        st.markdown("### Gallery by Category")
+        st.dataframe(report['by_category'].round(2), use_container_width=True)
+        st.markdown("### Per-Post Percentiles")
+        st.dataframe(report['percentiles'].round(2), use_container_width=True)
+    
+    st.markdown("### Daily Engagement (Last 30 Days)")
+    st.line_chart(report['daily'][['engagement', 'engagement_7d']])
     
-    with metric_col4:
-        st.metric(
-            "Total Views", 
-            format_engagement_number(total_views),
-            delta=f"+{random.randint(500, 2000)} this week"
-        )
+    st.markdown("---")
     
-    # Engagement rate
-    engagement_rate = ((total_likes + total_comments + total_shares) / total_views * 100) if total_views > 0 else 0
-    st.markdown(f"**Overall Engagement Rate:** {engagement_rate:.2f}%")
+    # Trending hashtags, from the streaming counts of post captions
+    st.subheader("🔥 Trending Hashtags")
+    trend_col1, trend_col2 = st.columns(2)
+    for column, (title, hours) in zip((trend_col1, trend_col2), (("Last 24 Hours", 24), ("Last 7 Days", 168))):
+        with column:
+            st.markdown(f"### {title}")
+            trending = db.get_trending_hashtags(limit=10, hours=hours)
+            if trending:
+                trend_df = pd.DataFrame(trending).rename(columns={'tag': 'Hashtag', 'score': 'Score', 'count': 'Posts'})
+                st.dataframe(trend_df, use_container_width=True, hide_index=True)
+            else:
+                st.info("No hashtags in this period yet.")
     
     st.markdown("---")
     
     # Analytics summary
     st.subheader("🎯 Recent Activity (Last 7 Days)")
-    analytics_summary = db.get_analytics_summary(st.session_state.user_id, days=7)
+    if analytics_summary is None:
+        analytics_summary = db.get_analytics_summary(st.session_state.user_id, days=7)
     
     anal_col1, anal_col2 = st.columns(2)
     with anal_col1:
@@ -304,13 +442,23 @@ def render_engagement_metrics(profile_data, posts_data):
     
     # Profile stats
     st.subheader("👥 Profile Statistics")
-    prof_col1, prof_col2, prof_col3 = st.columns(3)
+    prof_col1, prof_col2, prof_col3, prof_col4, prof_col5 = st.columns(5)
     with prof_col1:
         st.metric("Followers", format_engagement_number(profile_data['followers']))
     with prof_col2:
         st.metric("Following", format_engagement_number(profile_data['following']))
+    
+    # Unique reach, estimated from HyperLogLog sketches of browser sessions
+    user_id = st.session_state.user_id
+    visitors_7d = db.get_unique_viewers('profile', [user_id], days=7)[user_id]
+    visitors_30d = db.get_unique_viewers('profile', [user_id], days=30)[user_id]
+    content_reach = db.get_unique_viewers('content', [user_id], days=30)[user_id]
     with prof_col3:
-        st.metric("Profile Views", format_engagement_number(st.session_state.view_count))
+        st.metric("Unique Visitors (7d)", format_engagement_number(visitors_7d))
+    with prof_col4:
+        st.metric("Unique Visitors (30d)", format_engagement_number(visitors_30d))
+    with prof_col5:
+        st.metric("Content Reach (30d)", format_engagement_number(content_reach))
 
 def render_content_management():
     """Render content upload and management section"""
@@ -501,14 +649,26 @@ def render_search():
             "Gallery Only": "gallery"
         }
         
-        results = db.search_content(search_query, search_type_map[search_type])
+        # Start from the first page whenever the search changes
+        search_key = (search_query, search_type)
+        if st.session_state.get('search_key') != search_key:
+            st.session_state.search_key = search_key
+            st.session_state.search_page = 0
+        page = st.session_state.search_page
+        
+        results = db.search_content(
+            search_query,
+            search_type_map[search_type],
+            limit=SEARCH_PAGE_SIZE,
+            offset=page * SEARCH_PAGE_SIZE
+        )
         
         st.markdown("---")
         st.subheader(f"Search Results for: '{search_query}'")
         
         # Display posts results
         if results['posts']:
-            st.markdown(f"### 📱 Posts ({len(results['posts'])} found)")
+            st.markdown(f"### 📱 Posts ({results['posts_total']} found)")
             for post in results['posts']:
                 with st.expander(f"{post['caption'][:100]}..."):
                     st.markdown(f"**Full Caption:** {post['caption']}")
@@ -519,7 +679,7 @@ def render_search():
         
         # Display gallery results
         if results['gallery']:
-            st.markdown(f"### 📸 Gallery ({len(results['gallery'])} found)")
+            st.markdown(f"### 📸 Gallery ({results['gallery_total']} found)")
             cols = st.columns(3)
             for idx, item in enumerate(results['gallery']):
                 with cols[idx % 3]:
@@ -532,6 +692,21 @@ def render_search():
         
         if not results['posts'] and not results['gallery']:
             st.warning("No results found. Try different keywords.")
+        
+        # Pagination
+        total_pages = -(-max(results['posts_total'], results['gallery_total']) // SEARCH_PAGE_SIZE)
+        if total_pages > 1:
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button("⬅️ Previous", key="search_prev", disabled=page == 0):
+                    st.session_state.search_page -= 1
+                    st.rerun()
+            with page_col:
+                st.markdown(f"<div style='text-align: center;'>Page {page + 1} of {total_pages}</div>", unsafe_allow_html=True)
+            with next_col:
+                if st.button("Next ➡️", key="search_next", disabled=page + 1 >= total_pages):
+                    st.session_state.search_page += 1
+                    st.rerun()
     else:
         st.info("Enter a search query above to find posts and gallery items.")
 
@@ -540,83 +715,123 @@ def render_category_pages():
     st.markdown("---")
     st.header("📂 Browse by Category")
     
-    # Get unique categories from gallery
-    gallery_items = db.get_gallery_items(user_id=st.session_state.user_id)
-    categories = list(set(item['category'] for item in gallery_items))
+    # Get categories and their item counts from the gallery
+    category_counts = db.get_gallery_categories(user_id=st.session_state.user_id)
     
-    if categories:
-        selected_category = st.selectbox("Select a category:", ["All"] + sorted(categories))
+    if category_counts:
+        selected_category = st.selectbox("Select a category:", ["All"] + list(category_counts))
+        if selected_category != st.session_state.get('category_page_selected'):
+            st.session_state.category_page_selected = selected_category
+            reset_pager("category_page")
         
         st.markdown("---")
         st.subheader(f"Category: {selected_category}")
         
-        # Filter by category
         if selected_category == "All":
-            filtered_items = gallery_items
+            item_count = sum(category_counts.values())
         else:
-            filtered_items = [item for item in gallery_items if item['category'] == selected_category]
+            item_count = category_counts.get(selected_category, 0)
         
-        if filtered_items:
-            st.markdown(f"*{len(filtered_items)} items found*")
+        if item_count:
+            st.markdown(f"*{item_count} items found*")
+            
+            page = db.get_gallery_page(
+                user_id=st.session_state.user_id,
+                category=None if selected_category == "All" else selected_category,
+                cursor=page_cursor("category_page"),
+                limit=GALLERY_PAGE_SIZE
+            )
             
             # Display in grid
-            cols_per_row = 3
-            for i in range(0, len(filtered_items), cols_per_row):
-                cols = st.columns(cols_per_row)
-                for j, item in enumerate(filtered_items[i:i+cols_per_row]):
-                    with cols[j]:
-                        media_icon = "🎥" if item['type'] == 'video' else "🖼️"
-                        st.markdown(f"<div style='text-align: center; font-size: 60px;'>{media_icon}</div>", unsafe_allow_html=True)
-                        st.markdown(f"**{item['title']}**")
-                        st.markdown(f"*{item['category']}*")
-                        st.markdown(f"❤️ {item['likes']} | 👁️ {item['views']}")
-                        
-                        if st.button("View", key=f"cat_view_{item['id']}"):
-                            st.info(f"**{item['title']}**\n\n{item['description']}")
+            render_gallery_grid(page['items'], "View", "cat_view")
+            render_pager("category_page", page['next_cursor'])
         else:
             st.info(f"No items found in category '{selected_category}'")
     else:
         st.info("No categories available yet. Add some gallery items first!")
 
+# Navigation sections; only the selected one is rendered on each rerun
+SECTIONS = [
+    "🏠 Profile", "📸 Gallery", "📱 Feed", "📞 Contact",
+    "📊 Analytics", "⚙️ Manage", "🔍 Search", "📂 Categories"
+]
+
+def render_query_debug_panel(summary):
+    """Render statement counts, slowest queries and N+1 suspects for recent reruns"""
+    history = st.session_state.setdefault('query_history', [])
+    history.append({
+        'Rerun': len(history) + 1,
+        'Section': st.session_state.get('active_section'),
+        'Statements': summary['statements'],
+        'Time (ms)': round(summary['duration_ms'], 2)
+    })
+    del history[:-20]
+    
+    with st.expander(f"🛠️ SQL debug: {summary['statements']} statements, {summary['duration_ms']:.1f} ms"):
+        for suspect in summary['n_plus_one']:
+            st.warning(
+                f"Possible N+1 in `{suspect['method']}`: same statement ran {suspect['count']} times\n\n"
+                f"`{suspect['statement'][:200]}`"
+            )
+        
+        st.markdown("**By method**")
+        st.dataframe(pd.DataFrame([
+            {'Method': method, 'Calls': stats['calls'], 'Statements': stats['statements'], 'Time (ms)': round(stats['duration_ms'], 2)}
+            for method, stats in sorted(summary['by_method'].items(), key=lambda item: -item[1]['duration_ms'])
+        ]), hide_index=True, use_container_width=True)
+        
+        st.markdown("**Slowest statements**")
+        st.dataframe(pd.DataFrame([
+            {'Time (ms)': round(entry['duration_ms'], 2), 'Method': entry['method'], 'Statement': entry['statement']}
+            for entry in summary['slowest']
+        ]), hide_index=True, use_container_width=True)
+        
+        st.markdown("**Recent reruns**")
+        st.dataframe(pd.DataFrame(history), hide_index=True, use_container_width=True)
+
 # Main app layout
 def main():
-    # Load data with error handling
-    profile_data, gallery_data, posts_data = load_data()
-    
-    # Increment view count
-    st.session_state.view_count += random.randint(1, 5)
-    
+    # Reads follow this browser session's own writes to the primary database
+    with client_session(st.session_state.session_key):
+        if not sql_debug_enabled():
+            render_page()
+            return
+        with query_log() as log:
+            render_page()
+        render_query_debug_panel(log.summary())
+
+def render_page():
+    """Render the selected section of the profile page"""
     # App title
     st.title("👤 Personal Profile - Sonia Papi")
     
-    # Navigation tabs
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
-        "🏠 Profile", "📸 Gallery", "📱 Feed", "📞 Contact", 
-        "📊 Analytics", "⚙️ Manage", "🔍 Search", "📂 Categories"
-    ])
-    
-    with tab1:
-        render_profile_header(profile_data, posts_data)
-    
-    with tab2:
-        render_gallery(gallery_data)
-    
-    with tab3:
-        render_content_feed(profile_data, posts_data)
-    
-    with tab4:
-        render_contact_info(profile_data)
-    
-    with tab5:
-        render_engagement_metrics(profile_data, posts_data)
-    
-    with tab6:
+    # Navigation
+    section = st.radio("Section", SECTIONS, horizontal=True, key="active_section", label_visibility="collapsed")
+    
+    # Each section loads only what it renders
+    if section == "🏠 Profile":
+        page_data = load_data(totals=True)
+        render_profile_header(page_data['profile'], page_data['post_totals'])
+    elif section == "📸 Gallery":
+        page_data = load_data(gallery=True)
+        render_gallery(page_data['gallery'])
+    elif section == "📱 Feed":
+        page_data = load_data(posts=True)
+        render_content_feed(page_data['profile'], page_data['posts'], page_data.get('comment_pages'))
+    elif section == "📞 Contact":
+        page_data = load_data()
+        render_contact_info(page_data['profile'])
+    elif section == "📊 Analytics":
+        page_data = load_data(totals=True, analytics=True)
+        render_engagement_metrics(page_data['profile'], page_data['post_totals'], page_data.get('analytics_summary'))
+    elif section == "⚙️ Manage":
+        load_data()
         render_content_management()
-    
-    with tab7:
+    elif section == "🔍 Search":
+        load_data()
         render_search()
-    
-    with tab8:
+    elif section == "📂 Categories":
+        load_data()
         render_category_pages()
     
     # Footer
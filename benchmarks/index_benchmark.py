@@ -0,0 +1,153 @@
+"""Query plans and timings for the hot access paths, before and after the
+secondary indexes declared in database/schema.py.
+
+Usage:
+    python -m benchmarks.index_benchmark --rows 1000000
+    python -m benchmarks.index_benchmark --database-url postgresql://... --rows 1000000
+
+The target database is wiped and rebuilt, so never point it at real data.
+"""
+from database.schema import Base, User, SocialLink, Post, GalleryItem, Comment, Analytics, ensure_indexes
+from sqlalchemy import create_engine, insert, select, text, desc, func
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+CATEGORIES = ['Travel', 'Lifestyle', 'Photography', 'Fashion', 'Food', 'Fitness', 'Other']
+EVENT_TYPES = ['profile_view', 'post_view', 'like', 'share', 'comment']
+CHUNK_SIZE = 50000
+
+def build_queries(user_id, post_id, since):
+    """The statements DatabaseOperations issues on every page render"""
+    return {
+        'feed (posts by user, newest first)': select(Post).where(
+            Post.user_id == user_id
+        ).order_by(desc(Post.timestamp)).limit(20),
+        'gallery filter (user + category)': select(GalleryItem).where(
+            GalleryItem.user_id == user_id, GalleryItem.category == 'Travel'
+        ).order_by(desc(GalleryItem.upload_date)).limit(20),
+        'comments for post': select(Comment).where(
+            Comment.post_id == post_id
+        ).order_by(desc(Comment.timestamp)),
+        'social links for user': select(SocialLink).where(SocialLink.user_id == user_id),
+        'analytics summary (7 days)': select(Analytics.event_type, func.count(Analytics.id)).where(
+            Analytics.user_id == user_id, Analytics.timestamp >= since
+        ).group_by(Analytics.event_type)
+    }
+
+def load_rows(engine, rows, users):
+    """Fill every table with synthetic rows in large multi-row batches"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    def spread():
+        return now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+
+    def insert_chunks(table, make_row, count):
+        with engine.begin() as conn:
+            for start in range(0, count, CHUNK_SIZE):
+                conn.execute(insert(table), [make_row(i) for i in range(start, min(start + CHUNK_SIZE, count))])
+
+    insert_chunks(User.__table__, lambda i: {
+        'id': i + 1, 'name': f'User {i + 1}', 'username': f'user{i + 1}'
+    }, users)
+    insert_chunks(SocialLink.__table__, lambda i: {
+        'user_id': i % users + 1, 'platform': 'instagram', 'url': f'https://instagram.com/user{i}'
+    }, users * 5)
+    insert_chunks(Post.__table__, lambda i: {
+        'id': i + 1, 'user_id': rng.randint(1, users), 'caption': f'Post {i}',
+        'post_type': 'post', 'likes': 0, 'shares': 0, 'views': 0, 'timestamp': spread()
+    }, rows)
+    insert_chunks(GalleryItem.__table__, lambda i: {
+        'user_id': rng.randint(1, users), 'title': f'Item {i}', 'item_type': 'image',
+        'category': rng.choice(CATEGORIES), 'likes': 0, 'views': 0, 'upload_date': spread()
+    }, rows)
+    insert_chunks(Comment.__table__, lambda i: {
+        'post_id': rng.randint(1, rows), 'user_id': rng.randint(1, users),
+        'content': f'Comment {i}', 'likes': 0, 'timestamp': spread()
+    }, rows)
+    insert_chunks(Analytics.__table__, lambda i: {
+        'user_id': rng.randint(1, users), 'event_type': rng.choice(EVENT_TYPES), 'timestamp': spread()
+    }, rows)
+
+def explain(conn, statement):
+    sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in conn.execute(text(f'EXPLAIN {sql}')).all()]
+
+def time_query(conn, statement, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(statement).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def measure(engine, queries, repeat):
+    results = {}
+    with engine.connect() as conn:
+        for name, statement in queries.items():
+            results[name] = {
+                'plan': explain(conn, statement),
+                'median_ms': time_query(conn, statement, repeat)
+            }
+    return results
+
+def report(label, results):
+    print(f'\n=== {label} ===')
+    for name, result in results.items():
+        print(f'\n{name}: {result["median_ms"]:.2f} ms (median)')
+        for line in result['plan']:
+            print(f'    {line}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Scratch database to rebuild (default: temporary SQLite file)')
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows per content table')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20, help='Executions per query')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'index_benchmark.db')}"
+    engine = create_engine(database_url)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(engine)
+
+    print(f'Loading {args.rows:,} rows per table into {engine.url.render_as_string(hide_password=True)}...')
+    started = time.perf_counter()
+    load_rows(engine, args.rows, args.users)
+    print(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('ANALYZE'))
+    queries = build_queries(user_id=args.users // 2, post_id=args.rows // 2,
+                            since=datetime.utcnow() - timedelta(days=7))
+    before = measure(engine, queries, args.repeat)
+
+    started = time.perf_counter()
+    created = ensure_indexes(engine)
+    print(f'\nCreated {len(created)} indexes in {time.perf_counter() - started:.1f}s: {", ".join(created)}')
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('ANALYZE'))
+    after = measure(engine, queries, args.repeat)
+
+    report('Before secondary indexes', before)
+    report('After secondary indexes', after)
+
+    print('\n=== Summary ===')
+    for name in queries:
+        speedup = before[name]['median_ms'] / max(after[name]['median_ms'], 1e-6)
+        print(f'{name:40} {before[name]["median_ms"]:10.2f} ms -> {after[name]["median_ms"]:8.2f} ms  ({speedup:.0f}x)')
+
+if __name__ == '__main__':
+    main()
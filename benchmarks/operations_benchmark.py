@@ -0,0 +1,284 @@
+"""Latency, query count and rows fetched for the DatabaseOperations hot paths.
+
+Each scale builds a fresh synthetic dataset (database/synthetic_data.py)
+and times every workload: feed load, gallery filter, comment fetch,
+search, analytics summary, like/view increments and bulk writes. The
+read cache and counter buffer are switched off so every call reaches the
+database.
+
+Usage:
+    python -m benchmarks.operations_benchmark --scales 0.01,0.1 --output results.json
+    python -m benchmarks.operations_benchmark --database-url postgresql://... --baseline results.json
+    python -m benchmarks.operations_benchmark --input new.json --baseline old.json
+
+With --baseline, workloads whose p95 latency or query count grew beyond
+--threshold are reported and the exit status is 1. The target database
+is wiped and rebuilt for every scale, so never point it at real data.
+"""
+import os
+
+# Measure the database, not the in-process cache or write buffers
+os.environ['READ_CACHE_ENABLED'] = '0'
+os.environ['COUNTER_BUFFER_ENABLED'] = '0'
+
+from database.schema import Base, User, Post, get_engine, dispose_engine, init_db
+from database.operations import DatabaseOperations
+from database.synthetic_data import generate_synthetic_data, CATEGORIES, HASHTAGS
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from datetime import datetime
+import argparse
+import json
+import platform
+import random
+import sqlalchemy
+import statistics
+import sys
+import tempfile
+import time
+
+class CountingCursor:
+    """DBAPI cursor proxy adding the rows each fetch returns to a QueryCounter"""
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._counter.rows += 1
+            yield row
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._counter.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._counter.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._counter.rows += len(rows)
+        return rows
+
+class QueryCounter:
+    """Counts statements on an engine and the rows fetched from their cursors
+
+    Rows are counted whether they become ORM instances, Core rows or
+    aggregates, since the result reads them through the wrapped cursor.
+    """
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.rows = 0
+        event.listen(engine, 'before_cursor_execute', self._on_statement)
+        event.listen(engine, 'after_cursor_execute', self._on_executed)
+
+    def _on_statement(self, *args):
+        self.statements += 1
+
+    def _on_executed(self, conn, cursor, statement, parameters, context, executemany):
+        if context is None or isinstance(context.cursor, CountingCursor):
+            return
+        # The result is built from context.cursor right after this event;
+        # batched INSERT .. RETURNING collects its rows through the context
+        context.cursor = CountingCursor(cursor, self)
+        context.fetchall_for_returning = lambda cursor: CountingCursor(cursor, self).fetchall()
+
+    def remove(self, engine):
+        event.remove(engine, 'before_cursor_execute', self._on_statement)
+        event.remove(engine, 'after_cursor_execute', self._on_executed)
+
+def build_workloads(rng, users, post_ids):
+    """Map workload name to a zero-argument callable, each call with fresh arguments"""
+    def feed_load():
+        user_id, username = rng.choice(users)
+        page = DatabaseOperations.get_profile_page(username=username)
+        if page['posts']['next_cursor']:
+            DatabaseOperations.get_posts_page(user_id=user_id, cursor=page['posts']['next_cursor'])
+
+    def gallery_filter():
+        user_id, _ = rng.choice(users)
+        DatabaseOperations.get_gallery_page(user_id=user_id, category=rng.choice(CATEGORIES))
+
+    def comment_fetch():
+        DatabaseOperations.get_first_comment_pages(rng.sample(post_ids, min(10, len(post_ids))))
+        DatabaseOperations.get_comments_page(rng.choice(post_ids))
+
+    def search():
+        DatabaseOperations.search_content(rng.choice(HASHTAGS))
+
+    def analytics_summary():
+        DatabaseOperations.get_analytics_summary(rng.choice(users)[0])
+
+    def like_increment():
+        DatabaseOperations.update_likes('post', rng.choice(post_ids))
+
+    def view_increment():
+        DatabaseOperations.update_views('post', rng.choice(post_ids))
+
+    def bulk_posts():
+        user_id, _ = rng.choice(users)
+        DatabaseOperations.add_posts_bulk(
+            {'user_id': user_id, 'caption': f'Benchmark post #{rng.choice(HASHTAGS)}', 'post_type': 'post'}
+            for _ in range(1000)
+        )
+
+    def bulk_comments():
+        user_id, _ = rng.choice(users)
+        DatabaseOperations.add_comments_bulk(
+            {'post_id': rng.choice(post_ids), 'user_id': user_id, 'content': 'Benchmark comment'}
+            for _ in range(1000)
+        )
+
+    return {
+        'feed_load': feed_load,
+        'gallery_filter': gallery_filter,
+        'comment_fetch': comment_fetch,
+        'search': search,
+        'analytics_summary': analytics_summary,
+        'like_increment': like_increment,
+        'view_increment': view_increment,
+        'bulk_posts_1000': bulk_posts,
+        'bulk_comments_1000': bulk_comments
+    }
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 3)
+
+def run_workload(workload, counter, iterations, warmup):
+    for _ in range(warmup):
+        workload()
+    timings = []
+    counter.statements = counter.rows = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        workload()
+        timings.append((time.perf_counter() - started) * 1000)
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+        'queries_per_call': round(counter.statements / iterations, 2),
+        'rows_per_call': round(counter.rows / iterations, 2)
+    }
+
+def reset_database(database_url):
+    """Point the app at a freshly emptied database"""
+    dispose_engine()
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database and os.path.exists(url.database):
+        os.remove(url.database)
+    os.environ['DATABASE_URL'] = database_url
+    Base.metadata.drop_all(get_engine())
+    init_db()
+
+def run_scale(database_url, scale, iterations, warmup, seed, only):
+    reset_database(database_url)
+    print(f'\nScale {scale}: generating data...')
+    # Data ends today so date-windowed reads such as the analytics summary find rows
+    counts = generate_synthetic_data(scale=scale, seed=seed)
+    print(f'  {counts}')
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        users = [tuple(row) for row in conn.execute(select(User.id, User.username).order_by(func.random()).limit(200))]
+        post_ids = list(conn.execute(select(Post.id).order_by(func.random()).limit(2000)).scalars())
+
+    counter = QueryCounter(engine)
+    try:
+        results = {}
+        workloads = build_workloads(random.Random(seed), users, post_ids)
+        for name, workload in workloads.items():
+            if only and name not in only:
+                continue
+            # Writes are slower and grow the data; run them fewer times
+            runs = max(iterations // 10, 5) if name.startswith('bulk_') else iterations
+            results[name] = run_workload(workload, counter, runs, warmup)
+            result = results[name]
+            print(f'  {name:20} p50 {result["p50_ms"]:9.2f} ms  p95 {result["p95_ms"]:9.2f} ms  '
+                  f'p99 {result["p99_ms"]:9.2f} ms  {result["queries_per_call"]:6.1f} queries  '
+                  f'{result["rows_per_call"]:8.1f} rows')
+    finally:
+        counter.remove(engine)
+    return {'row_counts': counts, 'workloads': results}
+
+def compare(baseline, current, threshold):
+    """Return (scale, workload, metric, before, after) for every regression"""
+    regressions = []
+    for scale, scale_results in current['results'].items():
+        baseline_scale = baseline['results'].get(scale)
+        if not baseline_scale:
+            continue
+        for name, result in scale_results['workloads'].items():
+            before = baseline_scale['workloads'].get(name)
+            if not before:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append((scale, name, 'p95_ms', before['p95_ms'], result['p95_ms']))
+            if result['queries_per_call'] > before['queries_per_call']:
+                regressions.append((scale, name, 'queries_per_call', before['queries_per_call'], result['queries_per_call']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Scratch database to rebuild (default: temporary SQLite file)')
+    parser.add_argument('--scales', default='0.01,0.1', help='Comma-separated synthetic data scale factors (1 = ~1M rows)')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed calls per read workload')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', help='Comma-separated workload names to run')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--input', help='Load results from this file instead of running')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p95 slowdown before flagging (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input) as f:
+            current = json.load(f)
+    else:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'operations_benchmark.db')}"
+        only = set(args.only.split(',')) if args.only else None
+        current = {
+            'meta': {
+                'dialect': make_url(database_url).get_backend_name(),
+                'python': platform.python_version(),
+                'sqlalchemy': sqlalchemy.__version__,
+                'iterations': args.iterations,
+                'seed': args.seed,
+                'created': datetime.utcnow().isoformat(timespec='seconds')
+            },
+            'results': {}
+        }
+        for scale in args.scales.split(','):
+            current['results'][scale] = run_scale(database_url, float(scale), args.iterations, args.warmup, args.seed, only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'\nResults written to {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        print(f'\n=== Compared with {args.baseline} ===')
+        for scale, name, metric, before, after in regressions:
+            print(f'REGRESSION scale {scale} {name:20} {metric}: {before} -> {after}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions')
+
+if __name__ == '__main__':
+    main()
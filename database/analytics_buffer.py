@@ -0,0 +1,160 @@
+"""Write-behind buffer for analytics events.
+
+Events are accepted without touching the database and written by a
+background thread as multi-row inserts, either when a batch fills up or
+when the flush interval elapses. Repeat events from the same browser
+session inside the dedupe window are collapsed into one.
+"""
+from database.schema import _env_int
+from datetime import datetime
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsBuffer:
+    """In-process event queue flushed in batches by a daemon thread"""
+
+    def __init__(self, writer, max_batch=500, flush_interval=2.0, max_queue=10000, dedupe_window=30.0):
+        self.writer = writer
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._seen = {}
+        self._seen_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self._counters = {
+            'accepted': 0,
+            'collapsed': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'failed_flushes': 0
+        }
+
+    @classmethod
+    def from_env(cls, writer):
+        """Build a buffer configured from ANALYTICS_BUFFER_* environment variables"""
+        return cls(
+            writer,
+            max_batch=_env_int('ANALYTICS_BUFFER_MAX_BATCH', 500),
+            flush_interval=float(os.getenv('ANALYTICS_BUFFER_FLUSH_INTERVAL') or 2.0),
+            max_queue=_env_int('ANALYTICS_BUFFER_MAX_QUEUE', 10000),
+            dedupe_window=float(os.getenv('ANALYTICS_DEDUPE_WINDOW') or 30.0)
+        )
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def record(self, user_id, event_type, event_data=None, session_key=None):
+        """Queue an event; returns False if it was collapsed or dropped"""
+        if self._stopped.is_set():
+            self._count('dropped')
+            return False
+        if session_key is not None and self._is_repeat((session_key, user_id, event_type, event_data)):
+            self._count('collapsed')
+            return False
+
+        try:
+            self._queue.put_nowait({
+                'user_id': user_id,
+                'event_type': event_type,
+                'event_data': event_data,
+                'timestamp': datetime.utcnow()
+            })
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+        self._count('accepted')
+        self._ensure_thread()
+        if self._queue.qsize() >= self.max_batch:
+            self._wake.set()
+        return True
+
+    def _is_repeat(self, key):
+        now = time.monotonic()
+        with self._seen_lock:
+            last_seen = self._seen.get(key)
+            if last_seen is not None and now - last_seen < self.dedupe_window:
+                return True
+            self._seen[key] = now
+            if len(self._seen) > self._queue.maxsize:
+                cutoff = now - self.dedupe_window
+                self._seen = {k: seen for k, seen in self._seen.items() if seen >= cutoff}
+        return False
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='analytics-buffer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything queued so far; returns the number of events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                try:
+                    self.writer(batch)
+                except Exception:
+                    logger.exception('Failed to flush %d analytics events', len(batch))
+                    self._count('failed_flushes')
+                    self._count('dropped', len(batch))
+                    return written
+                self._count('flushed', len(batch))
+                written += len(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the background thread and flush whatever is still queued"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Return queue depth and lifetime counters"""
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_analytics_buffer(writer):
+    """Return the process-wide buffer, creating it on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AnalyticsBuffer.from_env(writer)
+                atexit.register(_buffer.stop)
+    return _buffer
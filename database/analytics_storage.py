@@ -0,0 +1,326 @@
+"""Monthly partitions, retention and cold archive for analytics events.
+
+On PostgreSQL the analytics table is range-partitioned by month on its
+timestamp, so inserts only touch the current month's partition and its
+small indexes, and old months leave by detaching a partition rather than
+a bulk DELETE. A DEFAULT partition catches events outside the prepared
+months. On other databases the table stays a plain table.
+
+The retention job archives every month older than
+ANALYTICS_RETENTION_MONTHS to zstd-compressed Parquet files in
+ANALYTICS_ARCHIVE_DIR, then drops those raw events and their daily
+rollups. Run it (and create upcoming partitions) from cron with:
+
+    python -m database.analytics_storage
+"""
+from database.schema import Analytics, AnalyticsDailyRollup, _env_int, get_engine
+from database.cache import invalidate
+from sqlalchemy import column, delete, func, select, table, text
+from sqlalchemy.schema import CreateIndex
+from datetime import date, datetime
+import argparse
+import glob
+import os
+import re
+
+DEFAULT_PARTITION = 'analytics_default'
+ARCHIVE_BATCH_SIZE = 50000
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def _month_of(moment):
+    return date(moment.year, moment.month, 1)
+
+def _month_range(month):
+    # Bounds as datetimes, to compare against the timestamp column
+    end = _add_months(month, 1)
+    return datetime(month.year, month.month, 1), datetime(end.year, end.month, 1)
+
+def _partition_name(month):
+    return f"analytics_p{month:%Y_%m}"
+
+def archive_dir():
+    return os.getenv('ANALYTICS_ARCHIVE_DIR') or 'analytics_archive'
+
+def is_partitioned(conn):
+    """Whether the analytics table is a PostgreSQL partitioned table"""
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass('analytics')"
+    )).scalar() == 'p'
+
+def _partitions(conn):
+    """Map month to partition name for the monthly partitions of analytics"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'analytics'::regclass"
+    )).scalars().all()
+    partitions = {}
+    for name in names:
+        match = re.fullmatch(r'analytics_p(\d{4})_(\d{2})', name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def _create_partition(conn, month):
+    """Add the partition for one month, moving in any rows parked in the default partition"""
+    name = _partition_name(month)
+    start, end = month.isoformat(), _add_months(month, 1).isoformat()
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE analytics INCLUDING DEFAULTS)'))
+    conn.execute(text(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f"WHERE \"timestamp\" >= '{start}' AND \"timestamp\" < '{end}' RETURNING *) "
+        f'INSERT INTO "{name}" SELECT * FROM moved'
+    ))
+    conn.execute(text(
+        f"ALTER TABLE analytics ATTACH PARTITION \"{name}\" FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+
+def ensure_partitions(engine=None, months_ahead=None):
+    """Create the partitions for this month and the next ``months_ahead`` months
+
+    Returns the names of the partitions created; a no-op unless analytics
+    is partitioned.
+    """
+    engine = engine or get_engine()
+    if months_ahead is None:
+        months_ahead = _env_int('ANALYTICS_PARTITION_MONTHS_AHEAD', 3)
+    created = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return created
+        existing = _partitions(conn)
+        this_month = _month_of(datetime.utcnow())
+        for offset in range(months_ahead + 1):
+            month = _add_months(this_month, offset)
+            if month not in existing:
+                _create_partition(conn, month)
+                created.append(_partition_name(month))
+    return created
+
+def install_partitions(engine=None):
+    """Convert a plain PostgreSQL analytics table into monthly partitions
+
+    Runs in one transaction holding an exclusive lock on analytics, copying
+    the existing events into their month's partition. Returns True if the
+    table was converted; other databases and already partitioned tables
+    are left alone (upcoming partitions are still created).
+    """
+    engine = engine or get_engine()
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            converted = False
+        else:
+            conn.execute(text('LOCK TABLE analytics IN ACCESS EXCLUSIVE MODE'))
+            conn.execute(text(
+                "UPDATE analytics SET \"timestamp\" = now() AT TIME ZONE 'utc' WHERE \"timestamp\" IS NULL"
+            ))
+            for index in Analytics.__table__.indexes:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence('analytics', 'id')")).scalar()
+            conn.execute(text('ALTER TABLE analytics RENAME TO analytics_unpartitioned'))
+            conn.execute(text('ALTER TABLE analytics_unpartitioned RENAME CONSTRAINT analytics_pkey TO analytics_unpartitioned_pkey'))
+            # The partition key has to be part of the primary key
+            conn.execute(text(
+                'CREATE TABLE analytics (LIKE analytics_unpartitioned INCLUDING DEFAULTS, '
+                'PRIMARY KEY (id, "timestamp")) PARTITION BY RANGE ("timestamp")'
+            ))
+            conn.execute(text('ALTER TABLE analytics ADD FOREIGN KEY (user_id) REFERENCES users (id)'))
+            conn.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF analytics DEFAULT'))
+
+            oldest = conn.execute(text('SELECT min("timestamp") FROM analytics_unpartitioned')).scalar()
+            month = _month_of(oldest or datetime.utcnow())
+            this_month = _month_of(datetime.utcnow())
+            while month <= this_month:
+                conn.execute(text(
+                    f'CREATE TABLE "{_partition_name(month)}" PARTITION OF analytics '
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                ))
+                month = _add_months(month, 1)
+
+            conn.execute(text('INSERT INTO analytics SELECT * FROM analytics_unpartitioned'))
+            conn.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY analytics.id'))
+            conn.execute(text('DROP TABLE analytics_unpartitioned'))
+            # Indexes on the parent cascade to every partition, present and future
+            for index in sorted(Analytics.__table__.indexes, key=lambda index: index.name):
+                conn.execute(CreateIndex(index))
+            converted = True
+    ensure_partitions(engine)
+    return converted
+
+def _archive_path(directory, month):
+    # A month archived twice (e.g. late rows from the default partition) gets a numbered file
+    path = os.path.join(directory, f"analytics_{month:%Y_%m}.parquet")
+    suffix = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"analytics_{month:%Y_%m}.{suffix}.parquet")
+        suffix += 1
+    return path
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Analytics archives need pyarrow (pip install .[archive])")
+    return pa, pq
+
+def _write_archive(conn, source, month, directory):
+    """Stream one month of events from ``source`` into a Parquet file
+    
+    Returns the rows written and the path of the still-partial file (None
+    when there were no rows); _finalize_archive gives it its final name.
+    """
+    pa, pq = _import_pyarrow()
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('event_type', pa.string()),
+        ('event_data', pa.string()),
+        ('timestamp', pa.timestamp('us'))
+    ])
+    # Same columns and types as analytics, read from the partition or table named ``source``
+    events = table(source, *[column(c.name, c.type) for c in Analytics.__table__.columns])
+    start, end = _month_range(month)
+    result = conn.execution_options(stream_results=True, yield_per=ARCHIVE_BATCH_SIZE).execute(
+        select(events.c.id, events.c.user_id, events.c.event_type, events.c.event_data, events.c.timestamp)
+        .where(events.c.timestamp >= start, events.c.timestamp < end)
+        .order_by(events.c.timestamp, events.c.id)
+    )
+
+    os.makedirs(directory, exist_ok=True)
+    partial = os.path.join(directory, f"analytics_{month:%Y_%m}.parquet.partial")
+    written = 0
+    writer = pq.ParquetWriter(partial, schema, compression='zstd')
+    try:
+        for rows in result.partitions():
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            written += len(rows)
+    except Exception as e:
+        writer.close()
+        os.remove(partial)
+        raise e
+    writer.close()
+    if not written:
+        os.remove(partial)
+        return 0, None
+    return written, partial
+
+def _finalize_archive(partial, directory, month):
+    # Only the archive of a committed deletion gets the name readers look for
+    if partial:
+        os.replace(partial, _archive_path(directory, month))
+
+def _discard_archive(partial):
+    if partial and os.path.exists(partial):
+        os.remove(partial)
+
+def apply_retention(engine=None, retention_months=None, directory=None, now=None):
+    """Archive and drop every month of analytics older than the retention period
+
+    Each month is written to Parquet before its events (a whole partition
+    on PostgreSQL) and daily rollups are removed. Returns the number of
+    events archived per month.
+    """
+    engine = engine or get_engine()
+    if retention_months is None:
+        retention_months = _env_int('ANALYTICS_RETENTION_MONTHS', 13)
+    directory = directory or archive_dir()
+    cutoff = _add_months(_month_of(now or datetime.utcnow()), -retention_months)
+    archived = {}
+
+    with engine.connect() as conn:
+        partitioned = is_partitioned(conn)
+        partitions = _partitions(conn) if partitioned else {}
+        # Partitions are dropped whole; only the default one needs scanning row by row
+        source = table(DEFAULT_PARTITION, column('timestamp', Analytics.timestamp.type)) if partitioned else Analytics.__table__
+        oldest = conn.execute(select(func.min(source.c.timestamp))).scalar()
+
+    for month, name in sorted(partitions.items()):
+        if month >= cutoff:
+            continue
+        partial = None
+        try:
+            with engine.begin() as conn:
+                archived[month], partial = _write_archive(conn, name, month, directory)
+                conn.execute(text(f'ALTER TABLE analytics DETACH PARTITION "{name}"'))
+                conn.execute(text(f'DROP TABLE "{name}"'))
+                conn.execute(delete(AnalyticsDailyRollup).where(
+                    AnalyticsDailyRollup.day >= month, AnalyticsDailyRollup.day < _add_months(month, 1)
+                ))
+        except Exception as e:
+            # The rows are still in the database; an archive of them would count them twice
+            _discard_archive(partial)
+            raise e
+        _finalize_archive(partial, directory, month)
+
+    # Plain tables, and rows parked in the default partition, go month by month
+    month = _month_of(oldest) if oldest else cutoff
+    while month < cutoff:
+        partial = None
+        try:
+            with engine.begin() as conn:
+                count, partial = _write_archive(conn, DEFAULT_PARTITION if partitioned else 'analytics', month, directory)
+                if count:
+                    start, end = _month_range(month)
+                    conn.execute(delete(Analytics).where(Analytics.timestamp >= start, Analytics.timestamp < end))
+                conn.execute(delete(AnalyticsDailyRollup).where(
+                    AnalyticsDailyRollup.day >= month, AnalyticsDailyRollup.day < _add_months(month, 1)
+                ))
+        except Exception as e:
+            _discard_archive(partial)
+            raise e
+        _finalize_archive(partial, directory, month)
+        archived[month] = archived.get(month, 0) + count
+        month = _add_months(month, 1)
+
+    if archived:
+        invalidate([('analytics',)])
+    return {month.strftime('%Y-%m'): count for month, count in archived.items() if count}
+
+def archived_event_counts(user_id, since, directory=None):
+    """Count a user's archived events since ``since``, by event type"""
+    paths = []
+    for path in glob.glob(os.path.join(directory or archive_dir(), 'analytics_*.parquet')):
+        match = re.match(r'analytics_(\d{4})_(\d{2})', os.path.basename(path))
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        # Files are per month, so only open those overlapping the window
+        if _add_months(month, 1) > since.date():
+            paths.append(path)
+    if not paths:
+        return {}
+
+    _, pq = _import_pyarrow()
+    counts = {}
+    for path in paths:
+        table = pq.read_table(
+            path,
+            columns=['event_type'],
+            filters=[('user_id', '=', user_id), ('timestamp', '>=', since)]
+        )
+        for event_type in table.column('event_type').to_pylist():
+            counts[event_type] = counts.get(event_type, 0) + 1
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming analytics partitions and apply retention")
+    parser.add_argument('--retention-months', type=int, default=None)
+    parser.add_argument('--archive-dir', default=None)
+    parser.add_argument('--months-ahead', type=int, default=None)
+    args = parser.parse_args()
+
+    created = ensure_partitions(months_ahead=args.months_ahead)
+    if created:
+        print(f"Created partitions: {', '.join(created)}")
+    archived = apply_retention(retention_months=args.retention_months, directory=args.archive_dir)
+    print(f"Archived events per month: {archived or 'nothing to archive'}")
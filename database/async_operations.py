@@ -0,0 +1,283 @@
+"""Asyncio counterpart of DatabaseOperations on SQLAlchemy's async engine.
+
+Every AsyncDatabaseOperations method is a coroutine with the same name,
+arguments and return value as its DatabaseOperations counterpart. The
+query code is shared: each call opens its own AsyncSession and runs the
+synchronous method on it through ``run_sync``, so reads awaited together
+(see ``load_profile_page``) use separate pooled connections and overlap.
+Cached reads share entries with the synchronous layer.
+
+Needs an async driver, asyncpg for PostgreSQL or aiosqlite for SQLite
+(``pip install .[async]``). Enable it for the app with ASYNC_DB_ENABLED=1.
+"""
+from database.schema import _env_bool, _mark_write, get_pool_config, bind_session, instrument_engine, choose_replica, replica_urls
+from database.operations import DatabaseOperations
+from database.cache import cached_read
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+
+# Async driver used for each backend when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+class _PrimarySession(Session):
+    """Sync facade of primary AsyncSessions; commits mark the client for read-your-writes"""
+
+event.listen(_PrimarySession, 'after_commit', _mark_write)
+
+_async_engine = None
+_async_session_factory = None
+_async_replica_factories = {}
+_async_engine_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+
+def async_db_enabled():
+    return _env_bool('ASYNC_DB_ENABLED', False)
+
+def get_async_database_url():
+    """ASYNC_DATABASE_URL, or DATABASE_URL switched to the backend's async driver"""
+    database_url = os.getenv('ASYNC_DATABASE_URL')
+    if database_url:
+        return make_url(database_url)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise ValueError(
+            "DATABASE_URL environment variable not set. "
+            "Please ensure the PostgreSQL database is configured."
+        )
+    return _async_url(database_url)
+
+def _async_url(database_url):
+    """``database_url`` switched to the backend's async driver"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}; set ASYNC_DATABASE_URL")
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if backend == 'postgresql' and 'sslmode' in url.query:
+        # asyncpg takes the libpq sslmode values as its ssl argument
+        sslmode = url.query['sslmode']
+        url = url.difference_update_query(['sslmode']).update_query_dict({'ssl': sslmode})
+    return url
+
+def get_async_engine():
+    """Return the process-wide async engine, creating it on first use
+
+    Pooled connections belong to the event loop that opened them; drive
+    the engine from a single loop, e.g. through ``run_async``.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        return _async_engine
+
+    with _async_engine_lock:
+        if _async_engine is None:
+            engine = _create_async_engine(get_async_database_url())
+            _async_session_factory = async_sessionmaker(engine, sync_session_class=_PrimarySession)
+            _async_engine = engine
+    return _async_engine
+
+def _create_async_engine(url):
+    config = get_pool_config()
+    if url.get_backend_name() == 'sqlite':
+        engine = create_async_engine(url, pool_pre_ping=config['pool_pre_ping'])
+    else:
+        engine = create_async_engine(url, **config)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+def _replica_session_factory(replica):
+    """Async session factory for a read replica chosen by choose_replica()"""
+    factory = _async_replica_factories.get(replica['url'])
+    if factory is None:
+        with _async_engine_lock:
+            factory = _async_replica_factories.get(replica['url'])
+            if factory is None:
+                engine = _create_async_engine(_async_url(replica['database_url']))
+                factory = _async_replica_factories[replica['url']] = async_sessionmaker(engine)
+    return factory
+
+async def dispose_async_engine():
+    """Close all pooled connections and drop the process-wide async engine"""
+    global _async_engine, _async_session_factory
+    engine = _async_engine
+    with _async_engine_lock:
+        _async_engine = None
+        _async_session_factory = None
+        replica_factories = list(_async_replica_factories.values())
+        _async_replica_factories.clear()
+    if engine is not None:
+        await engine.dispose()
+    for factory in replica_factories:
+        await factory.kw['bind'].dispose()
+
+async def _in_context(coroutine, context):
+    # Carry the caller's context variables (e.g. the active query log) into the loop
+    for var, value in context.items():
+        var.set(value)
+    return await coroutine
+
+def run_async(coroutine):
+    """Run a coroutine on the process-wide background event loop and wait for it
+
+    Lets synchronous callers such as the Streamlit script reuse the async
+    engine's pool across reruns instead of starting a new loop each time.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+                _loop = loop
+    context = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_in_context(coroutine, context), _loop).result()
+
+def _call_bound(sync_session, method, args, kwargs, read_session=None):
+    with bind_session(sync_session, read_session):
+        return method(*args, **kwargs)
+
+async def _run_in_session(method, *args, **kwargs):
+    """Run a DatabaseOperations method on a fresh AsyncSession
+    
+    With read replicas configured, its get_read_session() calls get an
+    AsyncSession on the replica the sync layer would pick.
+    """
+    get_async_engine()
+    # Health checks may query the replicas, so pick one off the event loop
+    replica = await asyncio.to_thread(choose_replica) if replica_urls() else None
+    async with _async_session_factory() as session:
+        if replica is None:
+            return await session.run_sync(_call_bound, method, args, kwargs)
+        async with _replica_session_factory(replica)() as read_session:
+            return await session.run_sync(_call_bound, method, args, kwargs, read_session.sync_session)
+
+def _mirror(name, in_session=True):
+    """Coroutine wrapping DatabaseOperations.<name>
+
+    Cached reads skip the synchronous cache wrapper, whose single-flight
+    wait would block the event loop, and get the async one instead.
+    Methods that do not query through a session (buffer access) run in
+    the default executor.
+    """
+    method = getattr(DatabaseOperations, name)
+    options = getattr(method, 'cache_options', None)
+    load = method.__wrapped__ if options else method
+
+    if in_session:
+        async def wrapper(*args, **kwargs):
+            return await _run_in_session(load, *args, **kwargs)
+    else:
+        async def wrapper(*args, **kwargs):
+            return await asyncio.to_thread(load, *args, **kwargs)
+    functools.update_wrapper(wrapper, load)
+    wrapper.__qualname__ = f"AsyncDatabaseOperations.{name}"
+    if options:
+        wrapper = cached_read(**options)(wrapper)
+    return staticmethod(wrapper)
+
+class AsyncDatabaseOperations:
+    """Async database operations for the profile application"""
+
+    get_user_by_username = _mirror('get_user_by_username')
+    get_user_id = _mirror('get_user_id')
+    get_profile_data = _mirror('get_profile_data')
+    get_profile_page = _mirror('get_profile_page')
+    get_gallery_items = _mirror('get_gallery_items')
+    get_gallery_page = _mirror('get_gallery_page')
+    get_gallery_categories = _mirror('get_gallery_categories')
+    get_post_by_id = _mirror('get_post_by_id')
+    get_gallery_item_by_id = _mirror('get_gallery_item_by_id')
+    get_posts = _mirror('get_posts')
+    get_posts_page = _mirror('get_posts_page')
+    get_post_totals = _mirror('get_post_totals')
+    get_comments_for_posts = _mirror('get_comments_for_posts')
+    get_comments_page = _mirror('get_comments_page')
+    get_first_comment_pages = _mirror('get_first_comment_pages')
+    add_gallery_item = _mirror('add_gallery_item')
+    add_post = _mirror('add_post')
+    add_comment = _mirror('add_comment')
+    add_users_bulk = _mirror('add_users_bulk')
+    add_social_links_bulk = _mirror('add_social_links_bulk')
+    add_posts_bulk = _mirror('add_posts_bulk')
+    add_gallery_items_bulk = _mirror('add_gallery_items_bulk')
+    add_comments_bulk = _mirror('add_comments_bulk')
+    bulk_update_counters = _mirror('bulk_update_counters')
+    update_likes = _mirror('update_likes')
+    update_views = _mirror('update_views')
+    flush_counter_buffer = _mirror('flush_counter_buffer', in_session=False)
+    get_counter_buffer_stats = _mirror('get_counter_buffer_stats', in_session=False)
+    update_post = _mirror('update_post')
+    update_gallery_item = _mirror('update_gallery_item')
+    delete_post = _mirror('delete_post')
+    delete_gallery_item = _mirror('delete_gallery_item')
+    track_analytics = _mirror('track_analytics')
+    track_analytics_bulk = _mirror('track_analytics_bulk')
+    track_analytics_buffered = _mirror('track_analytics_buffered', in_session=False)
+    get_analytics_buffer_stats = _mirror('get_analytics_buffer_stats', in_session=False)
+    record_unique_views = _mirror('record_unique_views', in_session=False)
+    merge_viewer_sketches = _mirror('merge_viewer_sketches')
+    get_unique_viewers = _mirror('get_unique_viewers', in_session=False)
+    flush_viewer_buffer = _mirror('flush_viewer_buffer', in_session=False)
+    get_viewer_buffer_stats = _mirror('get_viewer_buffer_stats', in_session=False)
+    rebuild_analytics_rollups = _mirror('rebuild_analytics_rollups')
+    reconcile_engagement_totals = _mirror('reconcile_engagement_totals')
+    get_analytics_summary = _mirror('get_analytics_summary')
+    get_engagement_history = _mirror('get_engagement_history')
+    search_content = _mirror('search_content')
+    get_trending_hashtags = _mirror('get_trending_hashtags', in_session=False)
+
+    @staticmethod
+    async def get_comments_for_post(post_id):
+        """Get all comments for a specific post"""
+        comments = await AsyncDatabaseOperations.get_comments_for_posts([post_id])
+        return comments.get(post_id, [])
+
+    @staticmethod
+    async def load_profile_page(username='sonia.papi', posts_limit=10, gallery_limit=12, include_totals=True,
+                                comment_post_ids=(), comments_limit=10, analytics_days=7):
+        """Load the first profile page with every query running concurrently
+
+        Returns the same keys as DatabaseOperations.get_profile_page plus
+        'analytics_summary' and 'comment_pages' (first comment page of each
+        post in ``comment_post_ids``), or None if the profile does not exist.
+        As there, a limit of 0, include_totals=False or analytics_days=None
+        skips that part and returns None for it. The user's id is resolved
+        first (a cached lookup) so every part of the page belongs to the
+        same user.
+        """
+        user_id = await AsyncDatabaseOperations.get_user_id(username)
+        if user_id is None:
+            return None
+        parts = {'profile': AsyncDatabaseOperations.get_profile_data(username)}
+        if posts_limit:
+            parts['posts'] = AsyncDatabaseOperations.get_posts_page(user_id=user_id, limit=posts_limit)
+        if gallery_limit:
+            parts['gallery'] = AsyncDatabaseOperations.get_gallery_page(user_id=user_id, limit=gallery_limit)
+        if include_totals:
+            parts['post_totals'] = AsyncDatabaseOperations.get_post_totals(user_id)
+        if analytics_days:
+            parts['analytics_summary'] = AsyncDatabaseOperations.get_analytics_summary(user_id, days=analytics_days)
+        if comment_post_ids:
+            parts['comment_pages'] = AsyncDatabaseOperations.get_first_comment_pages(
+                list(comment_post_ids), limit=comments_limit
+            )
+        page = dict(zip(parts, await asyncio.gather(*parts.values())))
+        if page['profile'] is None:
+            return None
+        return {
+            'user_id': user_id,
+            'posts': None,
+            'gallery': None,
+            'post_totals': None,
+            'analytics_summary': None,
+            'comment_pages': {},
+            **page
+        }
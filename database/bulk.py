@@ -0,0 +1,122 @@
+"""Batched multi-row inserts that hand back the generated primary keys.
+
+Rows are consumed from any iterable in batches, so callers can stream
+large imports without building them in memory. Each batch is one
+INSERT ... VALUES list with RETURNING, ordered like the input. On
+PostgreSQL with psycopg2, batches of BULK_COPY_MIN_ROWS or more go
+through COPY instead; their ids are reserved from the table's sequence
+first so they can still be returned.
+"""
+from database.schema import _env_int
+from sqlalchemy import insert, text
+import io
+
+def _column_defaults(table):
+    """Python-side default for every non-key column (a value or a zero-arg callable)"""
+    defaults = {}
+    for column in table.columns:
+        if column.primary_key:
+            continue
+        default = column.default
+        if default is None:
+            defaults[column.name] = None
+        elif default.is_callable:
+            defaults[column.name] = lambda arg=default.arg: arg(None)
+        else:
+            defaults[column.name] = default.arg
+    return defaults
+
+def _complete_row(row, defaults):
+    # executemany needs every row to carry the same keys
+    complete = {}
+    for name, default in defaults.items():
+        if name in row:
+            complete[name] = row[name]
+        else:
+            complete[name] = default() if callable(default) else default
+    return complete
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _copy_batch(session, table, rows):
+    """COPY rows into a PostgreSQL table with ids reserved from its sequence"""
+    ids = session.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {'table': table.name, 'count': len(rows)}
+    ).scalars().all()
+    columns = ['id'] + list(rows[0])
+
+    data = io.StringIO()
+    for entity_id, row in zip(ids, rows):
+        data.write('\t'.join([str(entity_id)] + [_copy_value(row[name]) for name in columns[1:]]))
+        data.write('\n')
+    data.seek(0)
+
+    preparer = session.get_bind().dialect.identifier_preparer
+    statement = 'COPY {} ({}) FROM STDIN'.format(
+        preparer.format_table(table), ', '.join(preparer.quote(name) for name in columns)
+    )
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(statement, data)
+    finally:
+        cursor.close()
+    return ids
+
+def _insert_batch(session, table, rows, return_ids):
+    dialect = session.get_bind().dialect
+    if not return_ids:
+        session.execute(insert(table), rows)
+        return []
+    if dialect.name == 'sqlite' and dialect.insert_executemany_returning:
+        # SQLAlchemy would insert row by row to keep RETURNING in parameter
+        # order; SQLite hands out rowids in VALUES order anyway, so sort them
+        result = session.execute(insert(table).returning(table.c.id), rows)
+        return sorted(result.scalars().all())
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+        )
+        return result.scalars().all()
+    return [session.execute(insert(table).values(row)).inserted_primary_key[0] for row in rows]
+
+def bulk_insert(session, model, rows, return_ids=True, batch_size=None):
+    """Insert ``rows`` (dicts of column values) in batches without committing
+
+    Missing columns get their model defaults. Returns the new ids in input
+    order, or just the number of rows when ``return_ids`` is False.
+    """
+    table = model.__table__
+    defaults = _column_defaults(table)
+    batch_size = batch_size or _env_int('BULK_INSERT_BATCH_SIZE', 5000)
+    dialect = session.get_bind().dialect
+    use_copy = dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+    copy_min_rows = _env_int('BULK_COPY_MIN_ROWS', 1000)
+
+    ids = []
+    count = 0
+    batch = []
+
+    def write(batch):
+        if use_copy and len(batch) >= copy_min_rows:
+            new_ids = _copy_batch(session, table, batch)
+        else:
+            new_ids = _insert_batch(session, table, batch, return_ids)
+        if return_ids:
+            ids.extend(new_ids)
+
+    for row in rows:
+        batch.append(_complete_row(row, defaults))
+        if len(batch) >= batch_size:
+            write(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        write(batch)
+        count += len(batch)
+    return ids if return_ids else count
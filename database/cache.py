@@ -0,0 +1,248 @@
+"""Process-wide read-through cache for DatabaseOperations read methods.
+
+Entries expire after a TTL and the least recently used ones are evicted
+once the cache is full. Every entry carries tags such as ('post', 7) or
+('posts', 1); write methods invalidate the tags they touch, which drops
+exactly the entries built from the changed rows. Concurrent misses on the
+same key wait for a single load instead of each querying the database.
+"""
+from database.schema import _env_int, _env_bool, replica_lag_window
+from collections import OrderedDict
+import asyncio
+import copy
+import functools
+import inspect
+import os
+import threading
+import time
+
+class ReadCache:
+    """Thread-safe TTL + LRU cache with tag-based invalidation"""
+
+    def __init__(self, max_entries=1024, ttl=30.0, stale_window=0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Loads this soon after an invalidation may come from a lagging
+        # read replica, so they are returned but not stored
+        self.stale_window = stale_window
+        # Tag -> last invalidation time, oldest first; only the stale window is kept
+        self._invalidated_at = OrderedDict()
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        # Key -> (event, tags or None when derived from the value, tags
+        # invalidated while the load runs); all state lives only as long as the load
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _begin(self, key, tags):
+        """Return ('hit', value), ('wait', event) or ('load', event, invalidated)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return 'hit', copy.deepcopy(entry[1])
+            loading = self._loading.get(key)
+            if loading is not None:
+                return 'wait', loading[0]
+            in_progress, invalidated = threading.Event(), set()
+            self._loading[key] = (in_progress, None if callable(tags) else frozenset(tags), invalidated)
+            self._counters['misses'] += 1
+            return 'load', in_progress, invalidated
+
+    def _finish(self, key, in_progress, tags, invalidated, value=None, loaded=False):
+        with self._lock:
+            # Skip the store if the load failed or a write invalidated its tags mid-load
+            unchanged = False
+            if loaded:
+                # Tags derived from the value are checked once they are known
+                tags = tags(value) if callable(tags) else tags
+                unchanged = invalidated.isdisjoint(tags) and not self._recently_invalidated(tags)
+            if unchanged:
+                self._store(key, value, tags)
+            del self._loading[key]
+        in_progress.set()
+
+    def _recently_invalidated(self, tags):
+        """Whether any of ``tags`` was invalidated within the stale window"""
+        if not self.stale_window:
+            return False
+        cutoff = time.monotonic() - self.stale_window
+        self._prune_invalidated(cutoff)
+        return any(self._invalidated_at.get(tag, float('-inf')) > cutoff for tag in tags)
+
+    def _prune_invalidated(self, cutoff):
+        while self._invalidated_at and next(iter(self._invalidated_at.values())) <= cutoff:
+            self._invalidated_at.popitem(last=False)
+
+    def get_or_load(self, key, loader, tags):
+        """Return the cached value for ``key``, calling ``loader`` once on a miss
+        
+        ``tags`` is a list of tags, or a callable deriving them from the
+        loaded value when they are not known up front.
+        """
+        while True:
+            state = self._begin(key, tags)
+            if state[0] == 'hit':
+                return state[1]
+            if state[0] == 'load':
+                break
+            # Another caller is loading this key; wait for it and look again
+            state[1].wait()
+
+        _, in_progress, invalidated = state
+        value, loaded = None, False
+        try:
+            value = loader()
+            loaded = True
+            return copy.deepcopy(value)
+        finally:
+            self._finish(key, in_progress, tags, invalidated, value, loaded)
+
+    async def get_or_load_async(self, key, loader, tags):
+        """Coroutine variant of get_or_load; ``loader`` returns an awaitable
+        
+        Shares entries and in-flight loads with synchronous callers. Waiting
+        on another caller's load happens in the default executor so the
+        event loop is never blocked.
+        """
+        while True:
+            state = self._begin(key, tags)
+            if state[0] == 'hit':
+                return state[1]
+            if state[0] == 'load':
+                break
+            await asyncio.get_running_loop().run_in_executor(None, state[1].wait)
+
+        _, in_progress, invalidated = state
+        value, loaded = None, False
+        try:
+            value = await loader()
+            loaded = True
+            return copy.deepcopy(value)
+        finally:
+            self._finish(key, in_progress, tags, invalidated, value, loaded)
+
+    def _store(self, key, value, tags):
+        if key in self._entries:
+            self._forget(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            self._counters['evictions'] += 1
+
+    def _forget(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate(self, tags):
+        """Drop every entry carrying any of ``tags``"""
+        with self._lock:
+            now = time.monotonic()
+            if self.stale_window:
+                self._prune_invalidated(now - self.stale_window)
+            for tag in tags:
+                if self.stale_window:
+                    self._invalidated_at.pop(tag, None)
+                    self._invalidated_at[tag] = now
+                # Loads in flight that may have read the old rows must not be stored
+                for _, load_tags, invalidated in self._loading.values():
+                    if load_tags is None or tag in load_tags:
+                        invalidated.add(tag)
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._forget(key)
+                    self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+        return stats
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def cache_enabled():
+    return _env_bool('READ_CACHE_ENABLED', True)
+
+def get_read_cache():
+    """Return the process-wide cache configured from READ_CACHE_* variables"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReadCache(
+                    max_entries=_env_int('READ_CACHE_MAX_ENTRIES', 1024),
+                    ttl=float(os.getenv('READ_CACHE_TTL') or 30.0),
+                    stale_window=replica_lag_window()
+                )
+    return _cache
+
+def invalidate(tags):
+    """Invalidate cache tags after a committed write"""
+    if _cache is not None:
+        _cache.invalidate(tags)
+
+def cached_read(tags, after_load=None, name=None):
+    """Cache a read method, keyed by its bound arguments
+
+    ``tags`` maps the bound arguments to the invalidation tags of the
+    entry; it may instead return a callable that derives them from the
+    loaded value. ``after_load`` post-processes every returned copy,
+    cached or not, e.g. to merge in state that must never be cached.
+    Coroutine functions get an async wrapper; passing the ``name`` of a
+    synchronous method makes both share cache entries.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache_name = name or func.__qualname__
+
+        def bind(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                arg: tuple(value) if isinstance(value, (list, set, frozenset)) else value
+                for arg, value in bound.arguments.items()
+            }
+            return (cache_name,) + tuple(sorted(arguments.items())), tags(**arguments)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if cache_enabled():
+                    key, entry_tags = bind(args, kwargs)
+                    result = await get_read_cache().get_or_load_async(
+                        key, lambda: func(*args, **kwargs), entry_tags
+                    )
+                else:
+                    result = await func(*args, **kwargs)
+                return after_load(result) if after_load else result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if cache_enabled():
+                    key, entry_tags = bind(args, kwargs)
+                    result = get_read_cache().get_or_load(
+                        key, lambda: func(*args, **kwargs), entry_tags
+                    )
+                else:
+                    result = func(*args, **kwargs)
+                return after_load(result) if after_load else result
+
+        wrapper.cache_options = {'tags': tags, 'after_load': after_load, 'name': cache_name}
+        return wrapper
+    return decorator
@@ -0,0 +1,141 @@
+"""Coalescing buffer for hot like/view increments.
+
+Deltas are summed in memory per (counter, entity_type, entity_id) and
+written periodically as batched UPDATEs, so a trending post costs one
+write per flush interval instead of one transaction per click. Enable it
+with COUNTER_BUFFER_ENABLED=1.
+"""
+from database.schema import _env_bool
+import atexit
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class CounterBuffer:
+    """Pending counter deltas flushed in batches by a daemon thread"""
+
+    def __init__(self, writer, flush_interval=1.0):
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._counters = {
+            'increments': 0,
+            'flushed_rows': 0,
+            'flushes': 0,
+            'failed_flushes': 0
+        }
+
+    @classmethod
+    def from_env(cls, writer):
+        """Build a buffer configured from COUNTER_BUFFER_* environment variables"""
+        return cls(writer, flush_interval=float(os.getenv('COUNTER_BUFFER_FLUSH_INTERVAL') or 1.0))
+
+    def add(self, counter, entity_type, entity_id, delta):
+        """Record a delta to be written on the next flush"""
+        key = (counter, entity_type, entity_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + delta
+            self._counters['increments'] += 1
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name='counter-buffer', daemon=True)
+                self._thread.start()
+
+    def pending(self, counter, entity_type, entity_id):
+        """Delta not yet committed for one entity, including a flush in progress"""
+        key = (counter, entity_type, entity_id)
+        with self._lock:
+            return self._pending.get(key, 0) + self._in_flight.get(key, 0)
+
+    def merge_into(self, items, entity_type, counters=('likes', 'views')):
+        """Apply pending deltas to serialised rows that have 'id' and counter keys"""
+        with self._lock:
+            if not self._pending and not self._in_flight:
+                return items
+            for item in items:
+                for counter in counters:
+                    if counter not in item:
+                        continue
+                    key = (counter, entity_type, item['id'])
+                    delta = self._pending.get(key, 0) + self._in_flight.get(key, 0)
+                    if delta:
+                        item[counter] = max(0, item[counter] + delta)
+        return items
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write all pending deltas; returns the number of rows changed"""
+        with self._flush_lock:
+            with self._lock:
+                self._in_flight, self._pending = self._pending, {}
+                batch = self._in_flight
+            if not batch:
+                return 0
+
+            by_counter = {}
+            for (counter, entity_type, entity_id), delta in batch.items():
+                if delta:
+                    by_counter.setdefault(counter, []).append((entity_type, entity_id, delta))
+            # Each counter is written in its own transaction; track which committed
+            written = set()
+            try:
+                for counter, changes in by_counter.items():
+                    self.writer(changes, counter)
+                    written.add(counter)
+            except Exception:
+                logger.exception('Failed to flush %d counter deltas', len(batch))
+                with self._lock:
+                    # Keep the unwritten deltas so the next flush retries them
+                    for key, delta in batch.items():
+                        if key[0] not in written:
+                            self._pending[key] = self._pending.get(key, 0) + delta
+                    self._in_flight = {}
+                    self._counters['failed_flushes'] += 1
+                    flushed = sum(1 for key in batch if key[0] in written)
+                    self._counters['flushed_rows'] += flushed
+                return flushed
+
+            with self._lock:
+                self._in_flight = {}
+                self._counters['flushes'] += 1
+                self._counters['flushed_rows'] += len(batch)
+            return len(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the background thread and flush the remaining deltas"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Return the number of pending keys and lifetime counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pending_keys'] = len(self._pending)
+        return stats
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def counter_buffer_enabled():
+    return _env_bool('COUNTER_BUFFER_ENABLED', False)
+
+def get_counter_buffer(writer):
+    """Return the process-wide buffer, creating it on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = CounterBuffer.from_env(writer)
+                atexit.register(_buffer.stop)
+    return _buffer
@@ -0,0 +1,165 @@
+"""Vectorized engagement analytics over pandas/NumPy frames.
+
+Posts and gallery items for one user are loaded with column-only
+selects into typed DataFrames (int64 counters, categorical labels,
+datetime64 timestamps) and kept in the read cache under the same tags as
+the other reads, so writes invalidate them and reruns reuse them. Every statistic is then computed on whole columns
+(NumPy reductions and bincounts rather than Python loops): engagement
+rate, per-type and per-category breakdowns, percentiles and rolling
+windows.
+"""
+from database.schema import Post, GalleryItem, Comment, get_read_session
+from database.cache import cached_read
+from datetime import datetime
+from sqlalchemy import func, select
+import numpy as np
+import pandas as pd
+
+ENGAGEMENT_COLUMNS = ['likes', 'comments', 'shares']
+
+def _frame(rows, dtypes):
+    """Typed DataFrame from result rows, columns in ``dtypes`` order"""
+    frame = pd.DataFrame.from_records(rows, columns=list(dtypes), coerce_float=False)
+    counters = [name for name, dtype in dtypes.items() if dtype == 'int64']
+    frame[counters] = frame[counters].fillna(0)
+    return frame.astype(dtypes)
+
+@cached_read(lambda user_id: [('posts', user_id)])
+def load_post_frame(user_id):
+    """One row per post of the user with its counters, comment count and engagement"""
+    session = get_read_session()
+    try:
+        connection = session.connection()
+        rows = connection.execute(
+            select(Post.id, Post.post_type, Post.media_type, Post.likes, Post.shares, Post.views, Post.timestamp)
+            .where(Post.user_id == user_id)
+        ).all()
+        comment_counts = connection.execute(
+            select(Comment.post_id, func.count(Comment.id))
+            .join(Post, Post.id == Comment.post_id)
+            .where(Post.user_id == user_id)
+            .group_by(Comment.post_id)
+        ).all()
+    finally:
+        session.close()
+
+    posts = _frame(rows, {
+        'id': 'int64', 'post_type': 'category', 'media_type': 'category', 'likes': 'int64',
+        'shares': 'int64', 'views': 'int64', 'timestamp': 'datetime64[ns]'
+    })
+    counts = _frame(comment_counts, {'id': 'int64', 'comments': 'int64'})
+    comments = posts['id'].map(counts.set_index('id')['comments']).fillna(0).astype('int64')
+    posts.insert(4, 'comments', comments)
+    posts['engagement'] = posts[ENGAGEMENT_COLUMNS].sum(axis=1)
+    return posts
+
+@cached_read(lambda user_id: [('gallery', user_id)])
+def load_gallery_frame(user_id):
+    """One row per gallery item of the user with its counters"""
+    session = get_read_session()
+    try:
+        rows = session.connection().execute(
+            select(GalleryItem.id, GalleryItem.item_type, GalleryItem.category,
+                   GalleryItem.likes, GalleryItem.views, GalleryItem.upload_date)
+            .where(GalleryItem.user_id == user_id)
+        ).all()
+    finally:
+        session.close()
+    return _frame(rows, {
+        'id': 'int64', 'item_type': 'category', 'category': 'category', 'likes': 'int64',
+        'views': 'int64', 'upload_date': 'datetime64[ns]'
+    })
+
+def _rate(engagement, views):
+    """Engagement as a percentage of views, 0 where there are no views"""
+    engagement = np.asarray(engagement, dtype='float64')
+    views = np.asarray(views, dtype='float64')
+    return np.divide(engagement * 100, views, out=np.zeros_like(engagement), where=views > 0)
+
+def engagement_totals(posts):
+    """Summed likes, comments, shares and views with the overall engagement rate"""
+    likes, comments, shares, views = (
+        posts[['likes', 'comments', 'shares', 'views']].to_numpy(dtype='int64').sum(axis=0)
+        if len(posts) else (0, 0, 0, 0)
+    )
+    return {
+        'total_likes': int(likes),
+        'total_comments': int(comments),
+        'total_shares': int(shares),
+        'total_views': int(views),
+        'avg_engagement_rate': float(_rate(likes + comments + shares, views))
+    }
+
+def breakdown(frame, by, metrics):
+    """Count, summed ``metrics`` and engagement rate per value of ``by``"""
+    column = frame[by]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, labels = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, labels = pd.factorize(column, sort=True)
+    # Rows without a value (code -1) land in bucket 0, which is dropped as in groupby
+    codes = codes + 1
+    grouped = pd.DataFrame(
+        {'items': np.bincount(codes, minlength=len(labels) + 1)[1:]},
+        index=pd.Index(labels, name=by)
+    )
+    for name in metrics:
+        values = frame[name].to_numpy(dtype='int64')
+        grouped[name] = np.bincount(codes, weights=values, minlength=len(labels) + 1)[1:].astype('int64')
+    engaged = [name for name in metrics if name != 'views']
+    grouped['engagement_rate'] = _rate(grouped[engaged].to_numpy().sum(axis=1), grouped['views'])
+    return grouped.sort_values('items', ascending=False)
+
+def engagement_percentiles(posts, percentiles=(50, 90, 99)):
+    """Percentiles of per-post engagement (likes + comments + shares) and engagement rate"""
+    index = [f"p{p}" for p in percentiles]
+    if not len(posts):
+        return pd.DataFrame(0.0, index=index, columns=['engagement', 'engagement_rate'])
+    return pd.DataFrame({
+        'engagement': np.percentile(posts['engagement'].to_numpy(), percentiles),
+        'engagement_rate': np.percentile(_rate(posts['engagement'], posts['views']), percentiles)
+    }, index=index)
+
+def rolling_engagement(posts, days=30, windows=(7, 30)):
+    """Daily engagement of posts published in the last ``days`` days with rolling sums
+
+    Rolling windows reach back before the reporting window, so the first
+    days already cover a full window.
+    """
+    end = pd.Timestamp(datetime.utcnow().date())
+    history = max(windows) - 1
+    start = end - pd.Timedelta(days=days - 1 + history)
+    length = days + history
+    timestamps = posts['timestamp'].to_numpy()
+    recent = (timestamps >= start.to_datetime64()) & (timestamps < (end + pd.Timedelta(days=1)).to_datetime64())
+    offsets = (timestamps[recent] - start.to_datetime64()) // np.timedelta64(1, 'D')
+
+    def per_day(weights=None):
+        return np.bincount(offsets, weights=weights, minlength=length).astype('int64')
+
+    daily = pd.DataFrame({
+        'posts': per_day(),
+        'engagement': per_day(posts['engagement'].to_numpy()[recent]),
+        'views': per_day(posts['views'].to_numpy()[recent])
+    }, index=pd.date_range(start, periods=length, freq='D', name='day'))
+    for window in windows:
+        daily[f"engagement_{window}d"] = daily['engagement'].rolling(window, min_periods=1).sum().astype('int64')
+    return daily.iloc[history:]
+
+@cached_read(lambda user_id, **_: [('posts', user_id), ('gallery', user_id)])
+def engagement_report(user_id, days=30):
+    """Everything the engagement dashboard shows, computed from the cached frames
+
+    The report is cached too, so reruns without writes skip the compute;
+    after a write only the invalidated frame is reloaded.
+    """
+    posts = load_post_frame(user_id)
+    gallery = load_gallery_frame(user_id)
+    return {
+        'totals': engagement_totals(posts),
+        'by_post_type': breakdown(posts, 'post_type', ENGAGEMENT_COLUMNS + ['views']),
+        'by_media_type': breakdown(posts, 'media_type', ENGAGEMENT_COLUMNS + ['views']),
+        'by_category': breakdown(gallery, 'category', ['likes', 'views']),
+        'percentiles': engagement_percentiles(posts),
+        'daily': rolling_engagement(posts, days=days)
+    }
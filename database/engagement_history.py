@@ -0,0 +1,170 @@
+"""Periodic snapshots of post and user engagement counters.
+
+Each snapshot walks posts (likes, comments, shares, views) and the
+per-user totals in user_engagement_totals in batches of
+BULK_INSERT_BATCH_SIZE ids, compares every batch with the matching rows
+of engagement_latest (each entity's most recent snapshot), and writes a
+row to engagement_snapshots only for the entities whose counters
+changed, so the history grows with the rate of change rather than the
+number of posts. Rows are stamped with the start of the current
+ENGAGEMENT_SNAPSHOT_INTERVAL, and a second snapshot within the same
+interval overwrites rather than duplicates.
+
+Week-over-week deltas and sparklines then read the history with range
+queries on its primary key. Snapshots run from cron, once per interval:
+
+    python -m database.engagement_history
+"""
+from database.schema import Post, Comment, EngagementSnapshot, EngagementLatest, UserEngagementTotals, _env_int, get_session
+from database.upsert import replace_upsert
+from database.cache import invalidate
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, func, select, tuple_
+
+COUNTERS = ['likes', 'comments', 'shares', 'views']
+
+def snapshot_interval():
+    return _env_int('ENGAGEMENT_SNAPSHOT_INTERVAL', 3600)
+
+def snapshot_bucket(moment, interval=None):
+    """Start of the snapshot interval containing ``moment``"""
+    interval = interval or snapshot_interval() or 3600
+    seconds = int((moment - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds - seconds % interval)
+
+def _post_counters(session, low, high):
+    """Live counters of the posts with ids in [low, high)"""
+    comment_counts = (
+        select(Comment.post_id, func.count(Comment.id).label('comments'))
+        .where(Comment.post_id >= low, Comment.post_id < high)
+        .group_by(Comment.post_id)
+        .subquery()
+    )
+    return session.connection().execute(
+        select(Post.id, Post.likes, func.coalesce(comment_counts.c.comments, 0), Post.shares, Post.views)
+        .outerjoin(comment_counts, comment_counts.c.post_id == Post.id)
+        .where(Post.id >= low, Post.id < high)
+    ).all()
+
+def _user_counters(session, low, high):
+    """Summed post counters of the users with ids in [low, high)"""
+    totals = UserEngagementTotals
+    return session.connection().execute(
+        select(totals.user_id, totals.likes, totals.comments, totals.shares, totals.views)
+        .where(totals.user_id >= low, totals.user_id < high)
+    ).all()
+
+# Entity type -> (id column of its live counters, reader of one id range)
+SOURCES = {
+    'post': (Post.id, _post_counters),
+    'user': (UserEngagementTotals.user_id, _user_counters)
+}
+
+def _next_id(session, entity_type, after):
+    """Smallest id >= ``after`` among the live entities and the latest snapshots of a type"""
+    id_column = SOURCES[entity_type][0]
+    live = session.query(func.min(id_column)).filter(id_column >= after).scalar()
+    latest = session.query(func.min(EngagementLatest.entity_id)).filter(
+        EngagementLatest.entity_type == entity_type, EngagementLatest.entity_id >= after
+    ).scalar()
+    candidates = [value for value in (live, latest) if value is not None]
+    return min(candidates) if candidates else None
+
+def _snapshot_range(session, entity_type, low, high, taken_at):
+    """Snapshot one id range of one entity type; returns the number of history rows written"""
+    current = {row[0]: tuple(int(value or 0) for value in row[1:]) for row in SOURCES[entity_type][1](session, low, high)}
+    latest = {
+        row[0]: tuple(row[1:])
+        for row in session.query(
+            EngagementLatest.entity_id, *[getattr(EngagementLatest, name) for name in COUNTERS]
+        ).filter(
+            EngagementLatest.entity_type == entity_type,
+            EngagementLatest.entity_id >= low,
+            EngagementLatest.entity_id < high
+        )
+    }
+    zeros = (0,) * len(COUNTERS)
+    records = []
+    for entity_id in sorted(current.keys() | latest.keys()):
+        # An entity without a snapshot counts as all zeros, as does one that was deleted
+        counters = current.get(entity_id, zeros)
+        if counters != latest.get(entity_id, zeros):
+            records.append(dict(zip(COUNTERS, counters), entity_type=entity_type, entity_id=entity_id, taken_at=taken_at))
+    if not records:
+        return 0
+
+    replace_upsert(
+        session, EngagementSnapshot, records,
+        key_columns=['entity_type', 'entity_id', 'taken_at'], value_columns=COUNTERS
+    )
+    replace_upsert(
+        session, EngagementLatest, [record for record in records if record['entity_id'] in current],
+        key_columns=['entity_type', 'entity_id'], value_columns=COUNTERS + ['taken_at']
+    )
+    gone = [record['entity_id'] for record in records if record['entity_id'] not in current]
+    if gone:
+        # Deleted entities got their final row of zeros; stop tracking them
+        session.execute(delete(EngagementLatest).where(
+            EngagementLatest.entity_type == entity_type, EngagementLatest.entity_id.in_(gone)
+        ))
+    return len(records)
+
+def take_snapshot(now=None):
+    """Write a snapshot row for every post and user whose counters changed
+
+    Deleted posts, and users whose posts are all gone, get one final row
+    of zeros. Each id range commits on its own. Returns the number of
+    rows written.
+    """
+    taken_at = snapshot_bucket(now or datetime.utcnow())
+    batch_size = _env_int('BULK_INSERT_BATCH_SIZE', 5000)
+    written = 0
+    session = get_session()
+    try:
+        for entity_type in SOURCES:
+            low = _next_id(session, entity_type, 0)
+            while low is not None:
+                written += _snapshot_range(session, entity_type, low, low + batch_size, taken_at)
+                session.commit()
+                low = _next_id(session, entity_type, low + batch_size)
+        if written:
+            invalidate([('engagement_history',)])
+        return written
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def rebuild_latest_snapshots():
+    """Fill engagement_latest from the history; run once when the table is created"""
+    snapshot = EngagementSnapshot.__table__
+    latest = select(
+        snapshot.c.entity_type, snapshot.c.entity_id, func.max(snapshot.c.taken_at).label('taken_at')
+    ).group_by(snapshot.c.entity_type, snapshot.c.entity_id).subquery()
+    rows = (
+        select(snapshot.c.entity_type, snapshot.c.entity_id, snapshot.c.taken_at, *[snapshot.c[name] for name in COUNTERS])
+        .join(latest, and_(
+            snapshot.c.entity_type == latest.c.entity_type,
+            snapshot.c.entity_id == latest.c.entity_id,
+            snapshot.c.taken_at == latest.c.taken_at
+        ))
+        # Entities whose last row is all zeros were deleted
+        .where(tuple_(*[snapshot.c[name] for name in COUNTERS]) != tuple_(*([0] * len(COUNTERS))))
+    )
+    session = get_session()
+    try:
+        session.execute(delete(EngagementLatest))
+        session.execute(EngagementLatest.__table__.insert().from_select(
+            ['entity_type', 'entity_id', 'taken_at'] + COUNTERS, rows
+        ))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    count = take_snapshot()
+    print(f"Engagement snapshot written: {count} changed rows")
@@ -1,14 +1,119 @@
-from database.schema import User, SocialLink, Post, GalleryItem, Comment, Analytics, get_session
-from datetime import datetime
-from sqlalchemy import desc, func
+from database.schema import User, SocialLink, Post, GalleryItem, Comment, Analytics, AnalyticsDailyRollup, EngagementSnapshot, UserEngagementTotals, UniqueViewerSketch, _env_int, get_session, get_read_session
+from database.upsert import increment_upsert, insert_missing, replace_upsert
+from database.bulk import bulk_insert
+from database.search import search
+from database.analytics_buffer import get_analytics_buffer
+from database.counter_buffer import counter_buffer_enabled, get_counter_buffer
+from database.cache import cached_read, invalidate
+from database.analytics_storage import archived_event_counts
+from database.trending import get_trending, record_caption_edit
+from database.unique_viewers import ENTITY_TYPES as VIEWER_ENTITY_TYPES, HyperLogLog, get_viewer_buffer, viewer_precision
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import desc, func, insert, update, select, case, tuple_
+from sqlalchemy.engine import Row
+
+# Columns of UserEngagementTotals, all summed over a user's posts
+ENGAGEMENT_TOTALS = ['posts', 'likes', 'comments', 'shares', 'views']
+
+# Models that carry each engagement counter, keyed by entity type
+COUNTER_MODELS = {
+    'likes': {'post': Post, 'gallery': GalleryItem, 'comment': Comment},
+    'views': {'post': Post, 'gallery': GalleryItem}
+}
+
+def _post_tags(post_id, user_id):
+    """Cache tags touched by a change to one post"""
+    return [('post', post_id), ('posts', user_id), ('posts', None)]
+
+def _gallery_tags(item_id, user_id):
+    """Cache tags touched by a change to one gallery item"""
+    return [('gallery_item', item_id), ('gallery', user_id), ('gallery', None)]
+
+def _collect(rows, column, values):
+    """Yield rows unchanged, recording their ``column`` values in ``values``"""
+    for row in rows:
+        values.add(row[column])
+        yield row
+
+def _count_by(rows, column, counts):
+    """Yield rows unchanged, counting them per ``column`` value in ``counts``"""
+    for row in rows:
+        counts[row[column]] += 1
+        yield row
+
+def _tally(posts, totals):
+    """Yield post rows unchanged, adding them to per-user engagement ``totals``"""
+    for row in posts:
+        user_totals = totals[row['user_id']]
+        user_totals['posts'] += 1
+        for counter in ('likes', 'shares', 'views'):
+            user_totals[counter] += row.get(counter) or 0
+        yield row
+
+def _with_pending(entity_type):
+    """Cache post-processor merging buffered like/view deltas into a read result"""
+    return lambda result: DatabaseOperations._with_pending_counts(result, entity_type)
 
 class DatabaseOperations:
     """Database operations for the profile application"""
     
+    @staticmethod
+    def _comment_counts(session, post_ids):
+        """Count comments for many posts with a single grouped query"""
+        if not post_ids:
+            return {}
+        rows = session.query(Comment.post_id, func.count(Comment.id)).filter(
+            Comment.post_id.in_(post_ids)
+        ).group_by(Comment.post_id).all()
+        return {post_id: count for post_id, count in rows}
+    
+    @staticmethod
+    def _counter_buffer():
+        """The process-wide counter buffer, or None when buffering is disabled"""
+        if counter_buffer_enabled():
+            return get_counter_buffer(DatabaseOperations.bulk_update_counters)
+        return None
+    
+    @staticmethod
+    def _with_pending_counts(result, entity_type):
+        """Merge like/view deltas that are still buffered into a read result
+        
+        Handles a list of rows, a single row, a page dict and dicts of those
+        keyed by id.
+        """
+        buffer = DatabaseOperations._counter_buffer()
+        if not buffer or not result:
+            return result
+        if isinstance(result, list):
+            buffer.merge_into(result, entity_type)
+        elif 'items' in result:
+            buffer.merge_into(result['items'], entity_type)
+        elif 'id' in result:
+            buffer.merge_into([result], entity_type)
+        else:
+            for value in result.values():
+                DatabaseOperations._with_pending_counts(value, entity_type)
+        return result
+    
+    @staticmethod
+    def _post_to_dict(post, comment_count):
+        return {
+            'id': post.id,
+            'caption': post.caption,
+            'type': post.post_type,
+            'media_type': post.media_type,
+            'likes': post.likes,
+            'comments': comment_count,
+            'shares': post.shares,
+            'views': post.views,
+            'timestamp': post.timestamp
+        }
+    
     @staticmethod
     def get_user_by_username(username):
         """Get user by username"""
-        session = get_session()
+        session = get_read_session()
         try:
             user = session.query(User).filter_by(username=username).first()
             return user
@@ -16,41 +121,159 @@ class DatabaseOperations:
             session.close()
     
     @staticmethod
+    @cached_read(lambda username: [('profile', username)])
+    def get_user_id(username):
+        """Get the id of the user with this username, or None"""
+        session = get_read_session()
+        try:
+            return session.query(User.id).filter_by(username=username).scalar()
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _profile_to_dict(user, social_links):
+        return {
+            'name': user.name,
+            'username': user.username,
+            'bio': user.bio,
+            'followers': user.followers,
+            'following': user.following,
+            'location': user.location,
+            'joined_date': user.joined_date.strftime('%Y-%m-%d') if user.joined_date else '',
+            'verification_status': user.verification_status,
+            'social_links': {link.platform: link.url for link in social_links},
+            'contact': {
+                'email': user.email,
+                'phone': user.phone,
+                'location': user.location,
+                'website': user.website
+            }
+        }
+    
+    @staticmethod
+    @cached_read(lambda username, **_: [('profile', username)])
     def get_profile_data(username='sonia.papi'):
         """Get complete profile data for a user"""
-        session = get_session()
+        session = get_read_session()
         try:
             user = session.query(User).filter_by(username=username).first()
             if not user:
                 return None
             
             social_links = session.query(SocialLink).filter_by(user_id=user.id).all()
+            return DatabaseOperations._profile_to_dict(user, social_links)
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda username, **_: lambda page: [('profile', username)] + (
+        [('posts', page['user_id']), ('gallery', page['user_id'])] if page else []
+    ), after_load=lambda page: page and {
+        **page,
+        'posts': _with_pending('post')(page['posts']),
+        'gallery': _with_pending('gallery')(page['gallery'])
+    })
+    def get_profile_page(username='sonia.papi', posts_limit=10, gallery_limit=12, include_totals=True):
+        """Load everything the first profile page shows in one session
+        
+        Returns the profile (with social links), the first page of posts with
+        comment counts, the first page of gallery items and the post totals,
+        using four statements. A limit of 0 or include_totals=False skips
+        that part's statement and returns None for it.
+        """
+        session = get_read_session()
+        try:
+            rows = session.query(User, SocialLink).outerjoin(
+                SocialLink, SocialLink.user_id == User.id
+            ).filter(User.username == username).all()
+            if not rows:
+                return None
+            user = rows[0][0]
+            social_links = [link for _, link in rows if link is not None]
             
-            profile = {
-                'name': user.name,
-                'username': user.username,
-                'bio': user.bio,
-                'followers': user.followers,
-                'following': user.following,
-                'location': user.location,
-                'joined_date': user.joined_date.strftime('%Y-%m-%d') if user.joined_date else '',
-                'verification_status': user.verification_status,
-                'social_links': {link.platform: link.url for link in social_links},
-                'contact': {
-                    'email': user.email,
-                    'phone': user.phone,
-                    'location': user.location,
-                    'website': user.website
-                }
+            page = {
+                'user_id': user.id,
+                'profile': DatabaseOperations._profile_to_dict(user, social_links),
+                'posts': None,
+                'gallery': None,
+                'post_totals': None
             }
-            return profile
+            if posts_limit:
+                comment_count = select(func.count(Comment.id)).where(
+                    Comment.post_id == Post.id
+                ).scalar_subquery()
+                posts, posts_cursor = DatabaseOperations._keyset_page(
+                    session.query(Post, comment_count).filter(Post.user_id == user.id),
+                    Post.timestamp, Post.id, None, posts_limit
+                )
+                page['posts'] = {
+                    'items': [DatabaseOperations._post_to_dict(post, count) for post, count in posts],
+                    'next_cursor': posts_cursor
+                }
+            if gallery_limit:
+                items, gallery_cursor = DatabaseOperations._keyset_page(
+                    session.query(GalleryItem).filter(GalleryItem.user_id == user.id),
+                    GalleryItem.upload_date, GalleryItem.id, None, gallery_limit
+                )
+                page['gallery'] = {
+                    'items': [DatabaseOperations._gallery_item_to_dict(item) for item in items],
+                    'next_cursor': gallery_cursor
+                }
+            if include_totals:
+                page['post_totals'] = DatabaseOperations._post_totals(session, user.id)
+            return page
         finally:
             session.close()
     
     @staticmethod
+    def _gallery_item_to_dict(item):
+        return {
+            'id': item.id,
+            'title': item.title,
+            'type': item.item_type,
+            'category': item.category,
+            'description': item.description,
+            'likes': item.likes,
+            'views': item.views,
+            'upload_date': item.upload_date.strftime('%Y-%m-%d') if item.upload_date else ''
+        }
+    
+    @staticmethod
+    def _encode_cursor(sort_value, entity_id):
+        return f"{sort_value.isoformat()}|{entity_id}"
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        sort_value, entity_id = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(sort_value), int(entity_id)
+    
+    @staticmethod
+    def _keyset_page(query, sort_column, id_column, cursor, limit):
+        """Fetch one page newest-first, keyed on (sort_column, id) after ``cursor``
+        
+        Returns the rows and the cursor for the following page (None on the
+        last page).
+        """
+        if cursor:
+            sort_value, entity_id = DatabaseOperations._decode_cursor(cursor)
+            query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, entity_id))
+        rows = query.order_by(desc(sort_column), desc(id_column)).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            last_entity = last[0] if isinstance(last, Row) else last
+            next_cursor = DatabaseOperations._encode_cursor(
+                getattr(last_entity, sort_column.key), getattr(last_entity, id_column.key)
+            )
+        return rows, next_cursor
+    
+    @staticmethod
+    @cached_read(lambda user_id, **_: [('gallery', user_id)], after_load=_with_pending('gallery'))
     def get_gallery_items(user_id=None, category=None):
         """Get gallery items with optional filtering"""
-        session = get_session()
+        session = get_read_session()
         try:
             query = session.query(GalleryItem)
             if user_id:
@@ -58,120 +281,248 @@ class DatabaseOperations:
             if category:
                 query = query.filter_by(category=category)
             
-            items = query.order_by(desc(GalleryItem.upload_date)).all()
+            items = query.order_by(desc(GalleryItem.upload_date), desc(GalleryItem.id)).all()
             
-            gallery_data = []
-            for item in items:
-                gallery_data.append({
-                    'id': item.id,
-                    'title': item.title,
-                    'type': item.item_type,
-                    'category': item.category,
-                    'description': item.description,
-                    'likes': item.likes,
-                    'views': item.views,
-                    'upload_date': item.upload_date.strftime('%Y-%m-%d') if item.upload_date else ''
-                })
-            return gallery_data
+            return [DatabaseOperations._gallery_item_to_dict(item) for item in items]
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda user_id, **_: [('gallery', user_id)], after_load=_with_pending('gallery'))
+    def get_gallery_page(user_id=None, category=None, cursor=None, limit=12):
+        """Get one page of gallery items, newest first, with the cursor for the next page"""
+        session = get_read_session()
+        try:
+            query = session.query(GalleryItem)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+            if category:
+                query = query.filter_by(category=category)
+            
+            items, next_cursor = DatabaseOperations._keyset_page(
+                query, GalleryItem.upload_date, GalleryItem.id, cursor, limit
+            )
+            gallery_data = [DatabaseOperations._gallery_item_to_dict(item) for item in items]
+            return {
+                'items': gallery_data,
+                'next_cursor': next_cursor
+            }
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda user_id, **_: [('gallery', user_id)])
+    def get_gallery_categories(user_id=None):
+        """Get gallery item counts per category, sorted by category name"""
+        session = get_read_session()
+        try:
+            query = session.query(GalleryItem.category, func.count(GalleryItem.id))
+            if user_id:
+                query = query.filter(GalleryItem.user_id == user_id)
+            rows = query.group_by(GalleryItem.category).order_by(GalleryItem.category).all()
+            return {category: count for category, count in rows}
         finally:
             session.close()
     
     @staticmethod
+    @cached_read(lambda post_id: [('post', post_id), ('comments', post_id)], after_load=_with_pending('post'))
     def get_post_by_id(post_id):
         """Get a single post by ID"""
-        session = get_session()
+        session = get_read_session()
         try:
             post = session.query(Post).filter_by(id=post_id).first()
             if post:
-                comment_count = session.query(Comment).filter_by(post_id=post.id).count()
-                return {
-                    'id': post.id,
-                    'caption': post.caption,
-                    'type': post.post_type,
-                    'media_type': post.media_type,
-                    'likes': post.likes,
-                    'comments': comment_count,
-                    'shares': post.shares,
-                    'views': post.views,
-                    'timestamp': post.timestamp
-                }
+                comment_counts = DatabaseOperations._comment_counts(session, [post.id])
+                return DatabaseOperations._post_to_dict(post, comment_counts.get(post.id, 0))
             return None
         finally:
             session.close()
     
     @staticmethod
+    @cached_read(lambda item_id: [('gallery_item', item_id)], after_load=_with_pending('gallery'))
     def get_gallery_item_by_id(item_id):
         """Get a single gallery item by ID"""
-        session = get_session()
+        session = get_read_session()
         try:
             item = session.query(GalleryItem).filter_by(id=item_id).first()
             if item:
-                return {
-                    'id': item.id,
-                    'title': item.title,
-                    'type': item.item_type,
-                    'category': item.category,
-                    'description': item.description,
-                    'likes': item.likes,
-                    'views': item.views,
-                    'upload_date': item.upload_date.strftime('%Y-%m-%d') if item.upload_date else ''
-                }
+                return DatabaseOperations._gallery_item_to_dict(item)
             return None
         finally:
             session.close()
     
     @staticmethod
+    @cached_read(lambda user_id, **_: [('posts', user_id)], after_load=_with_pending('post'))
     def get_posts(user_id=None, limit=None):
         """Get posts with optional filtering"""
-        session = get_session()
+        session = get_read_session()
         try:
             query = session.query(Post)
             if user_id:
                 query = query.filter_by(user_id=user_id)
             
-            query = query.order_by(desc(Post.timestamp))
+            query = query.order_by(desc(Post.timestamp), desc(Post.id))
             
             if limit:
                 query = query.limit(limit)
             
             posts = query.all()
+            comment_counts = DatabaseOperations._comment_counts(session, [post.id for post in posts])
             
-            posts_data = []
-            for post in posts:
-                comment_count = session.query(Comment).filter_by(post_id=post.id).count()
-                posts_data.append({
-                    'id': post.id,
-                    'caption': post.caption,
-                    'type': post.post_type,
-                    'media_type': post.media_type,
-                    'likes': post.likes,
-                    'comments': comment_count,
-                    'shares': post.shares,
-                    'views': post.views,
-                    'timestamp': post.timestamp
-                })
-            return posts_data
+            return [
+                DatabaseOperations._post_to_dict(post, comment_counts.get(post.id, 0))
+                for post in posts
+            ]
         finally:
             session.close()
     
+    @staticmethod
+    @cached_read(lambda user_id, **_: [('posts', user_id)], after_load=_with_pending('post'))
+    def get_posts_page(user_id=None, cursor=None, limit=10):
+        """Get one page of posts, newest first, with the cursor for the next page"""
+        session = get_read_session()
+        try:
+            query = session.query(Post)
+            if user_id:
+                query = query.filter_by(user_id=user_id)
+            
+            posts, next_cursor = DatabaseOperations._keyset_page(
+                query, Post.timestamp, Post.id, cursor, limit
+            )
+            comment_counts = DatabaseOperations._comment_counts(session, [post.id for post in posts])
+            posts_data = [
+                DatabaseOperations._post_to_dict(post, comment_counts.get(post.id, 0))
+                for post in posts
+            ]
+            return {
+                'items': posts_data,
+                'next_cursor': next_cursor
+            }
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _post_totals(session, user_id):
+        totals = session.get(UserEngagementTotals, user_id)
+        return {column: getattr(totals, column) if totals else 0 for column in ENGAGEMENT_TOTALS}
+    
+    @staticmethod
+    def _bump_engagement_totals(session, deltas):
+        """Add {user_id: {column: delta}} onto the per-user engagement totals"""
+        increment_upsert(
+            session,
+            UserEngagementTotals,
+            [
+                {'user_id': user_id, **{column: changes.get(column, 0) for column in ENGAGEMENT_TOTALS}}
+                for user_id, changes in deltas.items()
+                if user_id is not None and any(changes.values())
+            ],
+            key_columns=['user_id'],
+            counter_columns=ENGAGEMENT_TOTALS
+        )
+    
+    @staticmethod
+    @cached_read(lambda user_id: [('posts', user_id)])
+    def get_post_totals(user_id):
+        """Get post count and summed likes, comments, shares and views for a user (one key lookup)"""
+        session = get_read_session()
+        try:
+            return DatabaseOperations._post_totals(session, user_id)
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _comment_to_dict(comment, user):
+        return {
+            'id': comment.id,
+            'content': comment.content,
+            'user_name': user.name if user else 'Unknown',
+            'user_username': user.username if user else 'unknown',
+            'timestamp': comment.timestamp,
+            'likes': comment.likes
+        }
+    
+    @staticmethod
+    def _comments_with_authors(session):
+        return session.query(Comment, User).outerjoin(User, User.id == Comment.user_id)
+    
     @staticmethod
     def get_comments_for_post(post_id):
         """Get all comments for a specific post"""
-        session = get_session()
+        return DatabaseOperations.get_comments_for_posts([post_id]).get(post_id, [])
+    
+    @staticmethod
+    @cached_read(lambda post_ids: [('comments', post_id) for post_id in post_ids], after_load=_with_pending('comment'))
+    def get_comments_for_posts(post_ids):
+        """Get comments for several posts in one query, keyed by post id"""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        session = get_read_session()
+        try:
+            rows = DatabaseOperations._comments_with_authors(session).filter(
+                Comment.post_id.in_(post_ids)
+            ).order_by(desc(Comment.timestamp), desc(Comment.id)).all()
+            
+            comments_by_post = {post_id: [] for post_id in post_ids}
+            for comment, user in rows:
+                comments_by_post[comment.post_id].append(
+                    DatabaseOperations._comment_to_dict(comment, user)
+                )
+            return comments_by_post
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda post_id, **_: [('comments', post_id)], after_load=_with_pending('comment'))
+    def get_comments_page(post_id, cursor=None, limit=10):
+        """Get one page of a post's comments, newest first, with the cursor for the next page"""
+        session = get_read_session()
         try:
-            comments = session.query(Comment).filter_by(post_id=post_id).order_by(desc(Comment.timestamp)).all()
-            comments_data = []
-            for comment in comments:
-                user = session.query(User).filter_by(id=comment.user_id).first()
-                comments_data.append({
-                    'id': comment.id,
-                    'content': comment.content,
-                    'user_name': user.name if user else 'Unknown',
-                    'user_username': user.username if user else 'unknown',
-                    'timestamp': comment.timestamp,
-                    'likes': comment.likes
-                })
-            return comments_data
+            query = DatabaseOperations._comments_with_authors(session).filter(Comment.post_id == post_id)
+            rows, next_cursor = DatabaseOperations._keyset_page(
+                query, Comment.timestamp, Comment.id, cursor, limit
+            )
+            comments = [DatabaseOperations._comment_to_dict(comment, user) for comment, user in rows]
+            return {
+                'items': comments,
+                'next_cursor': next_cursor
+            }
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda post_ids, **_: [('comments', post_id) for post_id in post_ids], after_load=_with_pending('comment'))
+    def get_first_comment_pages(post_ids, limit=10):
+        """Get the first comment page for several posts in one query, keyed by post id"""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return {}
+        session = get_read_session()
+        try:
+            position = func.row_number().over(
+                partition_by=Comment.post_id,
+                order_by=(desc(Comment.timestamp), desc(Comment.id))
+            ).label('position')
+            ranked = session.query(Comment.id, position).filter(
+                Comment.post_id.in_(post_ids)
+            ).subquery()
+            # One extra row per post tells us whether a next page exists
+            rows = DatabaseOperations._comments_with_authors(session).join(
+                ranked, ranked.c.id == Comment.id
+            ).filter(ranked.c.position <= limit + 1).order_by(ranked.c.position).all()
+            
+            pages = {post_id: {'items': [], 'next_cursor': None} for post_id in post_ids}
+            last_shown = {}
+            for comment, user in rows:
+                page = pages[comment.post_id]
+                if len(page['items']) < limit:
+                    page['items'].append(DatabaseOperations._comment_to_dict(comment, user))
+                    last_shown[comment.post_id] = comment
+                else:
+                    last = last_shown[comment.post_id]
+                    page['next_cursor'] = DatabaseOperations._encode_cursor(last.timestamp, last.id)
+            return pages
         finally:
             session.close()
     
@@ -189,6 +540,7 @@ class DatabaseOperations:
             )
             session.add(gallery_item)
             session.commit()
+            invalidate(_gallery_tags(gallery_item.id, user_id) + [('search',)])
             return gallery_item.id
         except Exception as e:
             session.rollback()
@@ -208,7 +560,9 @@ class DatabaseOperations:
                 media_type=media_type
             )
             session.add(post)
+            DatabaseOperations._bump_engagement_totals(session, {user_id: {'posts': 1}})
             session.commit()
+            invalidate(_post_tags(post.id, user_id) + [('search',)])
             return post.id
         except Exception as e:
             session.rollback()
@@ -227,7 +581,10 @@ class DatabaseOperations:
                 content=content
             )
             session.add(comment)
+            post_owner_id = session.query(Post.user_id).filter_by(id=post_id).scalar()
+            DatabaseOperations._bump_engagement_totals(session, {post_owner_id: {'comments': 1}})
             session.commit()
+            invalidate(_post_tags(post_id, post_owner_id) + [('comments', post_id)])
             return comment.id
         except Exception as e:
             session.rollback()
@@ -236,27 +593,15 @@ class DatabaseOperations:
             session.close()
     
     @staticmethod
-    def update_likes(entity_type, entity_id, increment=True):
-        """Update like count for posts, gallery items, or comments"""
+    def add_users_bulk(users):
+        """Add many users with multi-row inserts; returns their ids in order"""
         session = get_session()
         try:
-            if entity_type == 'post':
-                entity = session.query(Post).filter_by(id=entity_id).first()
-            elif entity_type == 'gallery':
-                entity = session.query(GalleryItem).filter_by(id=entity_id).first()
-            elif entity_type == 'comment':
-                entity = session.query(Comment).filter_by(id=entity_id).first()
-            else:
-                return False
-            
-            if entity:
-                if increment:
-                    entity.likes += 1
-                else:
-                    entity.likes = max(0, entity.likes - 1)
-                session.commit()
-                return True
-            return False
+            usernames = set()
+            ids = bulk_insert(session, User, _collect(users, 'username', usernames))
+            session.commit()
+            invalidate([('profile', username) for username in usernames])
+            return ids
         except Exception as e:
             session.rollback()
             raise e
@@ -264,28 +609,200 @@ class DatabaseOperations:
             session.close()
     
     @staticmethod
-    def update_views(entity_type, entity_id):
-        """Increment view count"""
+    def add_social_links_bulk(links):
+        """Add many social links with multi-row inserts; returns their ids in order"""
+        session = get_session()
+        try:
+            user_ids = set()
+            ids = bulk_insert(session, SocialLink, _collect(links, 'user_id', user_ids))
+            usernames = session.query(User.username).filter(User.id.in_(user_ids)).all() if user_ids else []
+            session.commit()
+            invalidate([('profile', username) for username, in usernames])
+            return ids
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def add_posts_bulk(posts):
+        """Add many posts with multi-row inserts (COPY on PostgreSQL); returns their ids in order"""
         session = get_session()
         try:
+            totals = defaultdict(Counter)
+            ids = bulk_insert(session, Post, _tally(posts, totals))
+            DatabaseOperations._bump_engagement_totals(session, totals)
+            session.commit()
+            invalidate([('posts', user_id) for user_id in totals] + [('posts', None), ('search',)])
+            return ids
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def add_gallery_items_bulk(items):
+        """Add many gallery items with multi-row inserts (COPY on PostgreSQL); returns their ids in order"""
+        session = get_session()
+        try:
+            user_ids = set()
+            ids = bulk_insert(session, GalleryItem, _collect(items, 'user_id', user_ids))
+            session.commit()
+            invalidate([('gallery', user_id) for user_id in user_ids] + [('gallery', None), ('search',)])
+            return ids
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def add_comments_bulk(comments):
+        """Add many comments with multi-row inserts (COPY on PostgreSQL); returns their ids in order"""
+        session = get_session()
+        try:
+            per_post = Counter()
+            ids = bulk_insert(session, Comment, _count_by(comments, 'post_id', per_post))
+            tags = [('comments', post_id) for post_id in per_post]
+            totals = defaultdict(Counter)
+            if per_post:
+                owners = session.query(Post.id, Post.user_id).filter(Post.id.in_(list(per_post))).all()
+                for post_id, user_id in owners:
+                    tags.extend(_post_tags(post_id, user_id))
+                    totals[user_id]['comments'] += per_post[post_id]
+            DatabaseOperations._bump_engagement_totals(session, totals)
+            session.commit()
+            invalidate(tags)
+            return ids
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _apply_counter_deltas(session, counter, deltas, tags):
+        """Add {(entity_type, entity_id): delta} onto a counter, floored at zero
+        
+        Issues one UPDATE per entity type and returns the new values keyed
+        like ``deltas``; entities that do not exist are left out. The cache
+        tags of the changed rows are added to ``tags``, and post changes to
+        the owners' engagement totals.
+        """
+        by_type = {}
+        for (entity_type, entity_id), delta in deltas.items():
+            if entity_type in COUNTER_MODELS[counter] and delta:
+                by_type.setdefault(entity_type, {})[entity_id] = delta
+        
+        new_values = {}
+        totals = defaultdict(Counter)
+        for entity_type, id_deltas in by_type.items():
+            table = COUNTER_MODELS[counter][entity_type].__table__
+            column = table.c[counter]
+            # Comments are cached under their post, everything else under its owner
+            parent = table.c.post_id if entity_type == 'comment' else table.c.user_id
+            previous = {}
             if entity_type == 'post':
-                entity = session.query(Post).filter_by(id=entity_id).first()
-            elif entity_type == 'gallery':
-                entity = session.query(GalleryItem).filter_by(id=entity_id).first()
+                # A decrement floored at zero applies less than asked; read what it starts from
+                decremented = [entity_id for entity_id, delta in id_deltas.items() if delta < 0]
+                if decremented:
+                    previous = dict(session.execute(
+                        select(table.c.id, column).where(table.c.id.in_(decremented)).with_for_update()
+                    ).all())
+            if len(id_deltas) == 1:
+                delta = next(iter(id_deltas.values()))
             else:
-                return False
+                delta = case(id_deltas, value=table.c.id, else_=0)
+            statement = update(table).where(table.c.id.in_(list(id_deltas))).values(
+                {counter: case((column + delta < 0, 0), else_=column + delta)}
+            )
             
-            if entity:
-                entity.views += 1
-                session.commit()
-                return True
-            return False
+            if session.get_bind().dialect.update_returning:
+                rows = session.execute(statement.returning(table.c.id, column, parent)).all()
+            else:
+                session.execute(statement)
+                rows = session.execute(
+                    select(table.c.id, column, parent).where(table.c.id.in_(list(id_deltas)))
+                ).all()
+            for entity_id, value, parent_id in rows:
+                new_values[(entity_type, entity_id)] = value
+                if entity_type == 'post':
+                    tags.update(_post_tags(entity_id, parent_id))
+                    totals[parent_id][counter] += (
+                        value - previous[entity_id] if entity_id in previous else id_deltas[entity_id]
+                    )
+                elif entity_type == 'gallery':
+                    tags.update(_gallery_tags(entity_id, parent_id))
+                else:
+                    tags.add(('comments', parent_id))
+        DatabaseOperations._bump_engagement_totals(session, totals)
+        return new_values
+    
+    @staticmethod
+    def bulk_update_counters(changes, counter='likes'):
+        """Apply many (entity_type, entity_id, delta) changes to 'likes' or 'views' at once"""
+        deltas = Counter()
+        for entity_type, entity_id, delta in changes:
+            deltas[(entity_type, entity_id)] += delta
+        if not deltas:
+            return {}
+        session = get_session()
+        try:
+            tags = set()
+            new_values = DatabaseOperations._apply_counter_deltas(session, counter, deltas, tags)
+            session.commit()
+            invalidate(tags)
+            return new_values
         except Exception as e:
             session.rollback()
             raise e
         finally:
             session.close()
     
+    @staticmethod
+    def update_likes(entity_type, entity_id, increment=True):
+        """Update like count for posts, gallery items, or comments
+        
+        Runs as a single atomic UPDATE and returns False if the entity does
+        not exist. With the counter buffer enabled the change is queued for
+        the next batched flush and True is returned.
+        """
+        if entity_type not in COUNTER_MODELS['likes']:
+            return False
+        delta = 1 if increment else -1
+        buffer = DatabaseOperations._counter_buffer()
+        if buffer:
+            buffer.add('likes', entity_type, entity_id, delta)
+            return True
+        new_values = DatabaseOperations.bulk_update_counters([(entity_type, entity_id, delta)], 'likes')
+        return (entity_type, entity_id) in new_values
+    
+    @staticmethod
+    def update_views(entity_type, entity_id):
+        """Increment view count; returns False if the entity does not exist"""
+        if entity_type not in COUNTER_MODELS['views']:
+            return False
+        buffer = DatabaseOperations._counter_buffer()
+        if buffer:
+            buffer.add('views', entity_type, entity_id, 1)
+            return True
+        new_values = DatabaseOperations.bulk_update_counters([(entity_type, entity_id, 1)], 'views')
+        return (entity_type, entity_id) in new_values
+    
+    @staticmethod
+    def flush_counter_buffer():
+        """Write buffered like/view deltas now; returns the number of rows changed"""
+        buffer = DatabaseOperations._counter_buffer()
+        return buffer.flush() if buffer else 0
+    
+    @staticmethod
+    def get_counter_buffer_stats():
+        """Pending keys and flush counters for the like/view buffer, or None when disabled"""
+        buffer = DatabaseOperations._counter_buffer()
+        return buffer.stats() if buffer else None
+    
     @staticmethod
     def update_post(post_id, caption=None, post_type=None, media_type=None):
         """Update an existing post"""
@@ -294,12 +811,14 @@ class DatabaseOperations:
             post = session.query(Post).filter_by(id=post_id).first()
             if post:
                 if caption is not None:
+                    record_caption_edit(session, post_id, post.caption, caption)
                     post.caption = caption
                 if post_type is not None:
                     post.post_type = post_type
                 if media_type is not None:
                     post.media_type = media_type
                 session.commit()
+                invalidate(_post_tags(post_id, post.user_id) + [('search',)])
                 return True
             return False
         except Exception as e:
@@ -324,6 +843,7 @@ class DatabaseOperations:
                 if description is not None:
                     item.description = description
                 session.commit()
+                invalidate(_gallery_tags(item_id, item.user_id) + [('search',)])
                 return True
             return False
         except Exception as e:
@@ -339,8 +859,18 @@ class DatabaseOperations:
         try:
             post = session.query(Post).filter_by(id=post_id).first()
             if post:
+                user_id = post.user_id
+                comment_count = session.query(func.count(Comment.id)).filter(Comment.post_id == post_id).scalar()
+                DatabaseOperations._bump_engagement_totals(session, {user_id: {
+                    'posts': -1,
+                    'likes': -(post.likes or 0),
+                    'comments': -comment_count,
+                    'shares': -(post.shares or 0),
+                    'views': -(post.views or 0)
+                }})
                 session.delete(post)
                 session.commit()
+                invalidate(_post_tags(post_id, user_id) + [('comments', post_id), ('search',)])
                 return True
             return False
         except Exception as e:
@@ -356,8 +886,10 @@ class DatabaseOperations:
         try:
             item = session.query(GalleryItem).filter_by(id=item_id).first()
             if item:
+                user_id = item.user_id
                 session.delete(item)
                 session.commit()
+                invalidate(_gallery_tags(item_id, user_id) + [('search',)])
                 return True
             return False
         except Exception as e:
@@ -374,10 +906,17 @@ class DatabaseOperations:
             analytics = Analytics(
                 user_id=user_id,
                 event_type=event_type,
-                event_data=event_data
+                event_data=event_data,
+                timestamp=datetime.utcnow()
             )
             session.add(analytics)
+            DatabaseOperations._bump_analytics_rollups(session, [{
+                'user_id': user_id,
+                'event_type': event_type,
+                'timestamp': analytics.timestamp
+            }])
             session.commit()
+            invalidate([('analytics', user_id)])
             return analytics.id
         except Exception as e:
             session.rollback()
@@ -386,69 +925,354 @@ class DatabaseOperations:
             session.close()
     
     @staticmethod
-    def get_analytics_summary(user_id, days=7):
-        """Get analytics summary for the last N days"""
+    def track_analytics_bulk(events):
+        """Insert many analytics events with one multi-row insert"""
+        events = [dict(event) for event in events]
+        if not events:
+            return 0
+        now = datetime.utcnow()
+        for event in events:
+            event.setdefault('timestamp', now)
         session = get_session()
         try:
-            from datetime import timedelta
-            start_date = datetime.now() - timedelta(days=days)
-            
-            analytics = session.query(Analytics).filter(
-                Analytics.user_id == user_id,
-                Analytics.timestamp >= start_date
+            session.execute(insert(Analytics), events)
+            DatabaseOperations._bump_analytics_rollups(session, events)
+            session.commit()
+            invalidate({('analytics', event['user_id']) for event in events})
+            return len(events)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def track_analytics_buffered(user_id, event_type, event_data=None, session_key=None):
+        """Queue an analytics event for a background batched write"""
+        buffer = get_analytics_buffer(DatabaseOperations.track_analytics_bulk)
+        return buffer.record(user_id, event_type, event_data, session_key=session_key)
+    
+    @staticmethod
+    def get_analytics_buffer_stats():
+        """Queue depth and dropped/collapsed/flushed counters for buffered analytics"""
+        return get_analytics_buffer(DatabaseOperations.track_analytics_bulk).stats()
+    
+    @staticmethod
+    def _viewer_buffer():
+        return get_viewer_buffer(DatabaseOperations.merge_viewer_sketches)
+    
+    @staticmethod
+    def record_unique_views(viewer_key, entities):
+        """Count ``viewer_key`` (e.g. a browser session key) among the viewers of each (entity_type, entity_id)
+        
+        Entity types are 'profile' and 'content' (keyed by user id), 'post'
+        and 'gallery'. Views are buffered and merged into the stored
+        sketches in batches; repeat views by the same viewer change nothing.
+        """
+        entities = list(entities)
+        for entity_type, _ in entities:
+            if entity_type not in VIEWER_ENTITY_TYPES:
+                raise ValueError(f"Unknown viewer entity type: {entity_type}")
+        DatabaseOperations._viewer_buffer().add(viewer_key, entities)
+    
+    @staticmethod
+    def merge_viewer_sketches(updates):
+        """Fold {(entity_type, entity_id, day): {register index: rank}} into the stored sketches
+        
+        Missing rows are created first and every affected row is locked
+        before the read-merge-write, so concurrent flushes from several
+        processes cannot overwrite each other's registers.
+        """
+        if not updates:
+            return 0
+        precision = viewer_precision()
+        batch_size = _env_int('BULK_INSERT_BATCH_SIZE', 5000)
+        keys = sorted(updates)
+        empty = HyperLogLog(precision).to_bytes()
+        table = UniqueViewerSketch.__table__
+        session = get_session()
+        try:
+            for start in range(0, len(keys), batch_size):
+                chunk = keys[start:start + batch_size]
+                insert_missing(
+                    session,
+                    UniqueViewerSketch,
+                    [{'entity_type': t, 'entity_id': i, 'day': d, 'registers': empty} for t, i, d in chunk],
+                    key_columns=['entity_type', 'entity_id', 'day']
+                )
+                key_tuple = tuple_(table.c.entity_type, table.c.entity_id, table.c.day)
+                stored = session.execute(
+                    select(table.c.entity_type, table.c.entity_id, table.c.day, table.c.registers)
+                    .where(key_tuple.in_(chunk))
+                    .order_by(table.c.entity_type, table.c.entity_id, table.c.day)
+                    .with_for_update()
+                ).all()
+                replace_upsert(
+                    session,
+                    UniqueViewerSketch,
+                    [
+                        {
+                            'entity_type': entity_type, 'entity_id': entity_id, 'day': day,
+                            'registers': HyperLogLog.from_bytes(registers).update(updates[(entity_type, entity_id, day)]).to_bytes()
+                        }
+                        for entity_type, entity_id, day, registers in stored
+                    ],
+                    key_columns=['entity_type', 'entity_id', 'day'],
+                    value_columns=['registers']
+                )
+            session.commit()
+            invalidate([('unique_viewers', entity_type) for entity_type in {key[0] for key in keys}])
+            return len(keys)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda entity_type, **_: [('unique_viewers', entity_type)])
+    def _stored_viewer_sketches(entity_type, entity_ids, since):
+        """Stored sketches of the entities from ``since`` on, merged across days and keyed by id"""
+        session = get_read_session()
+        try:
+            rows = session.query(UniqueViewerSketch.entity_id, UniqueViewerSketch.registers).filter(
+                UniqueViewerSketch.entity_type == entity_type,
+                UniqueViewerSketch.entity_id.in_(entity_ids),
+                UniqueViewerSketch.day >= since
             ).all()
+        finally:
+            session.close()
+        
+        sketches = {}
+        for entity_id, registers in rows:
+            sketch = HyperLogLog.from_bytes(registers)
+            if entity_id in sketches:
+                sketches[entity_id].merge(sketch)
+            else:
+                sketches[entity_id] = sketch
+        return sketches
+    
+    @staticmethod
+    def get_unique_viewers(entity_type, entity_ids, days=30):
+        """Estimated distinct viewers of each entity over the last N days (today included), keyed by id"""
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return {}
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        sketches = DatabaseOperations._stored_viewer_sketches(entity_type, entity_ids, since)
+        pending = DatabaseOperations._viewer_buffer().pending(entity_type, entity_ids, since)
+        precision = viewer_precision()
+        counts = {}
+        for entity_id in entity_ids:
+            sketch = sketches.get(entity_id) or HyperLogLog(precision)
+            counts[entity_id] = sketch.update(pending.get(entity_id)).count()
+        return counts
+    
+    @staticmethod
+    def flush_viewer_buffer():
+        """Write buffered unique views now; returns the number of sketches written"""
+        return DatabaseOperations._viewer_buffer().flush()
+    
+    @staticmethod
+    def get_viewer_buffer_stats():
+        """Pending sketches and flush counters for buffered unique views"""
+        return DatabaseOperations._viewer_buffer().stats()
+    
+    @staticmethod
+    def _bump_analytics_rollups(session, events):
+        """Add events to the per-user, per-day, per-type rollup counts"""
+        counts = Counter(
+            (event['user_id'], event['timestamp'].date(), event['event_type'])
+            for event in events
+        )
+        increment_upsert(
+            session,
+            AnalyticsDailyRollup,
+            [
+                {'user_id': user_id, 'day': day, 'event_type': event_type, 'count': count}
+                for (user_id, day, event_type), count in counts.items()
+            ],
+            key_columns=['user_id', 'day', 'event_type'],
+            counter_columns=['count']
+        )
+    
+    @staticmethod
+    def rebuild_analytics_rollups(user_id=None):
+        """Recompute the daily rollups from the raw analytics events"""
+        session = get_session()
+        try:
+            rollups = session.query(AnalyticsDailyRollup)
+            events = session.query(
+                Analytics.user_id,
+                func.date(Analytics.timestamp),
+                Analytics.event_type,
+                func.count(Analytics.id)
+            )
+            if user_id:
+                rollups = rollups.filter_by(user_id=user_id)
+                events = events.filter(Analytics.user_id == user_id)
+            rollups.delete(synchronize_session=False)
+            
+            grouped = events.group_by(
+                Analytics.user_id, func.date(Analytics.timestamp), Analytics.event_type
+            ).subquery()
+            session.execute(insert(AnalyticsDailyRollup).from_select(
+                ['user_id', 'day', 'event_type', 'count'], grouped.select()
+            ))
+            session.commit()
+            invalidate([('analytics', user_id) if user_id else ('analytics',)])
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    def reconcile_engagement_totals(user_id=None):
+        """Recompute the per-user engagement totals from the posts and fix any that drifted
+        
+        Returns the ids of the users whose stored totals were corrected.
+        """
+        session = get_session()
+        try:
+            posts = session.query(
+                Post.user_id,
+                func.count(Post.id),
+                func.coalesce(func.sum(Post.likes), 0),
+                func.coalesce(func.sum(Post.shares), 0),
+                func.coalesce(func.sum(Post.views), 0)
+            )
+            comments = session.query(Post.user_id, func.count(Comment.id)).join(Comment, Comment.post_id == Post.id)
+            stored = session.query(UserEngagementTotals)
+            if user_id:
+                posts = posts.filter(Post.user_id == user_id)
+                comments = comments.filter(Post.user_id == user_id)
+                stored = stored.filter_by(user_id=user_id)
             
-            summary = {
-                'total_events': len(analytics),
-                'events_by_type': {}
+            current = {
+                totals.user_id: {column: getattr(totals, column) for column in ENGAGEMENT_TOTALS}
+                for totals in stored
             }
+            # Users left without posts keep a row of zeros
+            actual = {owner_id: dict.fromkeys(ENGAGEMENT_TOTALS, 0) for owner_id in current}
+            for owner_id, count, likes, shares, views in posts.group_by(Post.user_id):
+                actual[owner_id] = {
+                    'posts': count, 'likes': int(likes), 'comments': 0, 'shares': int(shares), 'views': int(views)
+                }
+            for owner_id, count in comments.group_by(Post.user_id):
+                actual[owner_id]['comments'] = count
+            drifted = [owner_id for owner_id, values in actual.items() if current.get(owner_id) != values]
+            replace_upsert(
+                session,
+                UserEngagementTotals,
+                [{'user_id': owner_id, **actual[owner_id]} for owner_id in drifted],
+                key_columns=['user_id'],
+                value_columns=ENGAGEMENT_TOTALS
+            )
+            session.commit()
+            invalidate([('posts', owner_id) for owner_id in drifted])
+            return sorted(drifted)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
+    @staticmethod
+    @cached_read(lambda user_id, **_: [('analytics', user_id), ('analytics',)])
+    def get_analytics_summary(user_id, days=7, include_archive=False):
+        """Get analytics summary for the last N days (today included) from the daily rollups
+        
+        Months removed by the retention job only count with include_archive,
+        which reads them back from the Parquet archive.
+        """
+        session = get_read_session()
+        try:
+            start_day = datetime.utcnow().date() - timedelta(days=days - 1)
             
-            for event in analytics:
-                if event.event_type not in summary['events_by_type']:
-                    summary['events_by_type'][event.event_type] = 0
-                summary['events_by_type'][event.event_type] += 1
+            rows = session.query(
+                AnalyticsDailyRollup.event_type,
+                func.sum(AnalyticsDailyRollup.count)
+            ).filter(
+                AnalyticsDailyRollup.user_id == user_id,
+                AnalyticsDailyRollup.day >= start_day
+            ).group_by(AnalyticsDailyRollup.event_type).all()
             
-            return summary
+            events_by_type = {event_type: int(count) for event_type, count in rows}
+            if include_archive:
+                since = datetime.combine(start_day, datetime.min.time())
+                for event_type, count in archived_event_counts(user_id, since).items():
+                    events_by_type[event_type] = events_by_type.get(event_type, 0) + count
+            return {
+                'total_events': sum(events_by_type.values()),
+                'events_by_type': events_by_type
+            }
         finally:
             session.close()
     
     @staticmethod
-    def search_content(query, search_type='all'):
-        """Search posts and gallery items"""
-        session = get_session()
+    @cached_read(lambda **_: [('engagement_history',)])
+    def get_engagement_history(entity_id, days=7, entity_type='user'):
+        """Get a user's (or post's) engagement counters over the last N days from the snapshot history
+        
+        Returns 'baseline', the counters as of N days ago (None when the
+        history does not reach back that far), 'latest', and 'daily', the
+        counters at the end of each day of the window.
+        """
+        session = get_read_session()
         try:
-            results = {
-                'posts': [],
-                'gallery': []
-            }
+            now = datetime.utcnow()
+            start = now - timedelta(days=days)
+            columns = [EngagementSnapshot.taken_at, EngagementSnapshot.likes, EngagementSnapshot.comments,
+                       EngagementSnapshot.shares, EngagementSnapshot.views]
+            entity = (EngagementSnapshot.entity_type == entity_type, EngagementSnapshot.entity_id == entity_id)
             
-            if search_type in ['all', 'posts']:
-                posts = session.query(Post).filter(
-                    Post.caption.ilike(f'%{query}%')
-                ).order_by(desc(Post.timestamp)).all()
-                
-                for post in posts:
-                    results['posts'].append({
-                        'id': post.id,
-                        'caption': post.caption,
-                        'type': post.post_type,
-                        'timestamp': post.timestamp
-                    })
+            baseline = session.query(*columns).filter(
+                *entity, EngagementSnapshot.taken_at <= start
+            ).order_by(EngagementSnapshot.taken_at.desc()).first()
+            recent = session.query(*columns).filter(
+                *entity, EngagementSnapshot.taken_at > start
+            ).order_by(EngagementSnapshot.taken_at).all()
             
-            if search_type in ['all', 'gallery']:
-                items = session.query(GalleryItem).filter(
-                    (GalleryItem.title.ilike(f'%{query}%')) |
-                    (GalleryItem.description.ilike(f'%{query}%'))
-                ).order_by(desc(GalleryItem.upload_date)).all()
-                
-                for item in items:
-                    results['gallery'].append({
-                        'id': item.id,
-                        'title': item.title,
-                        'category': item.category,
-                        'type': item.item_type
-                    })
+            def counters(row):
+                return {'likes': row.likes, 'comments': row.comments, 'shares': row.shares, 'views': row.views}
             
-            return results
+            daily = []
+            current = counters(baseline) if baseline else None
+            position = 0
+            for offset in range(days - 1, -1, -1):
+                day = now.date() - timedelta(days=offset)
+                day_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+                while position < len(recent) and recent[position].taken_at < day_end:
+                    current = counters(recent[position])
+                    position += 1
+                if current is not None:
+                    daily.append({'day': day, **current})
+            return {
+                'baseline': counters(baseline) if baseline else None,
+                'latest': counters(recent[-1]) if recent else (counters(baseline) if baseline else None),
+                'daily': daily
+            }
+        finally:
+            session.close()
+    
+    @staticmethod
+    def get_trending_hashtags(limit=10, hours=24):
+        """Get the hashtags trending in post captions over the last N hours, most popular first
+        
+        Served from the in-memory trending sketches, which a background
+        thread catches up with new posts and caption edits; each entry has
+        'tag', the time-decayed 'score' and the estimated 'count' in the
+        window.
+        """
+        return get_trending().top(limit, hours)
+    
+    @staticmethod
+    @cached_read(lambda **_: [('search',)])
+    def search_content(query, search_type='all', limit=20, offset=0):
+        """Search posts and gallery items, ranked by relevance and paginated"""
+        session = get_read_session()
+        try:
+            return search(session, query, search_type, limit=limit, offset=offset)
         finally:
             session.close()
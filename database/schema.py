@@ -1,8 +1,21 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, Float, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
+from contextlib import contextmanager
+from collections import Counter
 from datetime import datetime
+import contextvars
+import itertools
+import logging
 import os
+import re
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -28,6 +41,9 @@ class User(Base):
 
 class SocialLink(Base):
     __tablename__ = 'social_links'
+    __table_args__ = (
+        Index('ix_social_links_user_id', 'user_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -38,6 +54,9 @@ class SocialLink(Base):
 
 class Post(Base):
     __tablename__ = 'posts'
+    __table_args__ = (
+        Index('ix_posts_user_id_timestamp', 'user_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -54,6 +73,10 @@ class Post(Base):
 
 class GalleryItem(Base):
     __tablename__ = 'gallery_items'
+    __table_args__ = (
+        Index('ix_gallery_items_user_id_upload_date', 'user_id', 'upload_date'),
+        Index('ix_gallery_items_user_id_category_upload_date', 'user_id', 'category', 'upload_date'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -69,6 +92,9 @@ class GalleryItem(Base):
 
 class Comment(Base):
     __tablename__ = 'comments'
+    __table_args__ = (
+        Index('ix_comments_post_id_timestamp', 'post_id', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
@@ -82,6 +108,10 @@ class Comment(Base):
 
 class Analytics(Base):
     __tablename__ = 'analytics'
+    __table_args__ = (
+        Index('ix_analytics_user_id_timestamp', 'user_id', 'timestamp'),
+        Index('ix_analytics_user_id_event_type_timestamp', 'user_id', 'event_type', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -91,21 +121,482 @@ class Analytics(Base):
     
     user = relationship('User', backref='analytics')
 
+class AnalyticsDailyRollup(Base):
+    __tablename__ = 'analytics_daily_rollups'
+    
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    event_type = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class UserEngagementTotals(Base):
+    __tablename__ = 'user_engagement_totals'
+    
+    # Kept current by the DatabaseOperations write paths; summed over the user's posts
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    posts = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    views = Column(Integer, nullable=False, default=0)
+
+class EngagementSnapshot(Base):
+    __tablename__ = 'engagement_snapshots'
+    __table_args__ = (
+        Index('ix_engagement_snapshots_taken_at', 'taken_at'),
+    )
+    
+    # A post ('post') or the summed posts of a user ('user'); rows are only
+    # written when the counters changed since the entity's previous snapshot
+    entity_type = Column(String(10), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime, primary_key=True)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    views = Column(Integer, nullable=False, default=0)
+
+class EngagementLatest(Base):
+    __tablename__ = 'engagement_latest'
+    
+    # Counters of each entity's most recent engagement_snapshots row, so a
+    # snapshot compares against one row per entity instead of the history
+    entity_type = Column(String(10), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime, nullable=False)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    views = Column(Integer, nullable=False, default=0)
+
+class UniqueViewerSketch(Base):
+    __tablename__ = 'unique_viewer_sketches'
+    __table_args__ = (
+        Index('ix_unique_viewer_sketches_day', 'day'),
+    )
+    
+    # Compressed HyperLogLog registers of the distinct viewers of one entity
+    # on one day (see database/unique_viewers.py); days merge at read time
+    entity_type = Column(String(10), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+
+class CaptionEdit(Base):
+    __tablename__ = 'caption_edits'
+    __table_args__ = (
+        Index('ix_caption_edits_timestamp', 'timestamp'),
+    )
+    
+    # Hashtags an edit added to a post caption, read by every process's
+    # trending engine (see database/trending.py) and pruned past its window
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, nullable=False)
+    added_tags = Column(Text, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+_bound_session = contextvars.ContextVar('bound_session', default=None)
+_bound_read_session = contextvars.ContextVar('bound_read_session', default=None)
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def get_pool_config():
+    """Connection pool settings read from the environment"""
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)
+    }
+
+class QueryLog:
+    """SQL statements executed within one scope, such as one Streamlit rerun
+    
+    Statements are grouped by the DatabaseOperations method that issued
+    them. The same statement repeated ``n_plus_one_threshold`` times or
+    more inside one method call is reported as a likely N+1.
+    """
+    
+    def __init__(self, n_plus_one_threshold=3):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = []
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def record(self, caller, statement, duration_ms):
+        method = caller.f_code.co_qualname if caller is not None else '(outside DatabaseOperations)'
+        with self._lock:
+            self.statements.append({'method': method, 'statement': statement, 'duration_ms': duration_ms})
+            # Keyed by the frame itself: holding it keeps each call distinct
+            call = self._calls.setdefault(caller, {'method': method, 'shapes': Counter()})
+            call['shapes'][statement] += 1
+    
+    def summary(self, slowest=5):
+        """Totals, per-method breakdown, slowest statements and N+1 suspects"""
+        with self._lock:
+            statements = list(self.statements)
+            calls = list(self._calls.values())
+        by_method = {}
+        for entry in statements:
+            method = by_method.setdefault(entry['method'], {'statements': 0, 'duration_ms': 0.0, 'calls': 0})
+            method['statements'] += 1
+            method['duration_ms'] += entry['duration_ms']
+        n_plus_one = []
+        for call in calls:
+            by_method[call['method']]['calls'] += 1
+            for statement, count in call['shapes'].items():
+                if count >= self.n_plus_one_threshold:
+                    n_plus_one.append({'method': call['method'], 'statement': statement, 'count': count})
+        return {
+            'statements': len(statements),
+            'duration_ms': sum(entry['duration_ms'] for entry in statements),
+            'by_method': by_method,
+            'slowest': sorted(statements, key=lambda entry: entry['duration_ms'], reverse=True)[:slowest],
+            'n_plus_one': n_plus_one
+        }
+
+_query_log = contextvars.ContextVar('query_log', default=None)
+
+def sql_debug_enabled():
+    return _env_bool('SQL_DEBUG_ENABLED', False)
+
+@contextmanager
+def query_log():
+    """Collect every statement executed in the current context into a QueryLog"""
+    log = QueryLog(n_plus_one_threshold=_env_int('SQL_DEBUG_N_PLUS_ONE', 3))
+    token = _query_log.set(log)
+    try:
+        yield log
+    finally:
+        _query_log.reset(token)
+
+# Modules whose functions the query log attributes statements to
+OPERATION_MODULES = ('database.operations', 'database.engagement')
+
+def _calling_operation():
+    """Outermost frame from one of OPERATION_MODULES on the stack, or None"""
+    caller = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_globals.get('__name__') in OPERATION_MODULES:
+            caller = frame
+        frame = frame.f_back
+    return caller
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    log = _query_log.get()
+    if log is not None:
+        log.record(_calling_operation(), statement, (time.perf_counter() - started) * 1000)
+
+def instrument_engine(engine):
+    """Time statements into the active query_log() when SQL_DEBUG_ENABLED is set"""
+    if sql_debug_enabled():
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    return engine
+
+def _create_engine(database_url):
+    config = get_pool_config()
+    if make_url(database_url).get_backend_name() == 'sqlite':
+        # SQLite picks its own pool class; only pre-ping applies there
+        return instrument_engine(create_engine(database_url, pool_pre_ping=config['pool_pre_ping']))
+    return instrument_engine(create_engine(database_url, **config))
+
 def get_engine():
-    database_url = os.getenv('DATABASE_URL')
-    if not database_url:
-        raise ValueError(
-            "DATABASE_URL environment variable not set. "
-            "Please ensure the PostgreSQL database is configured."
-        )
-    return create_engine(database_url, pool_pre_ping=True)
+    """Return the process-wide engine, creating it on first use"""
+    global _engine, _session_factory
+    if _engine is not None:
+        return _engine
+    
+    with _engine_lock:
+        if _engine is None:
+            database_url = os.getenv('DATABASE_URL')
+            if not database_url:
+                raise ValueError(
+                    "DATABASE_URL environment variable not set. "
+                    "Please ensure the PostgreSQL database is configured."
+                )
+            _engine = _create_engine(database_url)
+            _session_factory = sessionmaker(bind=_engine)
+            event.listen(_session_factory, 'after_commit', _mark_write)
+    return _engine
+
+def dispose_engine():
+    """Close all pooled connections and drop the process-wide engine and replicas"""
+    global _engine, _session_factory, _replicas
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        for replica in _replicas or ():
+            replica['engine'].dispose()
+        _engine = None
+        _session_factory = None
+        _replicas = None
+
+def get_pool_status():
+    """Return live connection pool statistics for the process-wide engine"""
+    pool = get_engine().pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'status': pool.status()
+    }
+    for stat in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, stat):
+            status[stat] = getattr(pool, stat)()
+    return status
 
 def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    session = _bound_session.get()
+    if session is not None:
+        return session
+    get_engine()
+    return _session_factory()
+
+_replicas = None
+_replica_cycle = itertools.count()
+_last_write = {}
+_client_key = contextvars.ContextVar('client_key', default=None)
+
+def replica_urls():
+    """Read-replica URLs from the comma-separated DATABASE_REPLICA_URLS"""
+    return [url.strip() for url in (os.getenv('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+
+def replica_lag_window():
+    """Seconds a replica may trail the primary; 0 when no replicas are configured"""
+    if not replica_urls():
+        return 0.0
+    return float(os.getenv('REPLICA_STICKY_SECONDS') or 5.0)
+
+def _get_replicas():
+    global _replicas
+    if _replicas is None:
+        with _engine_lock:
+            if _replicas is None:
+                _replicas = [{
+                    'database_url': url,
+                    'url': make_url(url).render_as_string(hide_password=True),
+                    'engine': _create_engine(url),
+                    'healthy': True,
+                    'checked': 0.0,
+                    'lag': None,
+                    'lock': threading.Lock()
+                } for url in replica_urls()]
+                for replica in _replicas:
+                    replica['session_factory'] = sessionmaker(bind=replica['engine'])
+    return _replicas
+
+def _check_replica(replica):
+    """Probe a replica with SELECT 1 and, on PostgreSQL, its replay lag"""
+    try:
+        with replica['engine'].connect() as conn:
+            conn.execute(text('SELECT 1'))
+            lag = 0.0
+            if conn.dialect.name == 'postgresql':
+                lag = conn.execute(text(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )).scalar() or 0.0
+        replica['lag'] = float(lag)
+        replica['healthy'] = replica['lag'] <= float(os.getenv('REPLICA_MAX_LAG') or 5.0)
+    except Exception:
+        logger.warning('Read replica %s failed its health check', replica['url'], exc_info=True)
+        replica['lag'] = None
+        replica['healthy'] = False
+    replica['checked'] = time.monotonic()
+
+def _replica_healthy(replica):
+    if time.monotonic() - replica['checked'] >= _env_int('REPLICA_HEALTH_INTERVAL', 10):
+        # One caller re-checks; the others use the last result meanwhile
+        if replica['lock'].acquire(blocking=False):
+            try:
+                _check_replica(replica)
+            finally:
+                replica['lock'].release()
+    return replica['healthy']
+
+def _mark_write(session):
+    key = _client_key.get()
+    if key is None:
+        return
+    now = time.monotonic()
+    _last_write[key] = now
+    if len(_last_write) > 10000:
+        window = replica_lag_window()
+        for stale_key in [k for k, wrote in list(_last_write.items()) if now - wrote > window]:
+            _last_write.pop(stale_key, None)
+
+@contextmanager
+def client_session(key):
+    """Identify the client (e.g. a browser session) whose writes should be read back
+    
+    For REPLICA_STICKY_SECONDS after this client commits a write, its reads
+    go to the primary so it sees its own changes.
+    """
+    token = _client_key.set(key)
+    try:
+        yield
+    finally:
+        _client_key.reset(token)
+
+def choose_replica():
+    """The healthy replica the current read should use, or None for the primary
+    
+    None when no replica is configured or healthy, and for clients that
+    wrote within the last REPLICA_STICKY_SECONDS.
+    """
+    if not replica_urls():
+        return None
+    key = _client_key.get()
+    wrote = _last_write.get(key) if key is not None else None
+    if wrote is not None and time.monotonic() - wrote < replica_lag_window():
+        return None
+    
+    replicas = _get_replicas()
+    start = next(_replica_cycle)
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        if _replica_healthy(replica):
+            return replica
+    return None
+
+def get_read_session():
+    """Session for read-only queries, on a healthy replica when one is configured
+    
+    Falls back to the primary as described in choose_replica(). Under
+    bind_session() the bound read session is used, else the bound session.
+    """
+    if _bound_session.get() is not None:
+        return _bound_read_session.get() or get_session()
+    replica = choose_replica()
+    if replica is None:
+        return get_session()
+    return replica['session_factory']()
+
+def get_replica_status():
+    """Health, last measured lag and pool stats for each read replica"""
+    return [{
+        'url': replica['url'],
+        'healthy': replica['healthy'],
+        'lag_seconds': replica['lag'],
+        'pool': replica['engine'].pool.status()
+    } for replica in _get_replicas()]
+
+@contextmanager
+def bind_session(session, read_session=None):
+    """Make get_session() return ``session`` within the current context
+    
+    Used by the async layer to run DatabaseOperations on the synchronous
+    facade of an AsyncSession; get_read_session() returns ``read_session``
+    (e.g. on a replica) when given, else ``session``.
+    """
+    token = _bound_session.set(session)
+    read_token = _bound_read_session.set(read_session)
+    try:
+        yield session
+    finally:
+        _bound_read_session.reset(read_token)
+        _bound_session.reset(token)
+
+def _drop_invalid_indexes(engine, names):
+    """Drop the PostgreSQL indexes among ``names`` left INVALID by an interrupted concurrent build
+    
+    Only indexes the models declare are considered, and builds still in
+    progress in another session (also INVALID until they finish) are left
+    alone.
+    """
+    if not names:
+        return set()
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        invalid = conn.execute(text(
+            "SELECT c.relname FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE NOT i.indisvalid AND n.nspname = current_schema() "
+            "AND c.relname = ANY(:names) "
+            "AND i.indexrelid NOT IN (SELECT index_relid FROM pg_stat_progress_create_index)"
+        ), {'names': sorted(names)}).scalars().all()
+        for name in invalid:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        return set(invalid)
+
+def ensure_indexes(engine=None):
+    """Create any model-declared index missing from an existing database
+    
+    On PostgreSQL indexes are built with CREATE INDEX CONCURRENTLY so the
+    tables stay writable while the index is built (partitioned tables, which
+    do not support it, get a plain build). Returns the names of the indexes
+    that were created.
+    """
+    engine = engine or get_engine()
+    is_postgres = engine.dialect.name == 'postgresql'
+    inspector = inspect(engine)
+    declared = {
+        index.name
+        for table in Base.metadata.sorted_tables if inspector.has_table(table.name)
+        for index in table.indexes
+    }
+    dropped = _drop_invalid_indexes(engine, declared) if is_postgres else set()
+    partitioned = set()
+    if is_postgres:
+        with engine.connect() as conn:
+            partitioned = set(conn.execute(text(
+                "SELECT c.relname FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE c.relkind = 'p' AND n.nspname = current_schema()"
+            )).scalars())
+    inspector = inspect(engine)
+    created = []
+    
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)} - dropped
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing:
+                continue
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+            if is_postgres and table.name not in partitioned:
+                ddl = re.sub(r'^CREATE (UNIQUE )?INDEX', r'CREATE \1INDEX CONCURRENTLY', ddl)
+            # Concurrent builds cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(ddl))
+            created.append(index.name)
+    return created
 
 def init_db():
+    from database.search import install_search
+    from database.operations import DatabaseOperations
+    from database.analytics_storage import install_partitions
+    from database.engagement_history import rebuild_latest_snapshots
     engine = get_engine()
+    had_rollups = inspect(engine).has_table(AnalyticsDailyRollup.__tablename__)
+    had_totals = inspect(engine).has_table(UserEngagementTotals.__tablename__)
+    had_latest = inspect(engine).has_table(EngagementLatest.__tablename__)
     Base.metadata.create_all(engine)
+    install_partitions(engine)
+    ensure_indexes(engine)
+    install_search(engine)
+    if not had_rollups:
+        # Existing databases: build the rollups from the raw events once
+        DatabaseOperations.rebuild_analytics_rollups()
+    if not had_totals:
+        DatabaseOperations.reconcile_engagement_totals()
+    if not had_latest:
+        rebuild_latest_snapshots()
     return engine
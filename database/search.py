@@ -0,0 +1,167 @@
+"""Full-text search over posts and gallery items.
+
+PostgreSQL gets an expression GIN index over each table's tsvector, built
+concurrently so installing it never blocks writes, SQLite gets
+external-content FTS5 tables kept current by triggers. Any
+other database (or one where install_search() has not run yet) falls back
+to a paginated LIKE scan.
+"""
+from database.schema import Post, GalleryItem, _drop_invalid_indexes
+from sqlalchemy import inspect, text, desc, asc, func, literal_column, column, table
+import re
+
+# Queries repeat these expressions verbatim so the planner uses the indexes
+POSTGRES_SEARCH_VECTORS = {
+    'posts': "to_tsvector('english', coalesce(posts.caption, ''))",
+    'gallery_items': (
+        "setweight(to_tsvector('english', coalesce(gallery_items.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(gallery_items.description, '')), 'B')"
+    )
+}
+
+POSTGRES_DDL = [
+    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{source}_search ON {source} USING GIN (({vector.replace(f'{source}.', '')}))"
+    for source, vector in POSTGRES_SEARCH_VECTORS.items()
+] + [
+    # Generated columns from earlier installs cost every write; the indexes replace them
+    f"ALTER TABLE {source} DROP COLUMN IF EXISTS search_vector"
+    for source in POSTGRES_SEARCH_VECTORS
+]
+
+SQLITE_FTS_TABLES = {
+    'posts_fts': ('posts', ['caption']),
+    'gallery_items_fts': ('gallery_items', ['title', 'description'])
+}
+
+_backends = {}
+
+def _sqlite_update_trigger(fts_name, source, columns):
+    """Re-index a row only when one of its indexed columns is updated, not on counter updates"""
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{col}' for col in columns)
+    old_values = ', '.join(f'old.{col}' for col in columns)
+    return (
+        f"CREATE TRIGGER {fts_name}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_values}); END"
+    )
+
+def _sqlite_fts_ddl(fts_name, source, columns):
+    cols = ', '.join(columns)
+    new_values = ', '.join(f'new.{col}' for col in columns)
+    old_values = ', '.join(f'old.{col}' for col in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts_name} USING fts5({cols}, content='{source}', content_rowid='id')",
+        f"CREATE TRIGGER {fts_name}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts_name}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        _sqlite_update_trigger(fts_name, source, columns),
+        f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"
+    ]
+
+def install_search(engine):
+    """Create the full-text columns, indexes, virtual tables and triggers"""
+    if engine.dialect.name == 'postgresql':
+        # An interrupted build leaves an INVALID index that IF NOT EXISTS would keep
+        _drop_invalid_indexes(engine, {f"ix_{source}_search" for source in POSTGRES_SEARCH_VECTORS})
+        # Concurrent index builds cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for ddl in POSTGRES_DDL:
+                conn.execute(text(ddl))
+    elif engine.dialect.name == 'sqlite':
+        inspector = inspect(engine)
+        with engine.begin() as conn:
+            for fts_name, (source, columns) in SQLITE_FTS_TABLES.items():
+                if inspector.has_table(fts_name):
+                    # Earlier installs fired the update trigger on every column
+                    conn.execute(text(f"DROP TRIGGER IF EXISTS {fts_name}_au"))
+                    conn.execute(text(_sqlite_update_trigger(fts_name, source, columns)))
+                    continue
+                for ddl in _sqlite_fts_ddl(fts_name, source, columns):
+                    conn.execute(text(ddl))
+            # Title matches outrank description matches
+            conn.execute(text(
+                "INSERT INTO gallery_items_fts(gallery_items_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')"
+            ))
+    _backends.pop(engine, None)
+
+def search_backend(engine):
+    """Return 'postgresql', 'sqlite_fts5' or 'like' for the given engine"""
+    if engine not in _backends:
+        inspector = inspect(engine)
+        backend = 'like'
+        if engine.dialect.name == 'postgresql':
+            if all(
+                f"ix_{source}_search" in {index['name'] for index in inspector.get_indexes(source)}
+                for source in POSTGRES_SEARCH_VECTORS
+            ):
+                backend = 'postgresql'
+        elif engine.dialect.name == 'sqlite':
+            if all(inspector.has_table(name) for name in SQLITE_FTS_TABLES):
+                backend = 'sqlite_fts5'
+        _backends[engine] = backend
+    return _backends[engine]
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+def _ranked(session, model, backend, terms, fallback_filter, recency):
+    """Build the match filter and ordering for one searchable table"""
+    if backend == 'postgresql':
+        vector = literal_column(f"({POSTGRES_SEARCH_VECTORS[model.__tablename__]})")
+        tsquery = func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+        match = vector.op('@@')(tsquery)
+        return session.query(model).filter(match), [desc(func.ts_rank_cd(vector, tsquery)), desc(recency)]
+    if backend == 'sqlite_fts5':
+        fts_name = f'{model.__tablename__}_fts'
+        fts = table(fts_name, column('rowid'), column('rank'), column(fts_name))
+        match = fts.c[fts_name].op('MATCH')(' '.join(f'"{term}"*' for term in terms))
+        # bm25 scores are negative, lower is a better match
+        query = session.query(model).join(fts, fts.c.rowid == model.id).filter(match)
+        return query, [asc(fts.c.rank), desc(recency)]
+    return session.query(model).filter(fallback_filter), [desc(recency)]
+
+def search(session, query, search_type='all', limit=20, offset=0):
+    """Run a relevance-ranked, paginated search and return results with totals"""
+    results = {
+        'posts': [],
+        'gallery': [],
+        'posts_total': 0,
+        'gallery_total': 0
+    }
+    terms = _terms(query)
+    if not terms:
+        return results
+    backend = search_backend(session.get_bind())
+    pattern = f'%{query}%'
+
+    if search_type in ['all', 'posts']:
+        matches, ordering = _ranked(
+            session, Post, backend, terms, Post.caption.ilike(pattern), Post.timestamp
+        )
+        results['posts_total'] = matches.count()
+        for post in matches.order_by(*ordering).limit(limit).offset(offset):
+            results['posts'].append({
+                'id': post.id,
+                'caption': post.caption,
+                'type': post.post_type,
+                'timestamp': post.timestamp
+            })
+
+    if search_type in ['all', 'gallery']:
+        matches, ordering = _ranked(
+            session, GalleryItem, backend, terms,
+            (GalleryItem.title.ilike(pattern)) | (GalleryItem.description.ilike(pattern)),
+            GalleryItem.upload_date
+        )
+        results['gallery_total'] = matches.count()
+        for item in matches.order_by(*ordering).limit(limit).offset(offset):
+            results['gallery'].append({
+                'id': item.id,
+                'title': item.title,
+                'category': item.category,
+                'type': item.item_type
+            })
+
+    return results
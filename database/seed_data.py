@@ -1,11 +1,13 @@
 from database.schema import User, SocialLink, Post, GalleryItem, init_db, get_session
+from database.operations import DatabaseOperations
+from database.bulk import bulk_insert
+from database.cache import invalidate
 from datetime import datetime, timedelta
 import random
 
 def seed_database():
-    """Seed the database with initial data"""
+    """Seed the database with initial data in a single transaction"""
     session = get_session()
-    
     try:
         # Check if data already exists
         existing_user = session.query(User).filter_by(username='sonia.papi').first()
@@ -14,7 +16,7 @@ def seed_database():
             return
         
         # Create main user
-        user = User(
+        user_id, = bulk_insert(session, User, [dict(
             name='Sonia Papi',
             username='sonia.papi',
             bio='✨ Content Creator | 📸 Photography Enthusiast | 🌍 Travel Lover | 💼 Digital Marketing Pro',
@@ -26,9 +28,7 @@ def seed_database():
             email='hello@soniapapi.com',
             phone='+44 20 1234 5678',
             website='https://soniapapi.com'
-        )
-        session.add(user)
-        session.flush()
+        )])
         
         # Add social links
         social_platforms = [
@@ -39,9 +39,10 @@ def seed_database():
             ('tiktok', 'https://tiktok.com/@sonia.papi')
         ]
         
-        for platform, url in social_platforms:
-            social_link = SocialLink(user_id=user.id, platform=platform, url=url)
-            session.add(social_link)
+        bulk_insert(session, SocialLink, (
+            {'user_id': user_id, 'platform': platform, 'url': url}
+            for platform, url in social_platforms
+        ))
         
         # Add gallery items
         gallery_items = [
@@ -101,9 +102,7 @@ def seed_database():
             }
         ]
         
-        for item_data in gallery_items:
-            gallery_item = GalleryItem(user_id=user.id, **item_data)
-            session.add(gallery_item)
+        bulk_insert(session, GalleryItem, ({'user_id': user_id, **item_data} for item_data in gallery_items))
         
         # Add posts
         base_time = datetime.now()
@@ -164,11 +163,17 @@ def seed_database():
             }
         ]
         
-        for post_data in posts_data:
-            post = Post(user_id=user.id, **post_data)
-            session.add(post)
+        bulk_insert(session, Post, ({'user_id': user_id, **post_data} for post_data in posts_data))
+        DatabaseOperations._bump_engagement_totals(session, {user_id: {
+            'posts': len(posts_data),
+            **{counter: sum(post[counter] for post in posts_data) for counter in ('likes', 'shares', 'views')}
+        }})
         
         session.commit()
+        invalidate([
+            ('profile', 'sonia.papi'), ('posts', user_id), ('posts', None),
+            ('gallery', user_id), ('gallery', None), ('search',)
+        ])
         print("Database seeded successfully!")
         
     except Exception as e:
@@ -0,0 +1,260 @@
+"""Deterministic synthetic data for load and capacity testing.
+
+Generates users, social links, posts, gallery items, comments and
+analytics events with skewed engagement (a few users and posts get most
+of it), bursts of trending hashtags, and timestamps spread over a window
+with a diurnal cycle and a bias towards recent days. Rows are streamed
+from generators straight into batched bulk inserts; only per-user and
+per-post weights and ids are kept in memory.
+
+The same seed, counts and ``end`` produce the same rows. Scale factor 1
+is about one million rows:
+
+    python -m database.synthetic_data --scale 10
+"""
+from database.schema import User, SocialLink, Post, GalleryItem, Comment, Analytics, init_db, get_session
+from database.bulk import bulk_insert
+from database.operations import DatabaseOperations
+from database.cache import get_read_cache
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+import argparse
+import bisect
+import random
+import time
+
+# Row counts at scale factor 1
+BASE_COUNTS = {
+    'users': 1000,
+    'posts': 50000,
+    'gallery_items': 10000,
+    'comments': 200000,
+    'analytics_events': 739000
+}
+
+HASHTAGS = [
+    'Travel', 'Food', 'Fitness', 'Fashion', 'Photography', 'Art', 'Music', 'Nature',
+    'Motivation', 'Gratitude', 'Lifestyle', 'Tech', 'Books', 'Coffee', 'Design', 'Wellness',
+    'Adventure', 'Wanderlust', 'StreetArt', 'Cooking', 'Summer', 'Weekend', 'BTS', 'London',
+    'Sunset', 'Beach', 'Mountains', 'Yoga', 'Running', 'Gaming', 'Pets', 'DIY'
+]
+CAPTIONS = [
+    'Another beautiful morning!', 'Behind the scenes of today\'s shoot.',
+    'Trying something new in the kitchen.', 'Consistency is key.',
+    'Exploring the city this weekend.', 'Can you guess where I am?',
+    'Throwback to an amazing trip.', 'Small wins every day.',
+    'New project coming soon!', 'Golden hour never disappoints.'
+]
+COMMENTS = [
+    'Love this!', 'So inspiring 😍', 'Where is this?', 'Amazing shot!',
+    'Need the recipe!', 'Goals 🙌', 'This made my day', 'Wow!', 'Great work', '🔥🔥🔥'
+]
+CATEGORIES = ['Travel', 'Lifestyle', 'Photography', 'Fashion', 'Food', 'Fitness']
+CATEGORY_WEIGHTS = [30, 20, 18, 14, 10, 8]
+GALLERY_WORDS = ['Sunset', 'Street', 'Morning', 'City', 'Coffee', 'Haul', 'Workout', 'Pasta', 'Portrait', 'Skyline']
+PLATFORMS = ['snapchat', 'instagram', 'twitter', 'linkedin', 'tiktok']
+EVENT_TYPES = ['profile_view', 'post_view', 'gallery_view', 'like', 'share', 'search']
+EVENT_WEIGHTS = [40, 30, 12, 12, 3, 3]
+# Relative activity per hour of day (UTC)
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 6, 7, 7, 7, 8, 9, 8, 7, 7, 8, 9, 10, 11, 10, 8, 5, 3]
+HOURLY_CUM_WEIGHTS = list(accumulate(HOURLY_WEIGHTS))
+
+def _rng(seed, stream):
+    # One independent stream per table, so changing one count leaves the others alone
+    return random.Random(f"{seed}:{stream}")
+
+def _pick(rng, cum_weights):
+    """Index drawn in proportion to the weights behind ``cum_weights``"""
+    index = bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+    return min(index, len(cum_weights) - 1)
+
+def _timestamp(rng, end, days):
+    """A time in the ``days`` before ``end``, biased to recent days and busy hours"""
+    day_offset = int(days * rng.random() ** 1.5)
+    hour = rng.choices(range(24), cum_weights=HOURLY_CUM_WEIGHTS)[0]
+    return end - timedelta(days=day_offset + 1) + timedelta(
+        hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60)
+    )
+
+def _hashtag_bursts(seed, days):
+    """Map day offset to the hashtags trending on that day"""
+    rng = _rng(seed, 'bursts')
+    bursts = {}
+    for day in range(days):
+        if rng.random() < 0.15:
+            tag = rng.choice(HASHTAGS)
+            for offset in range(day, min(days, day + rng.randint(1, 4))):
+                bursts.setdefault(offset, []).append(tag)
+    return bursts
+
+def _caption(rng, timestamp, end, bursts):
+    tags = rng.sample(HASHTAGS, rng.randint(1, 3))
+    trending = bursts.get((end - timestamp).days)
+    if trending and rng.random() < 0.6:
+        tags[0] = rng.choice(trending)
+    return f"{rng.choice(CAPTIONS)} " + ' '.join(f"#{tag}" for tag in tags)
+
+def _insert(model, rows, return_ids=False):
+    session = get_session()
+    try:
+        result = bulk_insert(session, model, rows, return_ids=return_ids)
+        session.commit()
+        return result
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+def generate_synthetic_data(users=None, posts=None, gallery_items=None, comments=None,
+                            analytics_events=None, scale=1.0, seed=42, days=365,
+                            end=None, username_prefix='synthetic_'):
+    """Stream a synthetic dataset into the database and return the row counts
+
+    Counts default to BASE_COUNTS times ``scale``. Timestamps fall in the
+    ``days`` before ``end`` (default: the start of today, UTC). Usernames
+    are ``username_prefix`` plus a number, so use a fresh prefix to add a
+    second dataset to the same database.
+    """
+    counts = {name: int(base * scale) for name, base in BASE_COUNTS.items()}
+    for name, value in (('users', users), ('posts', posts), ('gallery_items', gallery_items),
+                        ('comments', comments), ('analytics_events', analytics_events)):
+        if value is not None:
+            counts[name] = value
+    counts['users'] = max(counts['users'], 1)
+    end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    bursts = _hashtag_bursts(seed, days)
+
+    # Engagement follows a Pareto (80/20) distribution over users
+    rng = _rng(seed, 'users')
+    user_weights = [min(rng.paretovariate(1.16), 1000.0) for _ in range(counts['users'])]
+    user_cum_weights = array('d', accumulate(user_weights))
+
+    def user_rows(rng):
+        for index, weight in enumerate(user_weights):
+            yield {
+                'name': f"Synthetic User {index}",
+                'username': f"{username_prefix}{index}",
+                'bio': f"{rng.choice(CAPTIONS)} #{rng.choice(HASHTAGS)}",
+                'followers': int(50 * weight ** 1.5) + rng.randrange(50),
+                'following': rng.randrange(20, 1500),
+                'location': rng.choice(['London, UK', 'Paris, FR', 'New York, US', 'Lagos, NG', 'Tokyo, JP']),
+                'joined_date': end - timedelta(days=rng.randrange(days, days * 4)),
+                'verification_status': weight > 20,
+                'email': f"{username_prefix}{index}@example.com"
+            }
+
+    started = time.monotonic()
+    user_ids = array('q', _insert(User, user_rows(rng), return_ids=True))
+
+    def social_link_rows(rng):
+        for user_id in user_ids:
+            for platform in rng.sample(PLATFORMS, rng.randint(0, 3)):
+                yield {'user_id': user_id, 'platform': platform, 'url': f"https://{platform}.com/u{user_id}"}
+    counts['social_links'] = _insert(SocialLink, social_link_rows(_rng(seed, 'social_links')))
+
+    # Post ids, ages and comment weights are the only per-post state kept
+    post_ages = array('d')
+    post_cum_weights = array('d')
+    def post_rows(rng):
+        total = 0.0
+        for _ in range(counts['posts']):
+            author = _pick(rng, user_cum_weights)
+            timestamp = _timestamp(rng, end, days)
+            likes = int(rng.lognormvariate(2.5, 1.0) * user_weights[author])
+            post_ages.append((end - timestamp).total_seconds())
+            total += likes + 1
+            post_cum_weights.append(total)
+            yield {
+                'user_id': user_ids[author],
+                'caption': _caption(rng, timestamp, end, bursts),
+                'post_type': rng.choice(['post', 'post', 'story']),
+                'media_type': rng.choice(['image', 'image', 'video', None]),
+                'likes': likes,
+                'shares': int(likes * rng.uniform(0.005, 0.05)),
+                'views': likes * rng.randint(5, 25) + rng.randrange(50),
+                'timestamp': timestamp
+            }
+    post_ids = array('q', _insert(Post, post_rows(_rng(seed, 'posts')), return_ids=True))
+
+    category_cum_weights = list(accumulate(CATEGORY_WEIGHTS))
+    def gallery_rows(rng):
+        for _ in range(counts['gallery_items']):
+            author = _pick(rng, user_cum_weights)
+            likes = int(rng.lognormvariate(3.0, 1.0) * user_weights[author])
+            category = rng.choices(CATEGORIES, cum_weights=category_cum_weights)[0]
+            yield {
+                'user_id': user_ids[author],
+                'title': f"{rng.choice(GALLERY_WORDS)} {rng.choice(GALLERY_WORDS)}",
+                'item_type': rng.choice(['image', 'image', 'video']),
+                'category': category,
+                'description': f"{rng.choice(CAPTIONS)} #{category}",
+                'likes': likes,
+                'views': likes * rng.randint(4, 12) + rng.randrange(100),
+                'upload_date': _timestamp(rng, end, days)
+            }
+    _insert(GalleryItem, gallery_rows(_rng(seed, 'gallery_items')))
+
+    # Comments go to posts in proportion to their likes, a few hours after posting
+    def comment_rows(rng):
+        if not post_ids:
+            return
+        for _ in range(counts['comments']):
+            post = _pick(rng, post_cum_weights)
+            age = max(post_ages[post] - rng.expovariate(1 / 21600), 1)
+            yield {
+                'post_id': post_ids[post],
+                'user_id': user_ids[rng.randrange(len(user_ids))],
+                'content': rng.choice(COMMENTS),
+                'timestamp': end - timedelta(seconds=age),
+                'likes': int(rng.expovariate(0.5))
+            }
+    counts['comments'] = _insert(Comment, comment_rows(_rng(seed, 'comments')))
+
+    event_cum_weights = list(accumulate(EVENT_WEIGHTS))
+    def event_rows(rng):
+        for _ in range(counts['analytics_events']):
+            event_type = rng.choices(EVENT_TYPES, cum_weights=event_cum_weights)[0]
+            event_data = None
+            if event_type in ('post_view', 'like', 'share') and post_ids:
+                event_data = f"post:{post_ids[_pick(rng, post_cum_weights)]}"
+            yield {
+                'user_id': user_ids[_pick(rng, user_cum_weights)],
+                'event_type': event_type,
+                'event_data': event_data,
+                'timestamp': _timestamp(rng, end, days)
+            }
+    _insert(Analytics, event_rows(_rng(seed, 'analytics')))
+    DatabaseOperations.rebuild_analytics_rollups()
+    DatabaseOperations.reconcile_engagement_totals()
+    get_read_cache().clear()
+
+    counts['elapsed_seconds'] = round(time.monotonic() - started, 1)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset for load testing")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplier for the default row counts (1 = ~1M rows)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365, help="Width of the timestamp window")
+    parser.add_argument('--end', type=datetime.fromisoformat, default=None, help="End of the window (ISO date); fix it for reproducible runs")
+    parser.add_argument('--username-prefix', default='synthetic_')
+    for name in BASE_COUNTS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None)
+    args = parser.parse_args()
+
+    init_db()
+    counts = generate_synthetic_data(
+        users=args.users,
+        posts=args.posts,
+        gallery_items=args.gallery_items,
+        comments=args.comments,
+        analytics_events=args.analytics_events,
+        scale=args.scale,
+        seed=args.seed,
+        days=args.days,
+        end=args.end,
+        username_prefix=args.username_prefix
+    )
+    print(f"Synthetic data generated: {counts}")
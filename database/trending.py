@@ -0,0 +1,274 @@
+"""Streaming trending-hashtag counts in bounded memory.
+
+Hashtags are pulled out of post captions and counted per hour in a ring
+of TRENDING_WINDOW_HOURS Count-Min sketches, each hour also keeping its
+TRENDING_TOP_K most frequent tags as candidates. ``top(n, hours)`` sums
+the sketches of the last ``hours`` hours, weighting each by exponential
+decay with a half-life of TRENDING_HALF_LIFE_HOURS, and ranks the
+candidates on that sum. Memory and query cost depend only on those
+settings, not on the number of posts or distinct tags; counts are
+estimates that can only err upwards.
+
+The engine lives in process memory and is fed from the database, so it
+sees posts written by any process: at most every
+TRENDING_REFRESH_SECONDS a background thread reads the posts, and the
+caption_edits rows that update_post writes for tags an edit adds, with
+ids past those it has counted (``catch_up``). The first catch-up in a
+process backfills the window, so results fill in shortly after startup.
+"""
+from database.schema import Post, CaptionEdit, _env_int, get_session
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+import logging
+import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
+# Ids below the highest one counted that a catch-up reads again, for rows
+# whose transactions committed out of id order
+ID_OVERLAP = 1000
+
+def extract_hashtags(text):
+    """Hashtags in ``text`` as {lowercased tag: spelling as written}, each once"""
+    return {match.lower(): match for match in HASHTAG_PATTERN.findall(text or '')}
+
+def _hour(moment):
+    return int((moment - datetime(1970, 1, 1)).total_seconds() // 3600)
+
+class TrendingHashtags:
+    """Hourly Count-Min sketches with per-hour top-K candidates over a sliding window"""
+
+    def __init__(self, window_hours=168, half_life_hours=24.0, width=2048, depth=4, top_k=50):
+        self.window_hours = window_hours
+        self.half_life_hours = half_life_hours
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self._sketches = np.zeros((window_hours, depth, width), dtype=np.int64)
+        # Hour held by each ring slot, -1 while unused
+        self._slot_hours = np.full(window_hours, -1, dtype=np.int64)
+        self._candidates = [{} for _ in range(window_hours)]
+        self._heaps = [[] for _ in range(window_hours)]
+        self._labels = {}
+        self._rows = np.arange(depth)
+        self._lock = threading.Lock()
+        # Per source: highest id counted and the counted ids within ID_OVERLAP of it
+        self._progress = {'posts': (0, set()), 'edits': (0, set())}
+
+    @classmethod
+    def from_env(cls):
+        """Build an engine configured from TRENDING_* environment variables"""
+        return cls(
+            window_hours=_env_int('TRENDING_WINDOW_HOURS', 168),
+            half_life_hours=float(os.getenv('TRENDING_HALF_LIFE_HOURS') or 24.0),
+            width=_env_int('TRENDING_SKETCH_WIDTH', 2048),
+            depth=_env_int('TRENDING_SKETCH_DEPTH', 4),
+            top_k=_env_int('TRENDING_TOP_K', 50)
+        )
+
+    def _columns(self, tag):
+        # One digest split into a column per sketch row
+        digest = hashlib.blake2b(tag.encode(), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+
+    def _slot(self, hour):
+        """Ring slot for ``hour``, cleared first if it still holds an older hour"""
+        slot = hour % self.window_hours
+        if self._slot_hours[slot] != hour:
+            self._sketches[slot] = 0
+            self._candidates[slot] = {}
+            self._heaps[slot] = []
+            self._slot_hours[slot] = hour
+        return slot
+
+    def _offer(self, slot, tag, estimate):
+        """Keep ``tag`` among the slot's top-K candidates if its estimate is high enough"""
+        candidates, heap = self._candidates[slot], self._heaps[slot]
+        if tag in candidates or len(candidates) < self.top_k:
+            candidates[tag] = estimate
+            heapq.heappush(heap, (estimate, tag))
+        else:
+            # Drop heap entries made stale by later increments
+            while heap[0][0] != candidates.get(heap[0][1]):
+                heapq.heappop(heap)
+            if estimate > heap[0][0]:
+                _, evicted = heapq.heapreplace(heap, (estimate, tag))
+                del candidates[evicted]
+                candidates[tag] = estimate
+        if len(heap) > 4 * self.top_k:
+            self._heaps[slot] = [(count, tag) for tag, count in candidates.items()]
+            heapq.heapify(self._heaps[slot])
+
+    def add(self, tags, moment=None, count=1):
+        """Count hashtags (as returned by extract_hashtags) seen at ``moment``"""
+        moment = moment or datetime.utcnow()
+        hour = _hour(moment)
+        current = _hour(datetime.utcnow())
+        with self._lock:
+            # Ignore anything that has left the window (or would overwrite a newer hour)
+            if hour <= max(int(self._slot_hours.max()), current) - self.window_hours or hour > current + 1:
+                return
+            slot = self._slot(hour)
+            sketch = self._sketches[slot]
+            for tag, label in tags.items():
+                columns = self._columns(tag)
+                sketch[self._rows, columns] += count
+                self._offer(slot, tag, int(sketch[self._rows, columns].min()))
+                self._labels[tag] = label
+            if len(self._labels) > 4 * self.top_k * self.window_hours:
+                live = set().union(*self._candidates)
+                self._labels = {tag: label for tag, label in self._labels.items() if tag in live}
+
+    def top(self, n=10, hours=24, now=None):
+        """The ``n`` hashtags with the highest decayed counts over the last ``hours`` hours
+
+        Returns dicts with the tag as written, its decayed 'score' and its
+        estimated 'count' in the window.
+        """
+        current = _hour(now or datetime.utcnow())
+        hours = min(hours, self.window_hours)
+        with self._lock:
+            ages = current - self._slot_hours
+            in_window = (self._slot_hours >= 0) & (ages >= 0) & (ages < hours)
+            if not in_window.any():
+                return []
+            slots = np.flatnonzero(in_window)
+            weights = 0.5 ** (ages[slots] / self.half_life_hours)
+            decayed = np.tensordot(weights, self._sketches[slots], axes=1)
+            counts = self._sketches[slots].sum(axis=0)
+            tags = list(set().union(*(self._candidates[slot] for slot in slots)))
+            labels = [self._labels.get(tag, tag) for tag in tags]
+        if not tags:
+            return []
+        columns = np.stack([self._columns(tag) for tag in tags])
+        scores = decayed[self._rows, columns].min(axis=1)
+        estimates = counts[self._rows, columns].min(axis=1)
+        ranked = np.argsort(-scores, kind='stable')[:n]
+        return [
+            {'tag': f"#{labels[i]}", 'score': round(float(scores[i]), 2), 'count': int(estimates[i])}
+            for i in ranked
+        ]
+
+    def catch_up(self, now=None, batch_size=5000):
+        """Count the posts and caption edits added since the last catch-up; returns rows read
+
+        The first call reads every post inside the window. Caption edits
+        that have left the window are deleted.
+        """
+        now = now or datetime.utcnow()
+        since = now - timedelta(hours=self.window_hours)
+        session = get_session()
+        try:
+            previous_id, previous_counted = self._progress['posts'][0], set(self._progress['posts'][1])
+            posts = self._consume(session, 'posts', select(Post.id, Post.caption, Post.timestamp), since, batch_size)
+            last_id = self._progress['posts'][0]
+
+            def read_now(post_id, post_timestamp):
+                # Such a post was just read with its edits already in its caption
+                return (
+                    previous_id - ID_OVERLAP < post_id <= last_id and post_id not in previous_counted
+                    and post_timestamp is not None and post_timestamp >= since
+                )
+
+            edits = self._consume(
+                session, 'edits',
+                select(CaptionEdit.id, CaptionEdit.added_tags, CaptionEdit.timestamp, CaptionEdit.post_id, Post.timestamp)
+                .outerjoin(Post, Post.id == CaptionEdit.post_id),
+                since, batch_size, skip=read_now
+            )
+            session.execute(delete(CaptionEdit).where(CaptionEdit.timestamp < since))
+            session.commit()
+            return posts + edits
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def _consume(self, session, source, statement, since, batch_size, skip=None):
+        """Count the rows of ``statement`` not yet counted from ``source``; returns how many were read
+
+        Rows are (id, text, timestamp, *extra); rows for which
+        ``skip(*extra)`` is true are marked counted without counting.
+        """
+        id_column, timestamp_column = statement.selected_columns[0], statement.selected_columns[2]
+        last_id, counted = self._progress[source]
+        result = session.execute(
+            statement.where(id_column > last_id - ID_OVERLAP, timestamp_column >= since)
+            .order_by(id_column)
+            .execution_options(yield_per=batch_size)
+        )
+        read = 0
+        for row_id, text, timestamp, *extra in result:
+            if row_id in counted:
+                continue
+            if skip is None or not skip(*extra):
+                self.add(extract_hashtags(text), timestamp)
+            counted.add(row_id)
+            last_id = max(last_id, row_id)
+            read += 1
+        self._progress[source] = (last_id, {row_id for row_id in counted if row_id > last_id - ID_OVERLAP})
+        return read
+
+_engine = None
+_engine_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_next_refresh = 0.0
+
+def refresh_interval():
+    return float(os.getenv('TRENDING_REFRESH_SECONDS') or 10.0)
+
+def get_trending():
+    """Return the process-wide engine, starting a background catch-up when one is due"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TrendingHashtags.from_env()
+    refresh_if_due()
+    return _engine
+
+def refresh_if_due():
+    """Start a catch-up thread unless one is running or the last started recently
+
+    Returns the thread, or None when no catch-up was started.
+    """
+    global _next_refresh
+    if time.monotonic() < _next_refresh or not _refresh_lock.acquire(blocking=False):
+        return None
+    _next_refresh = time.monotonic() + refresh_interval()
+    thread = threading.Thread(target=_run_catch_up, name='trending-catch-up', daemon=True)
+    thread.start()
+    return thread
+
+def _run_catch_up():
+    try:
+        _engine.catch_up()
+    except Exception:
+        logger.exception("Trending hashtag catch-up failed")
+    finally:
+        _refresh_lock.release()
+
+def record_caption_edit(session, post_id, previous, caption):
+    """Queue the hashtags an edit adds to a caption for every process's engine
+
+    Call inside the edit's transaction so the row commits with it.
+    """
+    old_tags = extract_hashtags(previous)
+    added = [label for tag, label in extract_hashtags(caption).items() if tag not in old_tags]
+    if added:
+        session.add(CaptionEdit(post_id=post_id, added_tags=' '.join(f"#{label}" for label in added)))
+
+if __name__ == "__main__":
+    trending = TrendingHashtags.from_env()
+    trending.catch_up()
+    for hours in (24, trending.window_hours):
+        print(f"Top hashtags, last {hours}h: {trending.top(10, hours)}")
@@ -0,0 +1,230 @@
+"""Approximate unique-viewer counts with HyperLogLog sketches.
+
+Each (entity_type, entity_id, day) gets a HyperLogLog sketch of
+2**UNIQUE_VIEWERS_PRECISION one-byte registers (4 KB at the default of
+12, about 1.6% standard error). A view sets one register to the maximum
+of its current value and the rank of the viewer's hash, so repeat views
+change nothing, and sketches merge by taking register-wise maxima:
+across days for "unique viewers over the last N days", and across
+processes when a flush folds its registers into the stored row.
+
+Views are collected in memory as sparse register updates and written by
+a background thread every UNIQUE_VIEWERS_FLUSH_INTERVAL seconds, one
+batched read-merge-write per flush. Stored sketches are zlib-compressed,
+so rarely viewed entities take a few dozen bytes and busy ones a few KB.
+Rows older than UNIQUE_VIEWERS_RETENTION_DAYS are removed by
+
+    python -m database.unique_viewers
+"""
+from database.schema import UniqueViewerSketch, _env_int, get_session
+from database.cache import invalidate
+from datetime import datetime, timedelta
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import zlib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Entities with their own sketches: a user's profile, everything a user
+# published ('content'), and single posts and gallery items
+ENTITY_TYPES = ('profile', 'content', 'post', 'gallery')
+
+def viewer_precision():
+    return _env_int('UNIQUE_VIEWERS_PRECISION', 12)
+
+def register_position(viewer_key, precision):
+    """Register index and rank that ``viewer_key`` sets in a sketch"""
+    value = int.from_bytes(hashlib.blake2b(str(viewer_key).encode(), digest_size=8).digest(), 'big')
+    rest_bits = 64 - precision
+    rest = value & ((1 << rest_bits) - 1)
+    return value >> rest_bits, rest_bits - rest.bit_length() + 1
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 2**precision registers"""
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, viewer_key):
+        index, rank = register_position(viewer_key, self.precision)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, positions):
+        """Apply a {register index: rank} mapping of pending views"""
+        if positions:
+            indexes = np.fromiter(positions.keys(), dtype=np.int64, count=len(positions))
+            ranks = np.fromiter(positions.values(), dtype=np.uint8, count=len(positions))
+            np.maximum.at(self.registers, indexes, ranks)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {other.precision} and {self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimated number of distinct viewers"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data):
+        registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return cls(data[0], registers)
+
+class ViewerBuffer:
+    """Pending register updates per (entity_type, entity_id, day), flushed in batches by a daemon thread"""
+
+    def __init__(self, writer, precision=12, flush_interval=5.0):
+        self.writer = writer
+        self.precision = precision
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._counters = {
+            'views': 0,
+            'flushed_sketches': 0,
+            'flushes': 0,
+            'failed_flushes': 0
+        }
+
+    @classmethod
+    def from_env(cls, writer):
+        """Build a buffer configured from UNIQUE_VIEWERS_* environment variables"""
+        return cls(
+            writer,
+            precision=viewer_precision(),
+            flush_interval=float(os.getenv('UNIQUE_VIEWERS_FLUSH_INTERVAL') or 5.0)
+        )
+
+    @staticmethod
+    def _raise(positions, index, rank):
+        if rank > positions.get(index, 0):
+            positions[index] = rank
+
+    def add(self, viewer_key, entities, day=None):
+        """Record that ``viewer_key`` viewed each (entity_type, entity_id) on ``day`` (today by default)"""
+        day = day or datetime.utcnow().date()
+        index, rank = register_position(viewer_key, self.precision)
+        with self._lock:
+            for entity_type, entity_id in entities:
+                self._raise(self._pending.setdefault((entity_type, entity_id, day), {}), index, rank)
+                self._counters['views'] += 1
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name='unique-viewers', daemon=True)
+                self._thread.start()
+
+    def pending(self, entity_type, entity_ids, since):
+        """Unwritten register updates of the entities from ``since`` on, merged per entity id"""
+        wanted = set(entity_ids)
+        merged = {}
+        with self._lock:
+            for batch in (self._in_flight, self._pending):
+                for (pending_type, entity_id, day), positions in batch.items():
+                    if pending_type != entity_type or entity_id not in wanted or day < since:
+                        continue
+                    target = merged.setdefault(entity_id, {})
+                    for index, rank in positions.items():
+                        self._raise(target, index, rank)
+        return merged
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Merge all pending views into the stored sketches; returns the number of sketches written"""
+        with self._flush_lock:
+            with self._lock:
+                self._in_flight, self._pending = self._pending, {}
+                batch = self._in_flight
+            if not batch:
+                return 0
+            try:
+                self.writer(batch)
+            except Exception:
+                logger.exception('Failed to flush %d viewer sketches', len(batch))
+                with self._lock:
+                    # Keep the updates so the next flush retries them
+                    for key, positions in batch.items():
+                        target = self._pending.setdefault(key, {})
+                        for index, rank in positions.items():
+                            self._raise(target, index, rank)
+                    self._in_flight = {}
+                    self._counters['failed_flushes'] += 1
+                return 0
+
+            with self._lock:
+                self._in_flight = {}
+                self._counters['flushes'] += 1
+                self._counters['flushed_sketches'] += len(batch)
+            return len(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the background thread and flush the remaining views"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        """Return the number of pending sketches and lifetime counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['pending_sketches'] = len(self._pending)
+        return stats
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_viewer_buffer(writer):
+    """Return the process-wide buffer, creating it on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ViewerBuffer.from_env(writer)
+                atexit.register(_buffer.stop)
+    return _buffer
+
+def prune_sketches(retention_days=None, today=None):
+    """Delete sketches of days before the retention period; returns the number of rows removed"""
+    retention_days = retention_days or _env_int('UNIQUE_VIEWERS_RETENTION_DAYS', 90)
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+    session = get_session()
+    try:
+        removed = session.query(UniqueViewerSketch).filter(UniqueViewerSketch.day < cutoff).delete(synchronize_session=False)
+        session.commit()
+        if removed:
+            invalidate([('unique_viewers', entity_type) for entity_type in ENTITY_TYPES])
+        return removed
+    except Exception as e:
+        session.rollback()
+        raise e
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    removed = prune_sketches()
+    print(f"Removed {removed} viewer sketches past the retention period")
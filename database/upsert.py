@@ -0,0 +1,87 @@
+"""Dialect-aware upserts used by the summary and history tables"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+def increment_upsert(session, model, rows, key_columns, counter_columns):
+    """Insert rows, or add their counters onto the existing row with the same key
+
+    Keys must be unique within ``rows``. Rows are written in key order so
+    concurrent writers lock them in the same order.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[col] for col in key_columns))
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={col: table.c[col] + statement.excluded[col] for col in counter_columns}
+        )
+        session.execute(statement, rows)
+        return
+
+    for row in rows:
+        key = {col: row[col] for col in key_columns}
+        updated = session.query(model).filter_by(**key).update(
+            {table.c[col]: table.c[col] + row[col] for col in counter_columns},
+            synchronize_session=False
+        )
+        if not updated:
+            session.add(model(**row))
+    session.flush()
+
+def replace_upsert(session, model, rows, key_columns, value_columns):
+    """Insert rows, or overwrite ``value_columns`` of the existing row with the same key
+
+    Keys must be unique within ``rows``.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[col] for col in key_columns))
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={col: statement.excluded[col] for col in value_columns}
+        )
+        session.execute(statement, rows)
+        return
+
+    for row in rows:
+        key = {col: row[col] for col in key_columns}
+        updated = session.query(model).filter_by(**key).update(
+            {table.c[col]: row[col] for col in value_columns},
+            synchronize_session=False
+        )
+        if not updated:
+            session.add(model(**row))
+    session.flush()
+
+def insert_missing(session, model, rows, key_columns):
+    """Insert the rows whose key is not taken yet, leaving existing rows untouched
+
+    Keys must be unique within ``rows``.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[col] for col in key_columns))
+    table = model.__table__
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        session.execute(insert(table).on_conflict_do_nothing(index_elements=key_columns), rows)
+        return
+
+    for row in rows:
+        key = {col: row[col] for col in key_columns}
+        if session.query(model).filter_by(**key).first() is None:
+            session.add(model(**row))
+    session.flush()
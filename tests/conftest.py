@@ -0,0 +1,32 @@
+import pytest
+from database.schema import dispose_engine, init_db
+from sqlalchemy import event
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database with the full schema, reached without the read cache or buffers"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'profile.db'}")
+    monkeypatch.setenv('READ_CACHE_ENABLED', '0')
+    monkeypatch.setenv('COUNTER_BUFFER_ENABLED', '0')
+    monkeypatch.delenv('DATABASE_REPLICA_URLS', raising=False)
+    dispose_engine()
+    engine = init_db()
+    yield engine
+    dispose_engine()
+
+@pytest.fixture
+def statements(database):
+    """SQL of every statement executed on the test database from here on"""
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(database, 'before_cursor_execute', record)
+    yield executed
+    event.remove(database, 'before_cursor_execute', record)
+
+@pytest.fixture
+def user_id(database):
+    from database.operations import DatabaseOperations
+    return DatabaseOperations.add_users_bulk([{'name': 'Test User', 'username': 'test.user'}])[0]
@@ -0,0 +1,62 @@
+from database.analytics_buffer import AnalyticsBuffer
+from database.operations import DatabaseOperations
+
+class FlakyWriter:
+    """Records written batches, raising while ``failing`` is set"""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self.batches = []
+
+    def __call__(self, batch):
+        if self.failing:
+            raise RuntimeError('write failed')
+        self.batches.append(batch)
+
+def test_flush_writes_queued_events_in_batches():
+    writer = FlakyWriter()
+    buffer = AnalyticsBuffer(writer, max_batch=2, flush_interval=3600)
+    for event_type in ('profile_view', 'post_view', 'like'):
+        assert buffer.record(1, event_type)
+    assert buffer.flush() == 3
+    assert [len(batch) for batch in writer.batches] == [2, 1]
+    assert buffer.stats()['queue_depth'] == 0
+    buffer.stop()
+
+def test_flush_failure_drops_and_counts_the_batch():
+    writer = FlakyWriter(failing=True)
+    buffer = AnalyticsBuffer(writer, max_batch=10, flush_interval=3600)
+    assert buffer.record(1, 'profile_view')
+    assert buffer.flush() == 0
+    assert buffer.stats()['dropped'] == 1
+    assert buffer.stats()['failed_flushes'] == 1
+
+    writer.failing = False
+    assert buffer.record(1, 'post_view')
+    assert buffer.flush() == 1
+    assert [event['event_type'] for event in writer.batches[0]] == ['post_view']
+    buffer.stop()
+
+def test_full_queue_drops_new_events():
+    buffer = AnalyticsBuffer(FlakyWriter(), max_batch=10, flush_interval=3600, max_queue=2)
+    assert buffer.record(1, 'a') and buffer.record(1, 'b')
+    assert not buffer.record(1, 'c')
+    assert buffer.stats()['dropped'] == 1
+    buffer.stop()
+
+def test_repeats_collapse_within_the_window():
+    buffer = AnalyticsBuffer(FlakyWriter(), flush_interval=3600, dedupe_window=60)
+    assert buffer.record(1, 'profile_view', session_key='browser')
+    assert not buffer.record(1, 'profile_view', session_key='browser')
+    assert buffer.record(1, 'profile_view', session_key='other')
+    assert buffer.stats()['collapsed'] == 1
+    buffer.stop()
+
+def test_flushed_events_reach_the_summary(user_id):
+    buffer = AnalyticsBuffer(DatabaseOperations.track_analytics_bulk, flush_interval=3600)
+    for event_type in ('profile_view', 'profile_view', 'post_view'):
+        buffer.record(user_id, event_type)
+    assert buffer.flush() == 3
+    summary = DatabaseOperations.get_analytics_summary(user_id)
+    assert summary == {'total_events': 3, 'events_by_type': {'profile_view': 2, 'post_view': 1}}
+    buffer.stop()
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from database.operations import DatabaseOperations
+from database.schema import AnalyticsDailyRollup, get_session
+
+def _rollups():
+    session = get_session()
+    try:
+        return {
+            (row.user_id, row.day, row.event_type): row.count
+            for row in session.query(AnalyticsDailyRollup)
+        }
+    finally:
+        session.close()
+
+def test_writes_keep_the_daily_rollups_current(user_id):
+    now = datetime.utcnow()
+    yesterday = now - timedelta(days=1)
+    DatabaseOperations.track_analytics(user_id, 'profile_view')
+    DatabaseOperations.track_analytics_bulk([
+        {'user_id': user_id, 'event_type': 'profile_view'},
+        {'user_id': user_id, 'event_type': 'post_view', 'timestamp': yesterday},
+        {'user_id': user_id, 'event_type': 'post_view', 'timestamp': yesterday}
+    ])
+    assert _rollups() == {
+        (user_id, now.date(), 'profile_view'): 2,
+        (user_id, yesterday.date(), 'post_view'): 2
+    }
+
+def test_summary_counts_only_days_inside_the_window(user_id):
+    now = datetime.utcnow()
+    DatabaseOperations.track_analytics_bulk([
+        {'user_id': user_id, 'event_type': 'profile_view', 'timestamp': now},
+        {'user_id': user_id, 'event_type': 'profile_view', 'timestamp': now - timedelta(days=6)},
+        {'user_id': user_id, 'event_type': 'post_view', 'timestamp': now - timedelta(days=7)}
+    ])
+    assert DatabaseOperations.get_analytics_summary(user_id, days=7) == {
+        'total_events': 2, 'events_by_type': {'profile_view': 2}
+    }
+    assert DatabaseOperations.get_analytics_summary(user_id, days=8)['total_events'] == 3
+
+def test_rebuild_recomputes_the_rollups_from_raw_events(user_id):
+    other = DatabaseOperations.add_users_bulk([{'name': 'Other', 'username': 'other'}])[0]
+    DatabaseOperations.track_analytics_bulk(
+        [{'user_id': user_id, 'event_type': 'profile_view'}] * 3 + [{'user_id': other, 'event_type': 'like'}]
+    )
+    expected = _rollups()
+
+    session = get_session()
+    session.query(AnalyticsDailyRollup).update({'count': 99})
+    session.commit()
+    session.close()
+
+    DatabaseOperations.rebuild_analytics_rollups(user_id)
+    rebuilt = _rollups()
+    assert {key: count for key, count in rebuilt.items() if key[0] == user_id} == {
+        key: count for key, count in expected.items() if key[0] == user_id
+    }
+    # Only the given user is rebuilt
+    assert [count for key, count in rebuilt.items() if key[0] == other] == [99]
+
+    DatabaseOperations.rebuild_analytics_rollups()
+    assert _rollups() == expected
@@ -0,0 +1,34 @@
+import random
+from benchmarks.operations_benchmark import QueryCounter, build_workloads, run_workload
+from database.operations import DatabaseOperations
+
+def test_rows_are_counted_for_aggregates_and_orm_loads(database, user_id):
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text'} for n in range(3)
+    ])
+    DatabaseOperations.track_analytics_bulk([
+        {'user_id': user_id, 'event_type': event_type}
+        for event_type in ('profile_view', 'profile_view', 'post_like')
+    ])
+    workloads = build_workloads(random.Random(1), [(user_id, 'test.user')], post_ids)
+
+    counter = QueryCounter(database)
+    try:
+        # One summary row per event type, none of them ORM instances
+        summary = run_workload(workloads['analytics_summary'], counter, iterations=4, warmup=0)
+        assert summary['queries_per_call'] >= 1
+        assert summary['rows_per_call'] >= 2
+
+        feed = run_workload(workloads['feed_load'], counter, iterations=2, warmup=0)
+        assert feed['rows_per_call'] >= 4
+
+        # Ids returned by batched INSERT .. RETURNING are fetched rows too
+        counter.rows = 0
+        DatabaseOperations.add_posts_bulk([{'user_id': user_id, 'caption': 'bulk', 'post_type': 'text'}] * 3)
+        assert counter.rows == 3
+    finally:
+        counter.remove(database)
+
+    counter.rows = 0
+    DatabaseOperations.get_posts(user_id=user_id)
+    assert counter.rows == 0
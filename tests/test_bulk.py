@@ -0,0 +1,33 @@
+import random
+import pytest
+from database.operations import DatabaseOperations
+
+@pytest.mark.parametrize('batch_size', ['3', '5000'])
+def test_bulk_ids_come_back_in_input_order(user_id, monkeypatch, batch_size):
+    monkeypatch.setenv('BULK_INSERT_BATCH_SIZE', batch_size)
+    # Shuffled captions, so ids matching the input can't come from sorting by content
+    captions = [f"post {n}" for n in range(10)]
+    random.Random(3).shuffle(captions)
+
+    ids = DatabaseOperations.add_posts_bulk(
+        {'user_id': user_id, 'caption': caption, 'post_type': 'text'} for caption in captions
+    )
+
+    assert len(ids) == len(set(ids)) == 10
+    assert [DatabaseOperations.get_post_by_id(post_id)['caption'] for post_id in ids] == captions
+
+def test_bulk_inserts_fill_defaults_and_keep_ids_per_table(user_id, monkeypatch):
+    monkeypatch.setenv('BULK_INSERT_BATCH_SIZE', '2')
+    post_id = DatabaseOperations.add_post(user_id, 'commented', 'text')
+    contents = ['first', 'second', 'third']
+    comment_ids = DatabaseOperations.add_comments_bulk(
+        {'post_id': post_id, 'user_id': user_id, 'content': content} for content in contents
+    )
+    comments = {comment['id']: comment for comment in DatabaseOperations.get_comments_for_post(post_id)}
+    assert [comments[comment_id]['content'] for comment_id in comment_ids] == contents
+    assert all(comment['likes'] == 0 and comment['timestamp'] for comment in comments.values())
+    assert DatabaseOperations.get_post_totals(user_id)['comments'] == 3
+
+def test_empty_bulk_inserts_return_no_ids(database):
+    assert DatabaseOperations.add_posts_bulk([]) == []
+    assert DatabaseOperations.add_users_bulk(iter([])) == []
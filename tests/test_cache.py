@@ -0,0 +1,144 @@
+import threading
+import time
+import pytest
+from database import cache as read_cache
+from database.cache import ReadCache
+from database.operations import DatabaseOperations
+
+def test_hit_returns_a_copy_without_reloading():
+    cache = ReadCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'items': [1, 2]}
+
+    first = cache.get_or_load('key', loader, [('posts', 1)])
+    first['items'].append(3)
+    assert cache.get_or_load('key', loader, [('posts', 1)]) == {'items': [1, 2]}
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = ReadCache()
+    cache.get_or_load('a', lambda: 'a', [('posts', 1), ('posts', None)])
+    cache.get_or_load('b', lambda: 'b', [('posts', 2)])
+    cache.invalidate([('posts', 1)])
+    assert cache.get_or_load('a', lambda: 'a2', [('posts', 1)]) == 'a2'
+    assert cache.get_or_load('b', lambda: 'b2', [('posts', 2)]) == 'b'
+    assert cache.stats()['invalidations'] == 1
+
+def test_expired_and_evicted_entries_reload():
+    cache = ReadCache(max_entries=2, ttl=0.05)
+    for key in ('a', 'b', 'c'):
+        cache.get_or_load(key, lambda: key, [(key,)])
+    assert cache.stats()['evictions'] == 1
+    assert cache.get_or_load('a', lambda: 'reloaded', [('a',)]) == 'reloaded'
+    time.sleep(0.1)
+    assert cache.get_or_load('c', lambda: 'expired', [('c',)]) == 'expired'
+
+def test_concurrent_misses_share_one_load():
+    cache = ReadCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load('key', loader, [('tag',)])))
+        for _ in range(8)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+    assert cache.stats()['misses'] == 1
+
+def test_invalidation_during_load_is_not_stored():
+    cache = ReadCache()
+
+    def loader():
+        # A write commits while the read is still running
+        cache.invalidate([('post', 7)])
+        return 'old rows'
+
+    assert cache.get_or_load('key', loader, [('post', 7)]) == 'old rows'
+    assert cache.get_or_load('key', lambda: 'new rows', [('post', 7)]) == 'new rows'
+    assert cache.stats()['entries'] == 1
+
+def test_unrelated_invalidation_during_load_is_stored():
+    cache = ReadCache()
+
+    def loader():
+        cache.invalidate([('post', 8)])
+        return 'rows'
+
+    cache.get_or_load('key', loader, [('post', 7)])
+    assert cache.get_or_load('key', lambda: 'reloaded', [('post', 7)]) == 'rows'
+
+def test_tags_derived_from_the_value():
+    cache = ReadCache()
+    tags = lambda value: [('profile', value['username'])]
+
+    def loader(invalidated):
+        # Tags are unknown while the load runs, so every invalidation is remembered
+        cache.invalidate([('profile', invalidated)])
+        return {'username': 'sonia.papi'}
+
+    cache.get_or_load('changed', lambda: loader('sonia.papi'), tags)
+    assert cache.stats()['entries'] == 0
+    cache.get_or_load('unrelated', lambda: loader('someone'), tags)
+    assert cache.stats()['entries'] == 1
+    cache.invalidate([('profile', 'sonia.papi')])
+    assert cache.stats()['entries'] == 0
+
+def test_failed_load_is_not_stored():
+    cache = ReadCache()
+
+    def failing():
+        raise RuntimeError('database down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('key', failing, [('tag',)])
+    assert cache.get_or_load('key', lambda: 'value', [('tag',)]) == 'value'
+
+def test_recently_invalidated_tags_are_not_stored_and_pruned():
+    cache = ReadCache(stale_window=0.05)
+    cache.invalidate([('post', 1)])
+    cache.get_or_load('key', lambda: 'maybe stale', [('post', 1)])
+    assert cache.stats()['entries'] == 0
+
+    time.sleep(0.1)
+    cache.get_or_load('key', lambda: 'fresh', [('post', 1)])
+    assert cache.stats()['entries'] == 1
+    for post_id in range(1000):
+        cache.invalidate([('post', post_id)])
+    time.sleep(0.1)
+    cache.invalidate([('post', 'last')])
+    assert len(cache._invalidated_at) == 1
+
+def test_writes_invalidate_cached_operations(user_id, statements, monkeypatch):
+    monkeypatch.setenv('READ_CACHE_ENABLED', '1')
+    monkeypatch.setattr(read_cache, '_cache', ReadCache())
+    post_id = DatabaseOperations.add_post(user_id, 'cached', 'text')
+    DatabaseOperations.get_posts(user_id=user_id)
+    statements.clear()
+
+    assert len(DatabaseOperations.get_posts(user_id=user_id)) == 1
+    assert statements == []
+
+    DatabaseOperations.update_likes('post', post_id)
+    assert DatabaseOperations.get_posts(user_id=user_id)[0]['likes'] == 1
+    DatabaseOperations.add_post(user_id, 'another', 'text')
+    assert len(DatabaseOperations.get_posts(user_id=user_id)) == 2
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from database.operations import DatabaseOperations
+
+NOON = datetime(2026, 1, 1, 12, 0)
+
+def _posts_with_comments(user_id, comment_counts):
+    """Add one post per entry of ``comment_counts`` with that many comments; returns the post ids"""
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'timestamp': NOON + timedelta(minutes=n)}
+        for n in range(len(comment_counts))
+    ])
+    DatabaseOperations.add_comments_bulk([
+        {'post_id': post_id, 'user_id': user_id, 'content': f"comment {n}", 'timestamp': NOON + timedelta(minutes=n)}
+        for post_id, count in zip(post_ids, comment_counts)
+        for n in range(count)
+    ])
+    return post_ids
+
+def test_post_comment_counts_come_from_one_grouped_query(user_id, statements):
+    post_ids = _posts_with_comments(user_id, [3, 0, 1, 2, 5])
+    statements.clear()
+
+    posts = DatabaseOperations.get_posts(user_id=user_id)
+
+    assert {post['id']: post['comments'] for post in posts} == dict(zip(post_ids, [3, 0, 1, 2, 5]))
+    # The posts and one GROUP BY, however many posts there are
+    assert len(statements) == 2
+
+def test_single_post_carries_its_comment_count(user_id, statements):
+    post_ids = _posts_with_comments(user_id, [4, 1])
+    statements.clear()
+    assert DatabaseOperations.get_post_by_id(post_ids[0])['comments'] == 4
+    assert len(statements) == 2
+    assert DatabaseOperations.get_post_by_id(post_ids[-1] + 1) is None
+
+def test_comments_for_many_posts_come_with_authors_in_one_query(user_id, statements):
+    post_ids = _posts_with_comments(user_id, [2, 0, 3])
+    statements.clear()
+
+    comments = DatabaseOperations.get_comments_for_posts(post_ids)
+
+    assert len(statements) == 1
+    assert [len(comments[post_id]) for post_id in post_ids] == [2, 0, 3]
+    assert {comment['user_username'] for post_id in post_ids for comment in comments[post_id]} == {'test.user'}
+    assert [comment['content'] for comment in comments[post_ids[2]]] == ['comment 2', 'comment 1', 'comment 0']
+
+def test_first_comment_pages_stop_at_the_limit_with_a_cursor(user_id, statements):
+    post_ids = _posts_with_comments(user_id, [5, 2, 0])
+    statements.clear()
+
+    pages = DatabaseOperations.get_first_comment_pages(post_ids, limit=2)
+
+    assert len(statements) == 1
+    assert [len(pages[post_id]['items']) for post_id in post_ids] == [2, 2, 0]
+    # Only the post with more comments than the limit gets a cursor
+    assert [pages[post_id]['next_cursor'] is not None for post_id in post_ids] == [True, False, False]
+    rest = DatabaseOperations.get_comments_page(post_ids[0], cursor=pages[post_ids[0]]['next_cursor'], limit=10)
+    assert [comment['content'] for comment in rest['items']] == ['comment 2', 'comment 1', 'comment 0']
+    assert rest['next_cursor'] is None
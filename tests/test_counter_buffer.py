@@ -0,0 +1,85 @@
+from database import counter_buffer
+from database.counter_buffer import CounterBuffer
+from database.operations import DatabaseOperations
+
+class FlakyWriter:
+    """Records written batches and raises for the counters listed in ``failing``"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.written = []
+
+    def __call__(self, changes, counter):
+        if counter in self.failing:
+            raise RuntimeError('write failed')
+        self.written.append((counter, sorted(changes)))
+
+def test_counter_flush_coalesces_deltas():
+    writer = FlakyWriter()
+    buffer = CounterBuffer(writer, flush_interval=3600)
+    for _ in range(3):
+        buffer.add('likes', 'post', 1, 1)
+    buffer.add('views', 'post', 1, 5)
+    assert buffer.pending('likes', 'post', 1) == 3
+
+    assert buffer.flush() == 2
+    assert sorted(writer.written) == [('likes', [('post', 1, 3)]), ('views', [('post', 1, 5)])]
+    assert buffer.pending('likes', 'post', 1) == 0
+    buffer.stop()
+
+def test_counter_flush_failure_requeues_deltas():
+    writer = FlakyWriter(failing={'likes'})
+    buffer = CounterBuffer(writer, flush_interval=3600)
+    buffer.add('likes', 'post', 1, 2)
+    assert buffer.flush() == 0
+    assert buffer.stats()['failed_flushes'] == 1
+
+    # Still visible to reads, and merged with deltas added after the failure
+    buffer.add('likes', 'post', 1, 1)
+    assert buffer.pending('likes', 'post', 1) == 3
+    writer.failing.clear()
+    assert buffer.flush() == 1
+    assert writer.written == [('likes', [('post', 1, 3)])]
+    buffer.stop()
+
+def test_counter_partial_failure_requeues_only_unwritten_counters():
+    writer = FlakyWriter(failing={'views'})
+    buffer = CounterBuffer(writer, flush_interval=3600)
+    buffer.add('likes', 'post', 1, 1)
+    buffer.add('views', 'post', 1, 4)
+
+    assert buffer.flush() == 1
+    assert writer.written == [('likes', [('post', 1, 1)])]
+    assert buffer.pending('likes', 'post', 1) == 0
+    assert buffer.pending('views', 'post', 1) == 4
+
+    writer.failing.clear()
+    assert buffer.flush() == 1
+    assert writer.written[-1] == ('views', [('post', 1, 4)])
+    buffer.stop()
+
+def test_counter_merge_into_applies_pending_deltas():
+    buffer = CounterBuffer(FlakyWriter(), flush_interval=3600)
+    buffer.add('likes', 'post', 1, -5)
+    items = buffer.merge_into([{'id': 1, 'likes': 2}, {'id': 2, 'likes': 2}], 'post')
+    assert items == [{'id': 1, 'likes': 0}, {'id': 2, 'likes': 2}]
+    buffer.stop()
+
+def test_buffered_likes_show_in_reads_before_the_flush(user_id, monkeypatch):
+    post_id = DatabaseOperations.add_post(user_id, 'buffered', 'text')
+    buffer = CounterBuffer(DatabaseOperations.bulk_update_counters, flush_interval=3600)
+    monkeypatch.setenv('COUNTER_BUFFER_ENABLED', '1')
+    monkeypatch.setattr(counter_buffer, '_buffer', buffer)
+
+    for _ in range(3):
+        assert DatabaseOperations.update_likes('post', post_id) is True
+    assert DatabaseOperations.update_views('post', post_id) is True
+    post = DatabaseOperations.get_post_by_id(post_id)
+    assert (post['likes'], post['views']) == (3, 1)
+
+    assert DatabaseOperations.flush_counter_buffer() == 2
+    monkeypatch.setenv('COUNTER_BUFFER_ENABLED', '0')
+    post = DatabaseOperations.get_post_by_id(post_id)
+    assert (post['likes'], post['views']) == (3, 1)
+    assert DatabaseOperations.get_post_totals(user_id)['likes'] == 3
+    buffer.stop()
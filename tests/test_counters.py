@@ -0,0 +1,59 @@
+import threading
+from database.operations import DatabaseOperations
+
+def _likes(post_id):
+    return DatabaseOperations.get_post_by_id(post_id)['likes']
+
+def test_update_likes_and_views_return_bools(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'counted', 'text')
+    assert DatabaseOperations.update_likes('post', post_id) is True
+    assert DatabaseOperations.update_views('post', post_id) is True
+    assert DatabaseOperations.update_likes('post', post_id + 1) is False
+    assert DatabaseOperations.update_views('comment', post_id) is False
+    assert DatabaseOperations.update_likes('user', user_id) is False
+    post = DatabaseOperations.get_post_by_id(post_id)
+    assert (post['likes'], post['views']) == (1, 1)
+
+def test_unlike_is_floored_at_zero_and_totals_follow(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'counted', 'text')
+    DatabaseOperations.update_likes('post', post_id)
+    # Dropping from 0 to 0 still succeeds, but must not go negative
+    assert DatabaseOperations.update_likes('post', post_id, increment=False) is True
+    assert DatabaseOperations.update_likes('post', post_id, increment=False) is True
+    assert _likes(post_id) == 0
+    assert DatabaseOperations.get_post_totals(user_id)['likes'] == 0
+
+    DatabaseOperations.update_likes('post', post_id)
+    assert DatabaseOperations.get_post_totals(user_id)['likes'] == 1
+
+def test_bulk_update_applies_mixed_deltas_per_type(user_id, statements):
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'likes': 2} for n in range(3)
+    ])
+    item_id = DatabaseOperations.add_gallery_item(user_id, 'Item', 'image', 'travel', '')
+    statements.clear()
+
+    new_values = DatabaseOperations.bulk_update_counters([
+        ('post', post_ids[0], 3), ('post', post_ids[1], -5), ('post', post_ids[0], 1),
+        ('gallery', item_id, 4), ('post', post_ids[2] + 100, 1)
+    ], 'likes')
+
+    assert new_values == {('post', post_ids[0]): 6, ('post', post_ids[1]): 0, ('gallery', item_id): 4}
+    assert [_likes(post_id) for post_id in post_ids] == [6, 0, 2]
+    assert DatabaseOperations.get_post_totals(user_id)['likes'] == 8
+    assert sum(statement.lstrip().upper().startswith('UPDATE POSTS') for statement in statements) == 1
+
+def test_concurrent_likes_are_not_lost(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'popular', 'text')
+
+    def like():
+        for _ in range(10):
+            DatabaseOperations.update_likes('post', post_id)
+
+    threads = [threading.Thread(target=like) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _likes(post_id) == 80
+    assert DatabaseOperations.get_post_totals(user_id)['likes'] == 80
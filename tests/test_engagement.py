@@ -0,0 +1,33 @@
+from database.engagement import engagement_report
+from database.operations import DatabaseOperations
+
+def test_report_matches_the_stored_totals(user_id):
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': 'photo', 'post_type': 'photo', 'likes': 6, 'shares': 2, 'views': 40},
+        {'user_id': user_id, 'caption': 'text', 'post_type': 'text', 'likes': 1, 'views': 10}
+    ])
+    DatabaseOperations.add_comment(post_ids[1], user_id, 'hi')
+    DatabaseOperations.add_gallery_items_bulk([
+        {'user_id': user_id, 'title': 'item', 'item_type': 'image', 'category': 'travel', 'likes': 3, 'views': 9}
+    ])
+
+    report = engagement_report(user_id)
+    assert set(report) == {'totals', 'by_post_type', 'by_media_type', 'by_category', 'percentiles', 'daily'}
+    totals = DatabaseOperations.get_post_totals(user_id)
+    assert report['totals'] == {
+        'total_likes': totals['likes'],
+        'total_comments': totals['comments'],
+        'total_shares': totals['shares'],
+        'total_views': totals['views'],
+        'avg_engagement_rate': 20.0
+    }
+    assert report['by_post_type'].loc['photo', 'engagement_rate'] == 20.0
+    assert report['by_category'].loc['travel', 'likes'] == 3
+    assert report['daily']['posts'].sum() == 2
+    assert len(report['daily']) == 30
+
+def test_report_of_a_user_without_content(user_id):
+    report = engagement_report(user_id)
+    assert report['totals']['avg_engagement_rate'] == 0.0
+    assert report['by_post_type'].empty
+    assert (report['percentiles'].to_numpy() == 0).all()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from database.engagement_history import snapshot_bucket, take_snapshot
+from database.operations import DatabaseOperations
+from database.schema import EngagementLatest, EngagementSnapshot, get_session
+
+START = datetime(2026, 1, 1, 12, 30)
+
+def _snapshots():
+    session = get_session()
+    try:
+        return {
+            (row.entity_type, row.entity_id, row.taken_at): (row.likes, row.comments, row.shares, row.views)
+            for row in session.query(EngagementSnapshot)
+        }
+    finally:
+        session.close()
+
+def _tracked():
+    session = get_session()
+    try:
+        return {(row.entity_type, row.entity_id) for row in session.query(EngagementLatest)}
+    finally:
+        session.close()
+
+def test_snapshot_bucket_is_the_start_of_the_interval():
+    assert snapshot_bucket(datetime(2026, 3, 4, 5, 6, 7), 3600) == datetime(2026, 3, 4, 5)
+    assert snapshot_bucket(datetime(2026, 3, 4, 5, 6, 7), 86400) == datetime(2026, 3, 4)
+
+def test_snapshots_write_only_changed_rows(user_id, monkeypatch):
+    # Small id ranges, so the walk crosses several batches
+    monkeypatch.setenv('BULK_INSERT_BATCH_SIZE', '2')
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'likes': n} for n in range(5)
+    ])
+
+    # Posts whose counters are all zero have nothing to record yet
+    assert take_snapshot(START) == 5
+    first = snapshot_bucket(START)
+    assert _snapshots()[('user', user_id, first)] == (10, 0, 0, 0)
+    assert ('post', post_ids[0], first) not in _snapshots()
+
+    assert take_snapshot(START + timedelta(hours=1)) == 0
+
+    DatabaseOperations.update_likes('post', post_ids[0])
+    DatabaseOperations.update_views('post', post_ids[3])
+    assert take_snapshot(START + timedelta(hours=2)) == 3
+    second = snapshot_bucket(START + timedelta(hours=2))
+    assert {key for key in _snapshots() if key[2] == second} == {
+        ('post', post_ids[0], second), ('post', post_ids[3], second), ('user', user_id, second)
+    }
+    assert _snapshots()[('post', post_ids[3], second)] == (3, 0, 0, 1)
+
+def test_a_second_snapshot_in_one_interval_overwrites(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'liked', 'text')
+    DatabaseOperations.update_likes('post', post_id)
+    take_snapshot(START)
+    DatabaseOperations.update_likes('post', post_id)
+    take_snapshot(START + timedelta(minutes=10))
+    assert _snapshots() == {
+        ('post', post_id, snapshot_bucket(START)): (2, 0, 0, 0),
+        ('user', user_id, snapshot_bucket(START)): (2, 0, 0, 0)
+    }
+
+def test_deleted_entities_get_one_final_row_of_zeros(user_id):
+    kept, deleted = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': 'kept', 'post_type': 'text', 'likes': 1},
+        {'user_id': user_id, 'caption': 'deleted', 'post_type': 'text', 'likes': 2}
+    ])
+    take_snapshot(START)
+    assert ('post', deleted) in _tracked()
+
+    DatabaseOperations.delete_post(deleted)
+    assert take_snapshot(START + timedelta(hours=1)) == 2
+    later = snapshot_bucket(START + timedelta(hours=1))
+    assert _snapshots()[('post', deleted, later)] == (0, 0, 0, 0)
+    assert _snapshots()[('user', user_id, later)] == (1, 0, 0, 0)
+    assert _tracked() == {('post', kept), ('user', user_id)}
+
+    assert take_snapshot(START + timedelta(hours=2)) == 0
+
+def test_history_reports_the_baseline_and_latest_counters(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'growing', 'text')
+    now = datetime.utcnow()
+    DatabaseOperations.update_likes('post', post_id)
+    take_snapshot(now - timedelta(days=8))
+    for _ in range(4):
+        DatabaseOperations.update_likes('post', post_id)
+    take_snapshot(now)
+
+    history = DatabaseOperations.get_engagement_history(user_id, days=7)
+    assert history['baseline']['likes'] == 1
+    assert history['latest']['likes'] == 5
+    assert len(history['daily']) == 7
@@ -0,0 +1,58 @@
+from database.operations import DatabaseOperations
+from database.schema import UserEngagementTotals, get_session
+
+def _corrupt(user_id, **values):
+    session = get_session()
+    try:
+        session.query(UserEngagementTotals).filter_by(user_id=user_id).update(values)
+        session.commit()
+    finally:
+        session.close()
+
+def test_totals_follow_writes(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'counted', 'text')
+    DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': 'bulk', 'post_type': 'text', 'likes': 4, 'shares': 2}
+    ])
+    DatabaseOperations.update_likes('post', post_id)
+    DatabaseOperations.update_views('post', post_id)
+    DatabaseOperations.add_comment(post_id, user_id, 'first')
+    assert DatabaseOperations.get_post_totals(user_id) == {
+        'posts': 2, 'likes': 5, 'comments': 1, 'shares': 2, 'views': 1
+    }
+
+    DatabaseOperations.delete_post(post_id)
+    assert DatabaseOperations.get_post_totals(user_id) == {
+        'posts': 1, 'likes': 4, 'comments': 0, 'shares': 2, 'views': 0
+    }
+    assert DatabaseOperations.reconcile_engagement_totals() == []
+
+def test_reconcile_fixes_only_drifted_users(user_id):
+    other_id = DatabaseOperations.add_users_bulk([{'name': 'Other User', 'username': 'other.user'}])[0]
+    post_id = DatabaseOperations.add_post(user_id, 'liked', 'text')
+    DatabaseOperations.add_post(other_id, 'untouched', 'text')
+    DatabaseOperations.update_likes('post', post_id)
+    DatabaseOperations.add_comment(post_id, other_id, 'nice')
+    _corrupt(user_id, likes=40, comments=0)
+
+    assert DatabaseOperations.reconcile_engagement_totals() == [user_id]
+    assert DatabaseOperations.get_post_totals(user_id) == {
+        'posts': 1, 'likes': 1, 'comments': 1, 'shares': 0, 'views': 0
+    }
+    assert DatabaseOperations.get_post_totals(other_id)['posts'] == 1
+    assert DatabaseOperations.reconcile_engagement_totals() == []
+
+def test_reconcile_one_user_and_users_without_posts(user_id):
+    other_id = DatabaseOperations.add_users_bulk([{'name': 'Other User', 'username': 'other.user'}])[0]
+    post_id = DatabaseOperations.add_post(user_id, 'short lived', 'text')
+    DatabaseOperations.add_post(other_id, 'stays', 'text')
+    DatabaseOperations.delete_post(post_id)
+    _corrupt(user_id, posts=3, views=9)
+    _corrupt(other_id, posts=5)
+
+    assert DatabaseOperations.reconcile_engagement_totals(user_id) == [user_id]
+    assert DatabaseOperations.get_post_totals(user_id) == dict.fromkeys(
+        ['posts', 'likes', 'comments', 'shares', 'views'], 0
+    )
+    assert DatabaseOperations.get_post_totals(other_id)['posts'] == 5
+    assert DatabaseOperations.reconcile_engagement_totals() == [other_id]
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from database.operations import DatabaseOperations
+
+NOON = datetime(2026, 1, 1, 12, 0)
+
+def _walk(fetch, limit):
+    """Follow next_cursor from the first page to the last; returns the item ids per page"""
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor=cursor, limit=limit)
+        pages.append([item['id'] for item in page['items']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+def test_posts_with_equal_timestamps_page_without_gaps_or_repeats(user_id):
+    # Seven posts share one timestamp and straddle several page boundaries
+    timestamps = [NOON + timedelta(minutes=1)] + [NOON] * 7 + [NOON - timedelta(minutes=1)]
+    ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'timestamp': timestamp}
+        for n, timestamp in enumerate(timestamps)
+    ])
+
+    pages = _walk(lambda **page: DatabaseOperations.get_posts_page(user_id=user_id, **page), limit=3)
+
+    # Newest first, ties broken by id descending
+    assert [post_id for page in pages for post_id in page] == [ids[0]] + sorted(ids[1:8], reverse=True) + [ids[8]]
+    assert [len(page) for page in pages] == [3, 3, 3]
+
+def test_last_page_exactly_full_has_no_cursor(user_id):
+    DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'timestamp': NOON}
+        for n in range(4)
+    ])
+    pages = _walk(lambda **page: DatabaseOperations.get_posts_page(user_id=user_id, **page), limit=2)
+    assert [len(page) for page in pages] == [2, 2]
+
+def test_comments_with_equal_timestamps_page_in_order(user_id):
+    post_id = DatabaseOperations.add_post(user_id, 'commented', 'text')
+    ids = DatabaseOperations.add_comments_bulk([
+        {'post_id': post_id, 'user_id': user_id, 'content': f"comment {n}", 'timestamp': NOON}
+        for n in range(5)
+    ])
+
+    pages = _walk(lambda **page: DatabaseOperations.get_comments_page(post_id, **page), limit=2)
+
+    assert pages == [sorted(ids, reverse=True)[i:i + 2] for i in (0, 2, 4)]
+    first = DatabaseOperations.get_first_comment_pages([post_id], limit=2)[post_id]
+    assert [comment['id'] for comment in first['items']] == pages[0]
+    second = DatabaseOperations.get_comments_page(post_id, cursor=first['next_cursor'], limit=2)
+    assert [comment['id'] for comment in second['items']] == pages[1]
+
+def test_gallery_pages_by_category_with_equal_upload_dates(user_id):
+    ids = DatabaseOperations.add_gallery_items_bulk([
+        {'user_id': user_id, 'title': f"item {n}", 'item_type': 'image',
+         'category': 'travel' if n % 2 else 'food', 'upload_date': NOON}
+        for n in range(7)
+    ])
+    pages = _walk(
+        lambda **page: DatabaseOperations.get_gallery_page(user_id=user_id, category='travel', **page), limit=2
+    )
+    assert pages == [sorted(ids[1::2], reverse=True)[:2], sorted(ids[1::2], reverse=True)[2:]]
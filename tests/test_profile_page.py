@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from database.operations import DatabaseOperations
+
+def test_profile_page_loads_in_four_statements(user_id, statements):
+    DatabaseOperations.add_social_links_bulk([
+        {'user_id': user_id, 'platform': platform, 'url': f"https://{platform}.example/test"}
+        for platform in ('instagram', 'youtube')
+    ])
+    post_ids = DatabaseOperations.add_posts_bulk([
+        {'user_id': user_id, 'caption': f"post {n}", 'post_type': 'text', 'likes': n} for n in range(3)
+    ])
+    DatabaseOperations.add_comments_bulk([{'post_id': post_ids[-1], 'user_id': user_id, 'content': 'hi'}] * 2)
+    DatabaseOperations.add_gallery_items_bulk([
+        {'user_id': user_id, 'title': f"item {n}", 'item_type': 'image', 'category': 'travel'} for n in range(2)
+    ])
+    statements.clear()
+
+    page = DatabaseOperations.get_profile_page('test.user', posts_limit=2, gallery_limit=5)
+
+    # Profile with links, posts with comment counts, gallery, totals
+    assert len(statements) == 4
+    assert page['user_id'] == user_id
+    assert set(page['profile']['social_links']) == {'instagram', 'youtube'}
+    assert [post['comments'] for post in page['posts']['items']] == [2, 0]
+    assert page['posts']['next_cursor'] is not None
+    assert len(page['gallery']['items']) == 2
+    assert page['gallery']['next_cursor'] is None
+    assert page['post_totals'] == {'posts': 3, 'likes': 3, 'comments': 2, 'shares': 0, 'views': 0}
+
+def test_profile_page_of_an_unknown_user_is_none(database, statements):
+    assert DatabaseOperations.get_profile_page('nobody') is None
+    assert len(statements) == 1
+
+def test_profile_page_skips_the_parts_not_asked_for(user_id, statements):
+    DatabaseOperations.add_post(user_id, 'not loaded', 'text')
+    statements.clear()
+
+    page = DatabaseOperations.get_profile_page('test.user', posts_limit=0, gallery_limit=0, include_totals=False)
+    assert len(statements) == 1
+    assert page['profile']['username'] == 'test.user'
+    assert (page['posts'], page['gallery'], page['post_totals']) == (None, None, None)
+
+    page = DatabaseOperations.get_profile_page('test.user', posts_limit=0, gallery_limit=3)
+    assert len(statements) == 4
+    assert page['posts'] is None and page['gallery']['items'] == []
+
+def test_async_profile_page_fetches_only_the_parts_asked_for(user_id):
+    pytest.importorskip('aiosqlite')
+    from database.async_operations import AsyncDatabaseOperations, dispose_async_engine
+    post_id = DatabaseOperations.add_post(user_id, 'with comments', 'text')
+    DatabaseOperations.add_comment(post_id, user_id, 'first')
+
+    async def pages():
+        try:
+            profile_only = await AsyncDatabaseOperations.load_profile_page(
+                'test.user', posts_limit=0, gallery_limit=0, include_totals=False, analytics_days=None
+            )
+            feed = await AsyncDatabaseOperations.load_profile_page(
+                'test.user', gallery_limit=0, include_totals=False, analytics_days=None, comment_post_ids=[post_id]
+            )
+            return profile_only, feed
+        finally:
+            await dispose_async_engine()
+
+    profile_only, feed = asyncio.run(pages())
+    assert profile_only['profile']['username'] == 'test.user'
+    assert (profile_only['posts'], profile_only['analytics_summary'], profile_only['comment_pages']) == (None, None, {})
+    assert (feed['gallery'], feed['post_totals']) == (None, None)
+    assert [post['id'] for post in feed['posts']['items']] == [post_id]
+    assert [comment['content'] for comment in feed['comment_pages'][post_id]['items']] == ['first']
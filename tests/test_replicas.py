@@ -0,0 +1,66 @@
+import asyncio
+import shutil
+import pytest
+from database.operations import DatabaseOperations
+from database.schema import client_session, dispose_engine, get_replica_status
+from sqlalchemy import create_engine, text
+
+@pytest.fixture
+def replica(database, user_id, tmp_path, monkeypatch):
+    """A copy of the test database as a read replica, its post captions marked so reads show where they ran"""
+    DatabaseOperations.add_post(user_id, 'on primary', 'text')
+    dispose_engine()
+    shutil.copy(tmp_path / 'profile.db', tmp_path / 'replica.db')
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(replica_url)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE posts SET caption = 'on replica'"))
+    engine.dispose()
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', replica_url)
+    monkeypatch.setenv('REPLICA_STICKY_SECONDS', '60')
+    yield replica_url
+    dispose_engine()
+
+def _caption(user_id):
+    return DatabaseOperations.get_posts(user_id=user_id)[0]['caption']
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(replica, user_id):
+    assert _caption(user_id) == 'on replica'
+    DatabaseOperations.add_post(user_id, 'new on primary', 'text')
+    # Outside a client session nobody is sticky, so the replica (without the new post) answers
+    assert len(DatabaseOperations.get_posts(user_id=user_id)) == 1
+    assert [status['healthy'] for status in get_replica_status()] == [True]
+
+def test_a_client_reads_its_own_writes_from_the_primary(replica, user_id):
+    with client_session('writer'):
+        assert _caption(user_id) == 'on replica'
+        DatabaseOperations.add_post(user_id, 'new on primary', 'text')
+        assert len(DatabaseOperations.get_posts(user_id=user_id)) == 2
+    with client_session('someone else'):
+        assert len(DatabaseOperations.get_posts(user_id=user_id)) == 1
+
+def test_reads_fall_back_to_the_primary_without_a_healthy_replica(database, user_id, tmp_path, monkeypatch):
+    DatabaseOperations.add_post(user_id, 'on primary', 'text')
+    monkeypatch.setenv('DATABASE_REPLICA_URLS', f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    dispose_engine()
+    assert _caption(user_id) == 'on primary'
+    assert [status['healthy'] for status in get_replica_status()] == [False]
+    dispose_engine()
+
+def test_async_reads_use_the_replica_until_the_client_writes(replica, user_id):
+    pytest.importorskip('aiosqlite')
+    from database.async_operations import AsyncDatabaseOperations, dispose_async_engine
+
+    async def captions():
+        try:
+            before = await AsyncDatabaseOperations.get_posts(user_id=user_id)
+            await AsyncDatabaseOperations.add_post(user_id, 'new on primary', 'text')
+            after = await AsyncDatabaseOperations.get_posts(user_id=user_id)
+            return [post['caption'] for post in before], [post['caption'] for post in after]
+        finally:
+            await dispose_async_engine()
+
+    with client_session('async writer'):
+        before, after = asyncio.run(captions())
+    assert before == ['on replica']
+    assert sorted(after) == ['new on primary', 'on primary']
@@ -0,0 +1,53 @@
+from database.operations import DatabaseOperations
+from database.search import search_backend
+
+def _post(user_id, caption):
+    return DatabaseOperations.add_post(user_id, caption, 'text')
+
+def test_sqlite_uses_the_fts5_index(database):
+    assert search_backend(database) == 'sqlite_fts5'
+
+def test_search_ranks_by_relevance_and_counts_every_match(user_id):
+    passing = _post(user_id, 'A long walk through the old town, a market, a museum and finally a sunset')
+    focused = _post(user_id, 'Sunset sunset sunset')
+    _post(user_id, 'Breakfast with friends')
+    for n in range(3):
+        _post(user_id, f"Another sunset, number {n}, after a long and busy day in the city centre")
+
+    results = DatabaseOperations.search_content('sunset', search_type='posts', limit=2)
+
+    assert results['posts_total'] == 5
+    assert len(results['posts']) == 2
+    assert results['posts'][0]['id'] == focused
+    later = DatabaseOperations.search_content('sunset', search_type='posts', limit=10, offset=2)
+    assert len(later['posts']) == 3
+    assert later['posts'][-1]['id'] == passing
+    assert {post['id'] for post in results['posts']}.isdisjoint(post['id'] for post in later['posts'])
+
+def test_search_matches_prefixes_and_all_terms(user_id):
+    both = _post(user_id, 'Photography walk at sunset')
+    _post(user_id, 'Photography basics')
+    results = DatabaseOperations.search_content('photo sun', search_type='posts')
+    assert [post['id'] for post in results['posts']] == [both]
+    assert results['posts_total'] == 1
+    assert DatabaseOperations.search_content('   ')['posts_total'] == 0
+
+def test_gallery_titles_outrank_descriptions(user_id):
+    in_description = DatabaseOperations.add_gallery_item(user_id, 'Evening', 'image', 'travel', 'Mountains at dusk')
+    in_title = DatabaseOperations.add_gallery_item(user_id, 'Mountains', 'image', 'travel', 'Evening light')
+    results = DatabaseOperations.search_content('mountains', search_type='gallery')
+    assert results['gallery_total'] == 2
+    assert [item['id'] for item in results['gallery']] == [in_title, in_description]
+    assert results['posts'] == []
+
+def test_edits_and_deletes_update_the_index(user_id):
+    post_id = _post(user_id, 'Morning coffee')
+    DatabaseOperations.update_likes('post', post_id)
+    assert DatabaseOperations.search_content('coffee')['posts_total'] == 1
+
+    DatabaseOperations.update_post(post_id, caption='Evening tea')
+    assert DatabaseOperations.search_content('coffee')['posts_total'] == 0
+    assert DatabaseOperations.search_content('tea')['posts_total'] == 1
+
+    DatabaseOperations.delete_post(post_id)
+    assert DatabaseOperations.search_content('tea')['posts_total'] == 0
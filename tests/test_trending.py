@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import random
+from database.operations import DatabaseOperations
+from database.trending import TrendingHashtags, extract_hashtags
+
+def test_count_min_never_underestimates_and_stays_near_the_bound():
+    rng = random.Random(7)
+    engine = TrendingHashtags(window_hours=24, width=512, depth=4, top_k=20)
+    now = datetime.utcnow()
+    # A few heavy tags over a long tail of rare ones
+    tags = [f"heavy{rng.randrange(5)}" if rng.random() < 0.3 else f"tail{rng.randrange(5000)}" for _ in range(20000)]
+    truth = {}
+    for tag in tags:
+        engine.add({tag: tag}, now)
+        truth[tag] = truth.get(tag, 0) + 1
+
+    sketch = engine._sketches[engine._slot(engine._slot_hours.max())]
+    # With depth 4 an estimate exceeds the true count by more than
+    # e * N / width only with probability e**-4 (under 2%)
+    bound = 2.72 * len(tags) / engine.width
+    errors = []
+    for tag, count in truth.items():
+        estimate = int(sketch[engine._rows, engine._columns(tag)].min())
+        assert estimate >= count
+        errors.append(estimate - count > bound)
+    assert sum(errors) <= 0.02 * len(truth)
+
+    top = engine.top(5, hours=1, now=now)
+    assert sorted(entry['tag'] for entry in top) == [f"#heavy{n}" for n in range(5)]
+    for entry in top:
+        assert entry['count'] >= truth[entry['tag'][1:]]
+
+def test_trending_decays_older_hours_and_drops_the_window():
+    engine = TrendingHashtags(window_hours=48, half_life_hours=1.0)
+    now = datetime.utcnow()
+    engine.add({'old': 'Old'}, now - timedelta(hours=3), count=4)
+    engine.add({'new': 'New'}, now, count=1)
+    assert [entry['tag'] for entry in engine.top(2, hours=24, now=now)] == ['#New', '#Old']
+    assert engine.top(2, hours=2, now=now)[0]['tag'] == '#New'
+    assert len(engine.top(2, hours=2, now=now)) == 1
+    engine.add({'ancient': 'Ancient'}, now - timedelta(hours=49))
+    assert 'ancient' not in engine._labels
+
+def test_extract_hashtags_is_case_insensitive_and_unique():
+    assert extract_hashtags('#Travel and #travel, #Food!') == {'travel': 'travel', 'food': 'Food'}
+
+def test_trending_catch_up_counts_each_post_and_edit_once(user_id):
+    engine = TrendingHashtags()
+    DatabaseOperations.add_posts_bulk([{'user_id': user_id, 'caption': '#Launch day', 'post_type': 'text'}] * 3)
+    edited = DatabaseOperations.add_post(user_id, 'no tags yet', 'text')
+    DatabaseOperations.update_post(edited, caption='now #Launch #Edited')
+    assert engine.catch_up() == 5
+
+    # The edited post was read with its new caption, so its edit row adds nothing
+    counts = {entry['tag']: entry['count'] for entry in engine.top(5)}
+    assert counts == {'#Launch': 4, '#Edited': 1}
+
+    DatabaseOperations.update_post(edited, caption='now #Launch #Edited #Later')
+    DatabaseOperations.add_post(user_id, 'one more #Launch', 'text')
+    assert engine.catch_up() == 2
+    assert engine.catch_up() == 0
+    counts = {entry['tag']: entry['count'] for entry in engine.top(5)}
+    assert counts == {'#Launch': 5, '#Edited': 1, '#Later': 1}
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+import pytest
+from database import unique_viewers
+from database.operations import DatabaseOperations
+from database.unique_viewers import HyperLogLog, ViewerBuffer, prune_sketches, register_position
+
+def _sketch(viewers, precision=12):
+    sketch = HyperLogLog(precision)
+    for viewer in viewers:
+        sketch.add(viewer)
+    return sketch
+
+@pytest.mark.parametrize('distinct', [10, 1000, 50000])
+def test_hyperloglog_error_within_bounds(distinct):
+    sketch = _sketch(f"viewer-{n}" for n in range(distinct))
+    # 1.04 / sqrt(4096) is about 1.6% standard error; allow four of them
+    assert abs(sketch.count() - distinct) <= max(1, 0.065 * distinct)
+
+def test_hyperloglog_ignores_repeat_views():
+    once = _sketch(f"viewer-{n}" for n in range(500))
+    repeated = _sketch(f"viewer-{n % 500}" for n in range(5000))
+    assert repeated.count() == once.count()
+
+def test_hyperloglog_merge_counts_the_union():
+    first = _sketch(f"viewer-{n}" for n in range(0, 6000))
+    second = _sketch(f"viewer-{n}" for n in range(4000, 10000))
+    union = _sketch(f"viewer-{n}" for n in range(10000))
+    assert first.merge(second).count() == union.count()
+    assert HyperLogLog.from_bytes(union.to_bytes()).count() == union.count()
+
+def test_hyperloglog_rejects_other_precisions():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+def test_viewer_flush_failure_requeues_registers():
+    batches = []
+    failing = [True]
+
+    def writer(batch):
+        if failing[0]:
+            raise RuntimeError('write failed')
+        batches.append(batch)
+
+    buffer = ViewerBuffer(writer, precision=8, flush_interval=3600)
+    day = date(2026, 1, 1)
+    buffer.add('viewer-1', [('post', 1)], day)
+    assert buffer.flush() == 0
+    assert buffer.stats()['failed_flushes'] == 1
+    assert buffer.pending('post', [1], day)
+
+    buffer.add('viewer-2', [('post', 1)], day)
+    failing[0] = False
+    assert buffer.flush() == 1
+    assert list(batches[0]) == [('post', 1, day)]
+    expected = {}
+    for viewer in ('viewer-1', 'viewer-2'):
+        index, rank = register_position(viewer, 8)
+        expected[index] = max(rank, expected.get(index, 0))
+    assert batches[0][('post', 1, day)] == expected
+    assert buffer.pending('post', [1], day) == {}
+    buffer.stop()
+
+def test_unique_viewers_count_buffered_and_stored_views(user_id, monkeypatch):
+    post_id = DatabaseOperations.add_post(user_id, 'watched', 'text')
+    buffer = ViewerBuffer(DatabaseOperations.merge_viewer_sketches, flush_interval=3600)
+    monkeypatch.setattr(unique_viewers, '_buffer', buffer)
+
+    for viewer in ('a', 'b', 'a', 'c'):
+        DatabaseOperations.record_unique_views(viewer, [('post', post_id), ('profile', user_id)])
+    assert DatabaseOperations.get_unique_viewers('post', [post_id]) == {post_id: 3}
+
+    assert DatabaseOperations.flush_viewer_buffer() == 2
+    DatabaseOperations.record_unique_views('d', [('post', post_id)])
+    assert DatabaseOperations.get_unique_viewers('post', [post_id, post_id + 1]) == {post_id: 4, post_id + 1: 0}
+    assert DatabaseOperations.get_unique_viewers('profile', [user_id]) == {user_id: 3}
+    buffer.stop()
+
+    with pytest.raises(ValueError):
+        DatabaseOperations.record_unique_views('a', [('comment', 1)])
+
+def test_prune_removes_days_past_the_retention(database, monkeypatch):
+    monkeypatch.setattr(unique_viewers, '_buffer', ViewerBuffer(DatabaseOperations.merge_viewer_sketches, flush_interval=3600))
+    today = datetime.utcnow().date()
+    DatabaseOperations.merge_viewer_sketches({
+        ('post', 1, today - timedelta(days=100)): dict([register_position('viewer', 12)]),
+        ('post', 1, today): dict([register_position('viewer', 12)])
+    })
+    assert prune_sketches(today=today) == 1
+    assert DatabaseOperations.get_unique_viewers('post', [1], days=365) == {1: 1}
+    unique_viewers._buffer.stop()
@@ -40,34 +40,3 @@ def calculate_time_ago(timestamp):
     
     else:
         return "Just now"
-
-def generate_engagement_metrics(posts_data):
-    """Generate engagement metrics from posts data"""
-    metrics = {
-        'total_likes': sum(post['likes'] for post in posts_data),
-        'total_comments': sum(post['comments'] for post in posts_data),
-        'total_shares': sum(post['shares'] for post in posts_data),
-        'total_views': sum(post['views'] for post in posts_data),
-        'avg_engagement_rate': 0
-    }
-    
-    if metrics['total_views'] > 0:
-        total_engagement = metrics['total_likes'] + metrics['total_comments'] + metrics['total_shares']
-        metrics['avg_engagement_rate'] = (total_engagement / metrics['total_views']) * 100
-    
-    return metrics
-
-def get_trending_hashtags():
-    """Returns trending hashtags for the profile"""
-    return [
-        '#ContentCreator',
-        '#LifestyleInfluencer',
-        '#TravelDiaries',
-        '#PhotographyLife',
-        '#MorningMotivation',
-        '#FitnessJourney',
-        '#FoodieLife',
-        '#DigitalMarketing',
-        '#CreativeLife',
-        '#WanderlustVibes'
-    ]